@@ -1,10 +1,26 @@
 import os
+import queue
+import threading
 from tkinter import filedialog, messagebox
-from utils.image_io import list_images_in_folder, load_bgr, save_bgr
-from processing.pipeline import cyberpunkify_pipeline
+from utils.catalog import fill_hashes_in_background
+from utils.image_io import list_images_in_folder, save_bgr
+from processing.batch import CancelToken, BatchStats, iter_batch
+from processing.export import export_base, export_image, get_profile
+from processing.report import BatchReport, default_report_path
+from ui.contact_sheet import ContactSheetWindow
+from utils.settings import get_setting
 
 # Small actions to keep app.py lean
 
+BATCH_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # memory admission (processing/admission.py) bounds big files
+BATCH_POLL_MS = 50
+
+def _export_profile():
+    """Targets of the export profile chosen in settings.json, or None for plain PNG saves."""
+    name = get_setting("export_profile")
+    return get_profile(name) if name else None
+
+
 def do_open_image(app):
     path = filedialog.askopenfilename(
         title="Select an image",
@@ -12,14 +28,7 @@ def do_open_image(app):
     )
     if not path:
         return
-    app.state.current_path = path
-    try:
-        img = load_bgr(path)
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to load image:\n{e}")
-        return
-    app.state.original = img
-    app.refresh()
+    app.load_image(path)
 
 
 def do_choose_folder(app):
@@ -27,11 +36,17 @@ def do_choose_folder(app):
     if not folder:
         return
     app.state.current_folder = folder
-    app.left.populate_thumbs(folder)
+    app.left.populate_thumbs(folder, catalog=app.catalog)
+    if app.catalog is not None:
+        if app.catalog_hashing is not None:
+            app.catalog_hashing.set()  # the previous folder's files are no longer interesting
+        app.catalog_hashing = fill_hashes_in_background(app.catalog.db_path, folder)
 
 
 def do_save_image(app):
-    if app.state.processed is None:
+    app.flush_render()
+    entry = app.state.entry
+    if entry is None or entry.processed is None:
         messagebox.showinfo("Info", "No processed image to save.")
         return
     base = (
@@ -47,29 +62,55 @@ def do_save_image(app):
     if not path:
         return
     try:
-        save_bgr(path, app.state.processed)
-        messagebox.showinfo("Saved", f"Saved:\n{path}")
+        profile = _export_profile()
+        if profile is None:
+            save_bgr(path, entry.processed)
+            saved = [path]
+        else:
+            # every profile size from this one render
+            results = export_image(entry.processed, export_base(path), profile)
+            errors = [err for _, err in results if err]
+            if errors:
+                raise RuntimeError(errors[0])
+            saved = [p for p, _ in results]
+        messagebox.showinfo("Saved", "Saved:\n" + "\n".join(saved))
     except Exception as e:
         messagebox.showerror("Error", f"Failed to save image:\n{e}")
 
 
+def do_contact_sheet(app):
+    if app.state.entry is None:
+        messagebox.showinfo("Info", "Open or click an image first.")
+        return
+    ContactSheetWindow(app, app.state.entry.original, app.state.current_theme, on_pick=app.apply_variant)
+
+
 def do_process_batch(app):
+    if app.batch_token is not None:
+        messagebox.showinfo("Info", "A batch is already running.")
+        return
+
     mode = app.state.pick_mode
     targets = []
 
     if mode == "folder":
         if not app.state.current_folder:
-            ttk.messagebox.showinfo("Info", "Choose a folder first.")
+            messagebox.showinfo("Info", "Choose a folder first.")
+            return
+        targets = list_images_in_folder(
+            app.state.current_folder, catalog=app.catalog, hash_files=False, min_side=get_setting("batch_min_side")
+        )
+        if not targets:
+            messagebox.showinfo("Info", "No images to process in this folder.")
             return
-        targets = list_images_in_folder(app.state.current_folder)
     elif mode == "multi":
         if not app.state.multiselect:
-            ttk.messagebox.showinfo("Info", "Select images from the list.")
+            messagebox.showinfo("Info", "Select images from the list.")
             return
-        targets = list(app.state.multiselect)
+        targets = sorted(app.state.multiselect)
     else:
         if not app.state.current_path:
-            ttk.messagebox.showinfo("Info", "Open or click an image first.")
+            messagebox.showinfo("Info", "Open or click an image first.")
             return
         targets = [app.state.current_path]
 
@@ -77,37 +118,83 @@ def do_process_batch(app):
     if not outdir:
         return
 
+    theme = app.state.current_theme
     params = app.params()
-    ok, fail = 0, 0
-    total = len(targets)
+    try:
+        profile = _export_profile()
+    except ValueError as e:
+        messagebox.showerror("Error", str(e))
+        return
+    reduced = bool(get_setting("export_reduced"))
+    token = CancelToken()
+    stats = BatchStats(len(targets) * len(profile or (None,)))
+    report = BatchReport(stats.total, {"command": "gui", "theme": theme, "params": params,
+                                       "profile": get_setting("export_profile"), "reduced": reduced,
+                                       "workers": BATCH_WORKERS, "inputs": len(targets)})
+    results = queue.Queue()
 
-    # progress start
-    if hasattr(app, "right"):
-        app.right.set_progress(0, total, "Batch 0/{}".format(total))
-        app.right.progress_start("Batch...")  # indeterminate while we warm up
-        app.update_idletasks()
+    def worker():
+        try:
+            for item in iter_batch(targets, theme, params, outdir, cancel=token, workers=BATCH_WORKERS,
+                                   profile=profile, reduced=reduced):
+                results.put(item)
+        except Exception as e:  # the run itself failed (outdir, archive, scheduling), not one file
+            results.put(e)
+        finally:
+            results.put(None)  # sentinel: run finished, was cancelled or failed
 
-    try:
-        # switch to determinate after first item
-        for i, path in enumerate(targets, start=1):
+    app.batch_token = token
+    app.right.batch_started(stats.total)
+    threading.Thread(target=worker, daemon=True).start()
+
+    error = None
+
+    def poll():
+        nonlocal error
+        finished = False
+        while True:
             try:
-                img = load_bgr(path)
-                pipeline = get_pipeline(app.state.current_theme)
-                out = pipeline(img, **params)
-                base = os.path.splitext(os.path.basename(path))[0] + "_cyberpunk.png"
-                save_bgr(os.path.join(outdir, base), out)
-                ok += 1
-            except Exception:
-                fail += 1
-
-            if hasattr(app, "right"):
-                if i == 1:
-                    # stop spinner, show determinate
-                    app.right.progress_stop()
-                app.right.set_progress(i, total, "Batch {}/{}".format(i, total))
-                app.update_idletasks()
-    finally:
-        if hasattr(app, "right"):
-            app.right.progress_stop("Done")
-
-    messagebox.showinfo("Batch Done", f"Processed: {ok}\nFailed: {fail}\nSaved to: {outdir}")
+                item = results.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                finished = True
+                break
+            if isinstance(item, Exception):
+                error = f"{type(item).__name__}: {item}"
+                continue
+            stats.update(item)
+            report.add(item)
+            if not item.ok:
+                app.right.add_batch_failure(item.path, item.error)
+            app.right.set_progress(stats.done, stats.total, "Batch {}/{}".format(stats.done, stats.total))
+            app.right.set_batch_info(_format_rate(stats))
+
+        if not finished:
+            app.after(BATCH_POLL_MS, poll)
+            return
+
+        app.batch_token = None
+        cancelled = token.cancelled
+        report.finish(cancelled, error)
+        try:
+            report_txt = "\nReport: " + os.path.basename(report.save(default_report_path(outdir)))
+        except OSError as e:
+            report_txt = f"\nReport not saved: {e}"
+        summary = (f"Processed: {stats.ok}\nFailed: {stats.failed}\n"
+                   f"Skipped: {stats.total - stats.done}\nSaved to: {outdir}{report_txt}")
+        if error is not None:
+            app.right.batch_finished("Failed")
+            messagebox.showerror("Batch Failed", f"The batch stopped early:\n{error}\n\n{summary}")
+            return
+        app.right.batch_finished("Cancelled" if cancelled else "Done")
+        title = "Batch Cancelled" if cancelled else "Batch Done"
+        messagebox.showinfo(title, summary)
+
+    app.after(BATCH_POLL_MS, poll)
+
+
+def _format_rate(stats):
+    eta = stats.eta_seconds
+    eta_txt = "--:--" if eta is None else "{}:{:02d}".format(int(eta) // 60, int(eta) % 60)
+    return "{:.2f} img/s · ETA {}".format(stats.throughput, eta_txt)
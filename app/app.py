@@ -1,17 +1,51 @@
 # app/app.py
+import sys
+import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox
-import cv2
 
 from app.state import AppState
-from app.actions import do_open_image, do_choose_folder, do_save_image, do_process_batch
+from app.actions import do_open_image, do_choose_folder, do_save_image, do_process_batch, do_contact_sheet
 from ui.theme import apply_theme
 from ui.panels import LeftBrowserPanel, PreviewPanel, RightControls
-from processing.themes import get_pipeline
-from utils.image_io import load_bgr
+from app.history import ParamHistory
+from app.image_store import ImageEntry
+from app.prefetch import Prefetcher
+from app.speculative import SpeculativeRenderer, params_key
+from processing.stages import fast_paths_key, run_stages, split_tail, stage_params
+from processing.themes import get_pipeline, get_stages, resolve_theme
+from utils.catalog import Catalog, file_hash
+from utils.image_io import apply_orientation, load_reduced, make_proxy, resize_to_box
+from utils.render_cache import RenderCache, render_key
+from utils.settings import get_setting
+from utils.startup import mark, report, timed_import
 
 RIGHT_PANEL_WIDTH = 440
 RIGHT_PANEL_MINSIZE = 360  # keep controls visible
+WARM_MODULES = ("cv2", "processing.pipeline")  # imported in the background after the first paint
+FULL_RENDER_DELAY_MS = 250  # after showing a speculative proxy, wait this long before the full render
+ZOOMED_FULL_RENDER_DELAY_MS = 1500  # while zoomed in only the visible region renders at first
+DECODE_POLL_MS = 30  # progressive open: check for the finished full-resolution decode
+
+def _open_catalog():
+    """Folder catalog in the cache dir; the app works without one (plain listing)."""
+    try:
+        return Catalog()
+    except Exception:
+        return None
+
+
+def _open_render_cache():
+    """On-disk render cache (render_cache_mb > 0), or None; undo/redo still works without it."""
+    budget = get_setting("render_cache_mb")
+    if not budget:
+        return None
+    try:
+        return RenderCache(budget_mb=budget)
+    except Exception:
+        return None
+
 
 class CyberpunkApp(tk.Tk):
     def __init__(self):
@@ -22,6 +56,22 @@ class CyberpunkApp(tk.Tk):
 
         self.state = AppState()
         self.controls_visible = True  # sidebar visibility
+        self.batch_token = None  # CancelToken while a batch runs in the background
+        self.speculator = SpeculativeRenderer()
+        self.prefetcher = Prefetcher(self.state.store, depth=get_setting("prefetch_depth"))
+        self.catalog = _open_catalog()
+        self.catalog_hashing = None  # stop Event of the background content hashing (see do_choose_folder)
+        self.history = ParamHistory()
+        self.render_cache = _open_render_cache()
+        self._full_job = None  # pending after() id for a deferred full render
+        self._roi = None  # RoiRenderer for the current image while zoomed in
+        self._decode = None  # (path, Future[ImageEntry]) of a progressive open's full decode
+        self._hashing = None  # (entry, Future[str]) content hash of an entry opened without one
+        # one full-resolution decode at a time; queued ones are cancelled when the user moves on
+        self._decoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="full-decode")
+        # zoomed-in region renders (processing.roi), newest request only
+        self._region_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="region-render")
+        self._region_job = None  # (entry, rect, params key, Future) of the pending region render
 
         # LEFT: folder browser (keeps its own width)
         self.left = LeftBrowserPanel(
@@ -53,6 +103,8 @@ class CyberpunkApp(tk.Tk):
             on_batch=lambda: do_process_batch(self),
             on_theme=self.toggle_theme_mode,
             on_params_changed=self.refresh,
+            on_cancel_batch=self.cancel_batch,
+            on_contact_sheet=lambda: do_contact_sheet(self),
         )
         self.right.pack(fill=tk.BOTH, expand=True)
 
@@ -65,6 +117,29 @@ class CyberpunkApp(tk.Tk):
 
         # Ensure presets reflect current theme on launch
         self.right.reload_presets_for_theme()
+        self.history.record(self.state.current_theme, self.params())
+
+        for seq, action in (("<Control-z>", self.undo), ("<Control-y>", self.redo), ("<Control-Z>", self.redo)):
+            self.bind(seq, lambda _e, action=action: action())
+
+        self.after_idle(self._after_first_paint)
+
+    # ----- startup -----
+    def _after_first_paint(self):
+        self.update_idletasks()
+        mark("first paint")
+        threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
+
+    def _warm_up(self):
+        """Load OpenCV and the filters while the user picks an image (first render no longer pays it)."""
+        for name in WARM_MODULES:
+            try:
+                timed_import(name)
+            except Exception:
+                return  # the real import on first use reports the error
+        mark("filters loaded")
+        if get_setting("startup_report"):
+            print(report(), file=sys.stderr)
 
     # ----- initial sash placement -----
     def _set_initial_sash(self):
@@ -100,8 +175,37 @@ class CyberpunkApp(tk.Tk):
     def set_theme(self, theme: str):
         self.state.current_theme = theme
         self.right.reload_presets_for_theme()
-        self.right.reset_params()
-        self.refresh()
+        self.right.reset_params()  # emits the one refresh for this change
+
+    def cancel_batch(self):
+        if self.batch_token is not None:
+            self.batch_token.cancel()
+
+    def apply_variant(self, theme: str, preset: str):
+        """Switch to (theme, preset), e.g. from a contact sheet tile."""
+        if theme != self.state.current_theme:
+            self.state.current_theme = theme
+            self.right.theme_var.set(theme)
+            self.right.reload_presets_for_theme()
+        self.right.preset_var.set(preset)
+        self.right.apply_selected_preset()
+
+    # ----- Undo / redo -----
+    def undo(self):
+        self._restore(self.history.undo())
+
+    def redo(self):
+        self._restore(self.history.redo())
+
+    def _restore(self, state):
+        """Put the controls back to a history state; refresh() finds its render cached when it can."""
+        if state is None:
+            return
+        if state.theme != self.state.current_theme:
+            self.state.current_theme = state.theme
+            self.right.theme_var.set(state.theme)
+            self.right.reload_presets_for_theme()
+        self.right.set_params(state.params)
 
     # ----- Selection / Files -----
     def set_pick_mode(self, mode: str):
@@ -125,62 +229,331 @@ class CyberpunkApp(tk.Tk):
             self.left.toggle_row_check(path)
 
     def load_image(self, path: str):
+        """Show `path`; decoded pixels and the last render come from the image store when cached."""
+        self.prefetcher.cancel()  # the user jumped; old neighbours are no longer interesting
+        self._drop_decode()
+        self.cancel_region()
         try:
-            img = load_bgr(path)
+            entry = None if self.state.store.peek(path) else self._open_progressive(path)
+            entry = entry or self.state.store.get(path, hash_file=False)  # see _source_hash
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image:\n{e}")
             return
         self.state.current_path = path
-        self.state.original = img
+        self.state.entry = entry
+        self.speculator.clear()
+        self._roi = None
+        self.refresh()
+
+    def _open_progressive(self, path: str):
+        """
+        Partial entry from a reduced JPEG decode (proxy-sized) to show and
+        render right away, while the full-resolution decode runs on a
+        background thread (see _install_full_decode). None when the file does
+        not benefit (small image, not a JPEG).
+        """
+        quick = load_reduced(path)
+        if quick is None:
+            return None
+        proxy = make_proxy(quick[0])
+        self._decode = (path, self._decoder.submit(self.state.store.load, path))
+        self.after(DECODE_POLL_MS, self._poll_full_decode)
+        return ImageEntry(path, -1.0, proxy, proxy=proxy, partial=True)
+
+    def _drop_decode(self):
+        """Forget the pending full decode and content hash; ones that have not started yet never run."""
+        if self._decode is not None:
+            self._decode[1].cancel()
+            self._decode = None
+        if self._hashing is not None:
+            self._hashing[1].cancel()
+            self._hashing = None
+
+    def _poll_full_decode(self):
+        if self._decode is None:
+            return
+        if not self._decode[1].done():
+            self.after(DECODE_POLL_MS, self._poll_full_decode)
+            return
+        self._install_full_decode()
+
+    def _install_full_decode(self):
+        """
+        Swap the partial entry on screen for the full decode (waits for it).
+        Rotations made meanwhile are replayed, and the proxy with its render
+        carries over, so the preview does not change until the full render
+        replaces it.
+        """
+        path, fut = self._decode
+        self._decode = None
+        e = self.state.entry
+        if e is None or not e.partial or e.path != path:
+            return  # the user moved on
+        try:
+            full = fut.result()
+        except Exception as ex:
+            messagebox.showerror("Error", f"Failed to load image:\n{ex}")
+            return
+        if e.orientation:
+            full.orientation = e.orientation
+            full.original = apply_orientation(full.source, e.orientation)
+        # a partial entry's original is its proxy, so its last render is a proxy render
+        full.proxy, full.proxy_processed, full.proxy_processed_key = e.proxy, e.processed, e.processed_key
+        full.source_hash = e.source_hash or full.source_hash
+        self.state.store.put(full)
+        self.state.entry = full
+        self._roi = None
         self.refresh()
 
     # ----- Transform tools -----
     def _ensure_img(self):
-        return self.state.original is not None
+        return self.state.entry is not None
+
+    def _orient(self, op: str):
+        """
+        Apply a lossless rotation/flip. The source stays untouched; the op is
+        appended to entry.orientation and replayed on the derived images.
+        If the pre-tail render (body) is current, rotate it and re-run only the
+        orientation-sensitive tail stages instead of the whole pipeline.
+        """
+        if not self._ensure_img():
+            return
+        e = self.state.entry
+        e.orientation = e.orientation + (op,)
+        e.original = apply_orientation(e.original, (op,))
+        e.proxy = apply_orientation(e.proxy, (op,))
+        e.processed = e.processed_key = None
+        e.proxy_processed = e.proxy_processed_key = None
+        self.speculator.clear()
+
+        theme = self.state.current_theme
+        params = self.params()
+        key = params_key(theme, params)
+        if self._full_job is None and e.body is not None and e.body_key == key:
+            e.body = apply_orientation(e.body, (op,))
+            _, tail = split_tail(get_stages(theme))
+            full = stage_params(get_pipeline(theme), params)
+            e.processed = run_stages(tail, e.body, full, src=e.original)
+            e.processed_key = key
+            self.state.store.put(e)
+            self._remember(e)
+            self._show(e.original, e.processed)
+            return
+        e.body = e.body_key = None
+        self.refresh(params)
 
     def rotate_left(self):
-        if not self._ensure_img(): return
-        self.state.original = cv2.rotate(self.state.original, cv2.ROTATE_90_COUNTERCLOCKWISE)
-        self.refresh()
+        self._orient("rot90_ccw")
 
     def rotate_right(self):
-        if not self._ensure_img(): return
-        self.state.original = cv2.rotate(self.state.original, cv2.ROTATE_90_CLOCKWISE)
-        self.refresh()
+        self._orient("rot90_cw")
 
     def rotate_180(self):
-        if not self._ensure_img(): return
-        self.state.original = cv2.rotate(self.state.original, cv2.ROTATE_180)
-        self.refresh()
+        self._orient("rot180")
 
     def flip_h(self):
-        if not self._ensure_img(): return
-        self.state.original = cv2.flip(self.state.original, 1)
-        self.refresh()
+        self._orient("flip_h")
 
     def flip_v(self):
-        if not self._ensure_img(): return
-        self.state.original = cv2.flip(self.state.original, 0)
-        self.refresh()
+        self._orient("flip_v")
 
     # ----- Processing -----
     def params(self):
         return self.right.get_params()
 
-    def refresh(self, *_):
-        if self.state.original is None:
+    def refresh(self, params: dict | None = None):
+        """Re-render; `params` is the dict from a bulk update, else read from the controls."""
+        if params is None:
+            params = self.params()
+        self.history.record(self.state.current_theme, params)
+        e = self.state.entry
+        if e is None:
+            return
+        self.speculator.preempt()  # real input always wins over speculation / prefetch
+        self.prefetcher.cancel()
+        self._cancel_full_render()
+
+        key = params_key(self.state.current_theme, params)
+        if e.processed is not None and e.processed_key == key:
+            self._show(e.original, e.processed)  # e.g. revisiting a cached image
+            self.after_idle(self._after_render)
+            return
+
+        hit = e.proxy_processed if e.proxy_processed_key == key else None  # prefetched neighbour
+        if hit is None:
+            hit = self.speculator.lookup(self.state.current_theme, params)
+        if hit is None:
+            hit = self._cached_render(e, key, "proxy")  # e.g. stepping back through history
+        if hit is not None:
+            # show the precomputed proxy now, replace it once the user pauses
+            self._show(e.proxy, hit)
+            self._full_job = self.after(FULL_RENDER_DELAY_MS, self._render_full, params)
+            return
+        if self.preview.zoomed:
+            # render just the visible region now, the whole image once the user pauses
+            self.preview.refresh_region()
+            self._full_job = self.after(ZOOMED_FULL_RENDER_DELAY_MS, self._render_full, params)
+            return
+        self._render_full(params)
+
+    def flush_render(self):
+        """Make sure entry.processed matches the current params (e.g. before saving)."""
+        if self._decode is not None:
+            self._install_full_decode()  # a partial entry only has proxy pixels
+        if self._full_job is not None:
+            self._cancel_full_render()
+            self._render_full(self.params())
+
+    def _cancel_full_render(self):
+        if self._full_job is not None:
+            self.after_cancel(self._full_job)
+            self._full_job = None
+
+    def _render_full(self, params: dict):
+        self._full_job = None
+        e = self.state.entry
+        if e is None:
             return
         # start spinner for single render
         if hasattr(self, "right"):
             self.right.progress_start("Processing...")
         try:
-            pipeline = get_pipeline(self.state.current_theme)
-            self.state.processed = pipeline(self.state.original, **self.params())
+            # keep the pre-tail result around for the rotate/flip fast path
+            theme = self.state.current_theme
+            body, tail = split_tail(get_stages(theme))
+            full = stage_params(get_pipeline(theme), params)
+            key = params_key(theme, params)
+            cached = None if e.partial else self._cached_render(e, key, "full")
+            if cached is not None:
+                e.processed, e.processed_key = cached, key
+            else:
+                e.body, e.body_key = run_stages(body, e.original, full), key
+                e.processed, e.processed_key = run_stages(tail, e.body, full, src=e.original), key
+                self._remember(e)
+            self.state.store.put(e)
         finally:
             if hasattr(self, "right"):
                 self.right.progress_stop("Ready")
+            self.history.settled()
+
+        self._show(e.original, e.processed)
+        self.after_idle(self._after_render)
+
+    # ----- On-disk render cache -----
+    def _render_cache_key(self, e, key: tuple, kind: str):
+        if self.render_cache is None or self._source_hash(e) is None:
+            return None
+        return render_key(e.source_hash, e.orientation, key, kind, fast_paths_key(get_stages(key[0])))
+
+    def _source_hash(self, e):
+        """
+        e.source_hash without reading the file on this thread: from the catalog
+        if it has a current one, else None while the decode worker hashes the
+        file (a progressive open's full decode brings it along).
+        """
+        if e.source_hash is None and self.catalog is not None:
+            e.source_hash = self.catalog.stored_hash(e.path)
+        if e.source_hash is None and not e.partial and (self._hashing is None or self._hashing[0] is not e):
+            self._hashing = (e, self._decoder.submit(file_hash, e.path))
+            self.after(DECODE_POLL_MS, self._poll_source_hash)
+        return e.source_hash
+
+    def _poll_source_hash(self):
+        if self._hashing is None:
+            return
+        e, fut = self._hashing
+        if not fut.done():
+            self.after(DECODE_POLL_MS, self._poll_source_hash)
+            return
+        self._hashing = None
+        e.source_hash = fut.result()
+        if e.source_hash is not None:
+            self._remember(e)  # the render made while the hash was pending
+
+    def _cached_render(self, e, key: tuple, kind: str):
+        """
+        Render of `e` for params `key` from the disk cache: "full" at e.original's
+        size, "proxy" scaled to e.proxy (a progressive open's proxy can be a few
+        pixels off). None on a miss.
+        """
+        ckey = self._render_cache_key(e, key, kind)
+        img = None if ckey is None else self.render_cache.get(ckey)
+        if img is None:
+            return None
+        want = e.original if kind == "full" else e.proxy
+        if img.shape[:2] == want.shape[:2]:
+            return img
+        return None if kind == "full" else resize_to_box(img, want.shape[1], want.shape[0])
+
+    def _remember(self, e):
+        """Queue e.processed (and a proxy-sized copy) for the disk cache."""
+        if e.partial or e.processed is None:
+            return
+        full_key = self._render_cache_key(e, e.processed_key, "full")
+        if full_key is None:
+            return
+        self.render_cache.put_async(full_key, e.processed)
+        self.render_cache.put_async(self._render_cache_key(e, e.processed_key, "proxy"), make_proxy(e.processed))
+
+    def _after_render(self):
+        """Idle-time background work once the on-screen render is current."""
+        e = self.state.entry
+        if not hasattr(self, "right") or self._full_job is not None or e is None:
+            return
+        theme = self.state.current_theme
+        self.speculator.schedule(e.proxy, theme, self.right.neighbor_params())
+        if self.state.pick_mode in ("single", "folder") and self.left.files and not e.partial:
+            self.prefetcher.schedule(self.left.files, e.path, theme, self.params())
+
+    def render_region(self, x0: int, y0: int, x1: int, y1: int, done):
+        """
+        Full-resolution (original, processed) crops of the current image for
+        the zoomed preview, with the current params, passed to done() on the
+        Tk thread. Cut from entry.processed when it is current; otherwise
+        rendered on their own (processing.roi) on the region worker, and
+        dropped if the image or params change or another region is asked for
+        meanwhile.
+        """
+        self.cancel_region()
+        e = self.state.entry
+        if e is None:
+            return
+        theme = self.state.current_theme
+        params = self.params()
+        key = params_key(theme, params)
+        orig = e.original[y0:y1, x0:x1]
+        if e.processed is not None and e.processed_key == key:
+            done(orig, e.processed[y0:y1, x0:x1])
+            return
+        from processing.roi import RoiRenderer  # pulls in the filter stack; only needed once zoomed
+        if self._roi is None or self._roi.source is not e.original or self._roi.theme != resolve_theme(theme):
+            self._roi = RoiRenderer(e.original, theme)
+        rect = (x0, y0, x1, y1)
+        job = (e, rect, key, self._region_worker.submit(self._roi.render, params, rect))
+        self._region_job = job
+        job[3].add_done_callback(lambda _: self.after(0, self._region_rendered, job, orig, done))
+
+    def _region_rendered(self, job, orig, done):
+        if self._region_job is not job:
+            return  # cancelled or superseded
+        self._region_job = None
+        e, _, key, fut = job
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        if self.state.entry is not e or params_key(self.state.current_theme, self.params()) != key:
+            return
+        done(orig, fut.result())
+
+    def cancel_region(self):
+        """Drop the pending region render; one that has not started yet never runs."""
+        if self._region_job is not None:
+            self._region_job[3].cancel()
+            self._region_job = None
 
+    def _show(self, orig, proc):
+        full = self.state.entry.original if self.state.entry is not None else orig
+        self.preview.set_region_source(self.render_region, (full.shape[1], full.shape[0]), self.cancel_region)
         if hasattr(self.preview, "mode") and self.preview.mode.get() == "side":
-            self.preview.show_side(self.state.original, self.state.processed)
+            self.preview.show_side(orig, proc)
         else:
-            self.preview.show_slider(self.state.original, self.state.processed)
+            self.preview.show_slider(orig, proc)
@@ -0,0 +1,103 @@
+# app/history.py
+import time
+from dataclasses import dataclass
+from typing import FrozenSet, List, Optional
+
+from app.speculative import params_key
+
+HISTORY_LIMIT = 200      # states kept for undo
+HISTORY_MERGE_S = 0.8    # changes to the same control closer together than this form one step
+
+
+@dataclass
+class HistoryState:
+    theme: str
+    params: dict
+    key: tuple                 # params_key(theme, params)
+    changed: FrozenSet[str]    # what differs from the state before ("theme" and/or param names)
+    at: float                  # time.monotonic() of the last change merged into (or render of) this state
+
+
+def _changed(a: HistoryState, theme: str, params: dict) -> FrozenSet[str]:
+    keys = {k for k in set(a.params) | set(params) if a.params.get(k) != params.get(k)}
+    if a.theme != theme:
+        keys.add("theme")
+    return frozenset(keys)
+
+
+class ParamHistory:
+    """
+    Undo/redo over (theme, params). record() is called with every state the
+    controls settle on; a slider drag (the same control changed again within
+    HISTORY_MERGE_S of the last change or of its render finishing, see
+    settled()) becomes one step. Recording after an undo drops the redo
+    branch. Re-recording the current state is a no-op, so restoring a state
+    through the controls does not add a step.
+    """
+
+    def __init__(self, limit: int = HISTORY_LIMIT, merge_seconds: float = HISTORY_MERGE_S):
+        self.limit = max(2, int(limit))
+        self.merge_seconds = merge_seconds
+        self._states: List[HistoryState] = []
+        self._pos = -1
+        self._live = False  # the current state came from record(), not undo/redo (may absorb a drag)
+
+    @property
+    def current(self) -> Optional[HistoryState]:
+        return self._states[self._pos] if self._states else None
+
+    def can_undo(self) -> bool:
+        return self._pos > 0
+
+    def can_redo(self) -> bool:
+        return self._pos < len(self._states) - 1
+
+    def record(self, theme: str, params: dict, now: Optional[float] = None) -> bool:
+        """Add (or merge) a state; False if it is the current one."""
+        key = params_key(theme, params)
+        top = self.current
+        if top is not None and top.key == key:
+            return False
+        now = time.monotonic() if now is None else now
+        params = dict(params)
+        if top is None:
+            self._states, self._pos = [HistoryState(theme, params, key, frozenset(), now)], 0
+            self._live = True
+            return True
+        del self._states[self._pos + 1:]
+        changed = _changed(top, theme, params)
+        self._live, live = True, self._live
+        if (live and self._pos > 0 and changed == top.changed and "theme" not in changed
+                and now - top.at < self.merge_seconds):
+            prev = self._states[self._pos - 1]
+            if prev.key == key:  # dragged back to where it started
+                self._states.pop()
+                self._pos -= 1
+            else:
+                self._states[self._pos] = HistoryState(theme, params, key, changed, now)
+            return True
+        self._states.append(HistoryState(theme, params, key, changed, now))
+        if len(self._states) > self.limit:
+            del self._states[0]
+        self._pos = len(self._states) - 1
+        return True
+
+    def settled(self, now: Optional[float] = None):
+        """The current state finished rendering; a slow render does not split a drag into steps."""
+        if self.current is not None:
+            self.current.at = time.monotonic() if now is None else now
+
+    def undo(self) -> Optional[HistoryState]:
+        """The state to restore, or None at the oldest one."""
+        if not self.can_undo():
+            return None
+        self._pos -= 1
+        self._live = False
+        return self._states[self._pos]
+
+    def redo(self) -> Optional[HistoryState]:
+        if not self.can_redo():
+            return None
+        self._pos += 1
+        self._live = False
+        return self._states[self._pos]
@@ -0,0 +1,134 @@
+# app/image_store.py
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from utils.catalog import file_hash
+from utils.image_io import load_bgr, make_proxy
+
+
+@dataclass
+class ImageEntry:
+    """A decoded image plus whatever has been derived from it so far."""
+    path: str
+    mtime: float
+    source: np.ndarray                          # BGR, as decoded (orientation not applied)
+    orientation: Tuple[str, ...] = ()           # lazy rotate/flip ops, see utils.image_io.ORIENT_OPS
+    original: Optional[np.ndarray] = None       # BGR, source with orientation applied
+    proxy: Optional[np.ndarray] = None          # BGR, original downscaled for interactive previews
+    body: Optional[np.ndarray] = None           # render before the orientation-sensitive tail stages
+    body_key: Optional[tuple] = None            # (theme, params) the body was rendered with
+    processed: Optional[np.ndarray] = None      # BGR, last full render
+    processed_key: Optional[tuple] = None       # (theme, params) of `processed`
+    proxy_processed: Optional[np.ndarray] = None  # render of `proxy` (e.g. prefetched)
+    proxy_processed_key: Optional[tuple] = None
+    partial: bool = False                       # progressive-open stand-in: source is only proxy-sized
+    source_hash: Optional[str] = None           # file content hash (render cache key), see ImageStore.load
+
+    def __post_init__(self):
+        if self.original is None:
+            self.original = self.source
+        if self.proxy is None:
+            self.proxy = make_proxy(self.original)
+
+    def nbytes(self) -> int:
+        seen, total = set(), 0
+        for arr in (self.source, self.original, self.proxy, self.body, self.processed, self.proxy_processed):
+            if arr is not None and id(arr) not in seen:
+                seen.add(id(arr))
+                total += arr.nbytes
+        return total
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return -1.0
+
+
+class ImageStore:
+    """
+    LRU of ImageEntry keyed by (path, mtime) with a total byte budget.
+    The most recently used entry is never evicted, so the image on screen
+    stays even if it alone exceeds the budget. Thread-safe.
+    """
+
+    def __init__(self, budget_mb: float = 1024):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # abspath -> ImageEntry
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def peek(self, path: str) -> Optional[ImageEntry]:
+        """Cached entry if it is still current on disk; never decodes."""
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry.mtime != _mtime(path):
+            self.discard(path)
+            return None
+        return entry
+
+    def get(self, path: str, recent: bool = True, hash_file: bool = True) -> ImageEntry:
+        """Cached entry, decoding the file on a miss; see put() for `recent`, load() for `hash_file`."""
+        entry = self.peek(path)
+        if entry is None:
+            entry = self.load(path, hash_file)
+        self.put(entry, recent=recent)
+        return entry
+
+    @staticmethod
+    def load(path: str, hash_file: bool = True) -> ImageEntry:
+        """
+        Decode `path` into a new entry without caching it (e.g. on a background
+        thread). hash_file=False leaves source_hash to the caller (a second
+        read of the file).
+        """
+        mtime = _mtime(path)
+        return ImageEntry(path, mtime, load_bgr(path), source_hash=file_hash(path) if hash_file else None)
+
+    def put(self, entry: ImageEntry, recent: bool = True):
+        """
+        Insert or re-account an entry (call again after attaching renders).
+        recent=False (prefetch) files it just behind the most recent entry,
+        so it never displaces the image on screen.
+        Partial (progressive-open) entries are not cached.
+        """
+        if entry.partial:
+            return
+        key = os.path.abspath(entry.path)
+        with self._lock:
+            mru = next(reversed(self._entries), None)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if not recent and mru is not None and mru != key:
+                self._entries.move_to_end(mru)
+            self._sizes[key] = entry.nbytes()
+            self._evict()
+
+    def discard(self, path: str):
+        key = os.path.abspath(path)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._sizes.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        while total > self.budget and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            total -= self._sizes.pop(key)
@@ -0,0 +1,77 @@
+# app/prefetch.py
+import threading
+from typing import Sequence
+
+from app.image_store import ImageStore
+from app.speculative import params_key
+from processing.stages import CancelToken, RenderCancelled, run_stages, stage_params
+from processing.themes import get_pipeline, get_stages
+
+
+def neighbor_order(paths: Sequence[str], current: str, depth: int):
+    """Paths around `current` nearest first: next, previous, next+1, ..."""
+    try:
+        i = list(paths).index(current)
+    except ValueError:
+        return []
+    out = []
+    for d in range(1, max(0, int(depth)) + 1):
+        for j in (i + d, i - d):
+            if 0 <= j < len(paths):
+                out.append(paths[j])
+    return out
+
+
+class Prefetcher:
+    """
+    Decodes the folder neighbours of the image on screen into the ImageStore
+    and renders their proxies with the current theme/params, on a background
+    thread. Each schedule() cancels the previous round (the user jumped).
+    """
+
+    def __init__(self, store: ImageStore, depth: int = 1):
+        self.store = store
+        self.depth = depth
+        self._token = CancelToken()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self._token.cancel()
+
+    def schedule(self, paths: Sequence[str], current: str, theme: str, params: dict):
+        order = neighbor_order(paths, current, self._depth_within_budget(current))
+        with self._lock:
+            self._token.cancel()
+            token = self._token = CancelToken()
+        if order:
+            threading.Thread(target=self._run, args=(order, theme, dict(params), token), daemon=True).start()
+
+    def _depth_within_budget(self, current: str) -> int:
+        # keep the prefetch window to about half the cache, sized like the current image
+        entry = self.store.peek(current)
+        per_image = entry.nbytes() if entry is not None else 0
+        if per_image <= 0:
+            return self.depth
+        return max(0, min(self.depth, self.store.budget // (4 * per_image)))
+
+    def _run(self, order, theme, params, token):
+        stages = get_stages(theme)
+        full = stage_params(get_pipeline(theme), params)
+        key = params_key(theme, params)
+        for path in order:
+            if token.cancelled:
+                return
+            try:
+                entry = self.store.get(path, recent=False)
+                if key in (entry.processed_key, entry.proxy_processed_key):
+                    continue
+                out = run_stages(stages, entry.proxy, full, cancel=token)
+            except RenderCancelled:
+                return
+            except Exception:
+                continue  # unreadable neighbour: the UI reports it if the user opens it
+            if token.cancelled:
+                return
+            entry.proxy_processed, entry.proxy_processed_key = out, key
+            self.store.put(entry, recent=False)
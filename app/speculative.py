@@ -0,0 +1,95 @@
+# app/speculative.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from processing.stages import CancelToken, RenderCancelled, run_stages, stage_params
+from processing.themes import get_pipeline, get_stages
+
+SPECULATIVE_CAPACITY = 8      # cached proxy renders
+SPECULATIVE_CPU_BUDGET = 0.6  # CPU seconds per idle round
+
+
+def params_key(theme: str, params: dict) -> tuple:
+    """Hashable key; floats rounded so 1.25 and 1.2500000001 (Tk) match."""
+    items = []
+    for k, v in sorted(params.items()):
+        items.append((k, round(v, 6) if isinstance(v, float) else v))
+    return (theme, tuple(items))
+
+
+class SpeculativeRenderer:
+    """
+    Idle-time proxy renders of likely next parameter sets (e.g. one slider
+    step either way). Work runs on a background thread, is dropped as soon as
+    preempt() is called, and stops once a round has used its CPU budget.
+    Never touches Tk; the UI only calls lookup()/schedule()/preempt().
+    """
+
+    def __init__(self, capacity: int = SPECULATIVE_CAPACITY, cpu_budget: float = SPECULATIVE_CPU_BUDGET):
+        self.capacity = capacity
+        self.cpu_budget = cpu_budget
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._token = CancelToken()
+        self._generation = 0
+
+    def lookup(self, theme: str, params: dict):
+        key = params_key(theme, params)
+        with self._lock:
+            img = self._cache.get(key)
+            if img is not None:
+                self._cache.move_to_end(key)
+            return img
+
+    def preempt(self):
+        """Stop in-flight speculation (between stages) and discard its results."""
+        with self._lock:
+            self._generation += 1
+            self._token.cancel()
+
+    def clear(self):
+        """Forget everything, e.g. when the source image changes."""
+        self.preempt()
+        with self._lock:
+            self._cache.clear()
+
+    def schedule(self, proxy, theme: str, candidates: Sequence[dict]):
+        if proxy is None or not candidates:
+            return
+        self.preempt()
+        with self._lock:
+            token = self._token = CancelToken()
+            generation = self._generation
+        threading.Thread(
+            target=self._run, args=(proxy, theme, list(candidates), token, generation), daemon=True
+        ).start()
+
+    def _run(self, proxy, theme, candidates, token, generation):
+        stages = get_stages(theme)
+        pipeline = get_pipeline(theme)
+        cpu0 = time.thread_time()
+        for params in candidates:
+            if token.cancelled or time.thread_time() - cpu0 > self.cpu_budget:
+                return
+            key = params_key(theme, params)
+            with self._lock:
+                if key in self._cache:
+                    continue
+            try:
+                out = run_stages(stages, proxy, stage_params(pipeline, params), cancel=token)
+            except RenderCancelled:
+                return
+            except Exception:
+                continue
+            self._store(key, out, generation)
+
+    def _store(self, key, img, generation: Optional[int]):
+        with self._lock:
+            if generation != self._generation:
+                return  # preempted while rendering
+            self._cache[key] = img
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
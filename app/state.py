@@ -1,19 +1,20 @@
 # app/state.py
 from dataclasses import dataclass, field
-from typing import Optional, Set, Dict
-import numpy as np
+from typing import Optional, Set
+
+from app.image_store import ImageEntry, ImageStore
+from utils.settings import get_setting
 
 @dataclass
 class AppState:
-    original: Optional[np.ndarray] = None  # BGR
-    processed: Optional[np.ndarray] = None # BGR
+    # decoded images (+ proxies / renders) by path; `entry` is the one on screen
+    store: ImageStore = field(default_factory=lambda: ImageStore(get_setting("cache_budget_mb")))
+    entry: Optional[ImageEntry] = None
 
     current_path: Optional[str] = None
     current_folder: Optional[str] = None
     multiselect: Set[str] = field(default_factory=set)
 
-    thumb_cache: Dict[str, object] = field(default_factory=dict)
-
     preview_mode: str = "side"        # 'side' or 'slider'
     pick_mode: str = "single"         # 'single' | 'multi' | 'folder'
     dark_mode: bool = False
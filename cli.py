@@ -0,0 +1,242 @@
+# Headless entry point — `python cli.py <command> --help`
+import argparse
+import os
+import time
+
+
+def _cmd_serve(args):
+    from processing.service import serve
+    serve(host=args.host, port=args.port, workers=args.workers)
+
+
+def _cmd_watch(args):
+    from processing.stages import CancelToken
+    from processing.watch import HotFolder
+    from utils.presets import get_preset
+
+    hot = HotFolder(args.indir, args.outdir, theme=args.theme, params=get_preset(args.theme, args.preset),
+                    workers=args.workers, interval=args.interval, settle=args.settle)
+    print(f"Watching {hot.indir} -> {hot.outdir} ({hot.theme} / {args.preset}, {hot.workers} workers)")
+
+    def report(item):
+        status = "ok" if item.ok else f"FAILED {item.error}"
+        print(f"{os.path.basename(item.path)}: {status} ({item.seconds:.2f}s)", flush=True)
+
+    cancel = CancelToken()
+    try:
+        hot.run(cancel=cancel, progress=report, once=args.once)
+    except KeyboardInterrupt:
+        cancel.cancel()
+
+
+def _cmd_sequence(args):
+    from processing.sequence import FrameWriter, iter_sequence, read_frames, source_fps
+    from utils.presets import get_preset
+
+    names = {}
+
+    def frames():
+        for i, (name, frame) in enumerate(read_frames(args.source)):
+            names[i] = name
+            yield frame
+
+    writer = FrameWriter(args.target, fps=args.fps or source_fps(args.source))
+    t0 = time.perf_counter()
+    count = 0
+    try:
+        for i, out in iter_sequence(frames(), args.theme, get_preset(args.theme, args.preset),
+                                    workers=args.workers, palette=args.palette,
+                                    shot_threshold=args.shot_threshold, glitch_hold=args.glitch_hold):
+            writer.write(names.pop(i), out)
+            count += 1
+    finally:
+        writer.close()
+    el = time.perf_counter() - t0
+    print(f"{count} frames in {el:.1f}s ({count / el if el > 0 else 0:.2f} fps) -> {args.target}")
+
+
+def _collect_inputs(paths):
+    from utils.image_io import list_images_in_folder
+    out = []
+    for p in paths:
+        out.extend(list_images_in_folder(p) if os.path.isdir(p) else [p])
+    return out
+
+
+def _parse_variant(text):
+    theme, _, preset = text.partition(":")
+    return theme.strip(), preset.strip() or "Default"
+
+
+def _cmd_batch(args):
+    from processing.archive import ArchiveSink
+    from processing.batch import BatchStats, iter_fanout
+    from processing.contact_sheet import variant_for
+    from processing.export import get_profile
+    from processing.report import BatchReport, default_report_path
+
+    targets = _collect_inputs(args.inputs)
+    variants = [variant_for(*_parse_variant(v)) for v in (args.variant or ["Cyberpunk:Default"])]
+    profile = get_profile(args.profile) if args.profile else None
+    os.makedirs(args.outdir, exist_ok=True)
+    sink = ArchiveSink(os.path.join(args.outdir, args.archive), args.shard_size) if args.archive else None
+    stats = BatchStats(len(targets) * len(variants) * len(profile or (None,)))
+    report = BatchReport(stats.total, {"command": "batch", "variants": [f"{v.theme}:{v.preset}" for v in variants],
+                                       "profile": args.profile, "reduced": args.reduced, "workers": args.workers,
+                                       "inputs": len(targets)})
+    try:
+        for item in iter_fanout(targets, variants, args.outdir, workers=args.workers,
+                                profile=profile, reduced=args.reduced, budget_mb=args.memory_mb,
+                                recycle_after=args.recycle_after, sink=sink):
+            stats.update(item)
+            report.add(item)
+            if not item.ok:
+                print(f"{os.path.basename(item.path)}: FAILED {item.error}", flush=True)
+    except KeyboardInterrupt:
+        report.finish(cancelled=True)
+        raise
+    except Exception as e:
+        report.finish(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        if sink is not None:
+            sink.close()
+        if report.elapsed is None:
+            report.finish()
+        print(f"report: {report.save(args.report or default_report_path(args.outdir))}")
+    print(f"{stats.ok} written, {stats.failed} failed in {stats.elapsed:.1f}s "
+          f"({len(targets)} files x {len(variants)} variants x {len(profile or (None,))} sizes) -> "
+          f"{sink.path if sink and not sink.shard_size else args.outdir}")
+
+
+def _cmd_report_diff(args):
+    from processing.report import compare_reports, load_report
+
+    rows = compare_reports(load_report(args.baseline), load_report(args.candidate))
+
+    def fmt(v):
+        return "-" if v is None else f"{v:.4g}"
+
+    print(f"{'metric':32} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for label, a, b, change, worse in rows:
+        pct = "-" if change is None else f"{change:+.1f}%"
+        print(f"{label[:32]:32} {fmt(a):>10} {fmt(b):>10} {pct:>8}{'  worse' if worse else ''}")
+    drop = next(change for label, _, _, change, _ in rows if label == "outputs/s")
+    if args.max_drop is not None and drop is not None and drop < -args.max_drop:
+        print(f"throughput dropped {-drop:.1f}% (more than {args.max_drop:g}%)")
+        return 1
+    return 0
+
+
+def _cmd_verify(args):
+    from processing.themes import THEME_NAMES
+    from processing.verify import END_TO_END, FAST_PATHS, Tolerance, verify
+    from utils.presets import get_preset
+
+    names = args.stage or list(FAST_PATHS)
+    unknown = [n for n in names if n not in FAST_PATHS]
+    if unknown or not names:
+        print(f"No fast path for: {', '.join(unknown) or '(none registered)'}; known: {', '.join(FAST_PATHS)}")
+        return 2
+    tol = Tolerance(args.min_psnr, args.min_ssim, args.max_abs)
+    stage_tol = Tolerance(args.stage_min_psnr, args.stage_min_ssim, args.stage_max_abs)
+    failed = count = 0
+    for c in verify(_collect_inputs(args.inputs), args.theme or THEME_NAMES, lambda t: get_preset(t, args.preset),
+                    impls={n: FAST_PATHS[n] for n in names}, tol=tol, stage_tol=stage_tol,
+                    max_side=args.max_side, repeat=args.repeat):
+        count += 1
+        failed += not c.ok
+        label = "end-to-end" if c.stage == END_TO_END else c.stage
+        print(f"{os.path.basename(c.image)[:28]:28} {c.theme:13} {label:12} PSNR {c.psnr:6.2f} dB  "
+              f"SSIM {c.ssim:.4f}  max {c.max_abs:3d}  {c.ref_seconds * 1000:8.1f} -> {c.fast_seconds * 1000:8.1f} ms"
+              f"  x{c.speedup:5.2f}  seed {c.seed_psnr:6.2f} dB  {'ok' if c.ok else 'FAIL ' + '; '.join(c.violations)}", flush=True)
+    print(f"{count - failed}/{count} comparisons within tolerance ({', '.join(names)})")
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Pixel Alchemy Studio (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("serve", help="run the local render service (warm worker pool)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--workers", type=int, default=None, help="worker processes (default: cores - 1)")
+    p.set_defaults(func=_cmd_serve)
+
+    p = sub.add_parser("batch", help="render files/folders with one or more theme:preset variants")
+    p.add_argument("inputs", nargs="+", help="image files and/or folders")
+    p.add_argument("-o", "--outdir", required=True)
+    p.add_argument("--variant", action="append", metavar="THEME:PRESET",
+                   help="repeatable, e.g. --variant Cyberpunk:'Punchy Neon' --variant Ghibli:Default")
+    p.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    p.add_argument("--profile", help="export profile, e.g. master+web+thumb (default: one PNG per variant)")
+    p.add_argument("--reduced", action="store_true",
+                   help="render at the largest profile size when the profile has no full-size output")
+    p.add_argument("--memory-mb", type=float, default=None,
+                   help="RAM the running jobs may use together (default: settings, else half of RAM; 0 = no limit)")
+    p.add_argument("--recycle-after", type=int, default=None,
+                   help="render in worker processes, each replaced after N files (default: settings, 0 = threads)")
+    p.add_argument("--archive", metavar="NAME.tar|NAME.zip",
+                   help="stream outputs into this archive in OUTDIR (plus NAME.index.jsonl) instead of files")
+    p.add_argument("--shard-size", type=int, default=0,
+                   help="with --archive: start a new archive every N outputs (NAME-00000.tar, ...)")
+    p.add_argument("--report", help="JSON run report path (default: OUTDIR/batch-report-<time>.json)")
+    p.set_defaults(func=_cmd_batch)
+
+    p = sub.add_parser("report-diff", help="compare two batch reports (throughput, latency, time per step)")
+    p.add_argument("baseline")
+    p.add_argument("candidate")
+    p.add_argument("--max-drop", type=float, default=None, metavar="PCT",
+                   help="exit 1 if outputs/s of the candidate is more than PCT%% below the baseline")
+    p.set_defaults(func=_cmd_report_diff)
+
+    p = sub.add_parser("watch", help="render new/changed images dropped into a folder")
+    p.add_argument("indir")
+    p.add_argument("outdir")
+    p.add_argument("--theme", default="Cyberpunk")
+    p.add_argument("--preset", default="Default")
+    p.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    p.add_argument("--interval", type=float, default=1.0, help="seconds between folder polls")
+    p.add_argument("--settle", type=float, default=2.0, help="seconds a file must stay unchanged before it is read")
+    p.add_argument("--once", action="store_true", help="process what is there now, then exit")
+    p.set_defaults(func=_cmd_watch)
+
+    p = sub.add_parser("sequence", help="render a frame folder or video, reusing palettes between frames")
+    p.add_argument("source", help="folder of frames (sorted by name) or a video file")
+    p.add_argument("target", help="output folder (PNG frames) or video file (.mp4, .avi, ...)")
+    p.add_argument("--theme", default="Cyberpunk")
+    p.add_argument("--preset", default="Default")
+    p.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    p.add_argument("--palette", choices=("lock", "warm", "off"), default="lock",
+                   help="k-means palette per shot (lock), seeded from the previous frame (warm), or per frame (off)")
+    p.add_argument("--shot-threshold", type=float, default=30.0, help="thumbnail difference that starts a new shot")
+    p.add_argument("--glitch-hold", type=int, default=1, help="frames per glitch pattern (0 = one pattern)")
+    p.add_argument("--fps", type=float, default=None, help="output video fps (default: source fps or 24)")
+    p.set_defaults(func=_cmd_sequence)
+
+    p = sub.add_parser("verify", help="check fast stage implementations against the reference on a corpus")
+    p.add_argument("inputs", nargs="+", help="image files and/or folders")
+    p.add_argument("--theme", action="append", help="repeatable (default: every theme with a fast path)")
+    p.add_argument("--preset", default="Default")
+    p.add_argument("--stage", action="append", help="fast path to check, repeatable (default: all registered)")
+    p.add_argument("--min-psnr", type=float, default=35.0, help="end-to-end PSNR floor in dB")
+    p.add_argument("--min-ssim", type=float, default=0.97, help="end-to-end SSIM floor")
+    p.add_argument("--max-abs", type=int, default=None, help="end-to-end largest channel difference")
+    p.add_argument("--stage-min-psnr", type=float, default=35.0)
+    p.add_argument("--stage-min-ssim", type=float, default=0.97)
+    p.add_argument("--stage-max-abs", type=int, default=None)
+    p.add_argument("--max-side", type=int, default=0, help="downscale inputs to this longest side first")
+    p.add_argument("--repeat", type=int, default=1, help="runs per timing (best is kept)")
+    p.set_defaults(func=_cmd_verify)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,10 @@
 # Entry point — tiny and authentic
+from utils.startup import mark  # first import: starts the startup clock
 from app.app import CyberpunkApp
 
+mark("app modules imported")
+
 if __name__ == "__main__":
     app = CyberpunkApp()
+    mark("window built")
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,64 @@
+# processing/admission.py
+import os
+from typing import Optional, Sequence
+
+from utils.catalog import header_size
+from utils.settings import get_setting
+from .themes import resolve_theme
+
+MB = 1024 * 1024
+
+# Peak memory of one render above the idle process, per input pixel: decode,
+# float work buffers, stage outputs and the PNG encode. Measured with
+# ru_maxrss at 1.9 MP and 12 MP (the fixed part is JOB_OVERHEAD).
+THEME_PEAK_BPP = {
+    "Cyberpunk": 48,
+    "Ghibli": 74,
+    "Mughal Art": 38,
+    "Hand Painting": 130,
+}
+DEFAULT_PEAK_BPP = 130           # themes without a measurement
+JOB_OVERHEAD = 96 * MB           # per running job, independent of size
+UNKNOWN_PIXELS = 24_000_000      # header unreadable: assume a large photo
+
+
+def estimate_peak_bytes(pixels: int, themes: Sequence[str], outputs: int = 1) -> int:
+    """
+    Estimated peak memory for rendering an image of `pixels` with each of
+    `themes` in turn (a fan-out job), keeping `outputs` finished renders of
+    3 bytes per pixel until they are written.
+    """
+    bpp = max((THEME_PEAK_BPP.get(resolve_theme(t), DEFAULT_PEAK_BPP) for t in themes), default=DEFAULT_PEAK_BPP)
+    return JOB_OVERHEAD + int(pixels) * (bpp + 3 * max(0, outputs - 1))
+
+
+def render_pixels(path: str, max_side: Optional[int] = None) -> int:
+    """Pixel count the render will have, from the file header (no decode); max_side = reduced input."""
+    w, h = header_size(path)
+    if not w or not h:
+        return UNKNOWN_PIXELS
+    if max_side and max(w, h) > max_side:
+        scale = max_side / float(max(w, h))
+        w, h = w * scale, h * scale
+    return int(w * h)
+
+
+def physical_memory() -> Optional[int]:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None  # not POSIX
+
+
+def memory_budget(budget_mb: Optional[float] = None) -> Optional[int]:
+    """
+    Bytes batch jobs may use at once: `budget_mb`, else settings
+    "batch_memory_mb", else half of physical memory. 0 (or unknown RAM)
+    means no limit (None).
+    """
+    if budget_mb is None:
+        budget_mb = get_setting("batch_memory_mb")
+    if budget_mb is None:
+        total = physical_memory()
+        return total // 2 if total else None
+    return int(float(budget_mb) * MB) or None
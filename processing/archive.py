@@ -0,0 +1,126 @@
+# processing/archive.py
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from typing import Optional, Set
+
+ARCHIVE_FORMATS = ("tar", "zip")
+
+
+def archive_format(path: str) -> str:
+    """'tar' or 'zip' from the file extension."""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext not in ARCHIVE_FORMATS:
+        raise ValueError(f"Archive must end in .tar or .zip: {path}")
+    return ext
+
+
+class ArchiveSink:
+    """
+    Batch output written into one archive (or shards of `shard_size` members)
+    instead of one file per output. Members are stored uncompressed (PNG/JPEG
+    are already compressed) and appended as they arrive, so nothing is held
+    back in memory. With sharding, `out.tar` becomes out-00000.tar,
+    out-00001.tar, ...; each shard is written as a hidden .part file and
+    renamed when complete, like save_bgr(atomic=True).
+    Next to the archive, `<name>.index.jsonl` gets one line per member: name,
+    shard, size, source path and source content hash. Lines are flushed as
+    members are added, so an interrupted run still lists its finished shards.
+    Thread-safe; use as a context manager or call close().
+    """
+
+    def __init__(self, path: str, shard_size: int = 0):
+        self.path = os.path.abspath(path)
+        self.fmt = archive_format(self.path)
+        self.shard_size = max(0, int(shard_size))
+        self.count = 0
+        self._shard = -1
+        self._in_shard = 0
+        self._archive = None
+        self._current = None          # (final path, .part path) of the open shard
+        self._names: Set[str] = set()
+        self._lock = threading.Lock()
+        base = os.path.splitext(self.path)[0]
+        self.index_path = base + ".index.jsonl"
+        self._index = open(self.index_path, "w", encoding="utf-8")
+
+    def shard_path(self, shard: int) -> str:
+        if not self.shard_size:
+            return self.path
+        base, ext = os.path.splitext(self.path)
+        return f"{base}-{shard:05d}{ext}"
+
+    def _open_shard(self):
+        self._shard += 1
+        self._in_shard = 0
+        final = self.shard_path(self._shard)
+        head, name = os.path.split(final)
+        part = os.path.join(head, f".{name}.{os.getpid()}.part")
+        if self.fmt == "zip":
+            self._archive = zipfile.ZipFile(part, "w", zipfile.ZIP_STORED, allowZip64=True)
+        else:
+            self._archive = tarfile.open(part, "w", format=tarfile.PAX_FORMAT)
+        self._current = (final, part)
+
+    def _close_shard(self):
+        if self._archive is None:
+            return
+        self._archive.close()
+        os.replace(self._current[1], self._current[0])
+        self._archive = self._current = None
+
+    def _unique(self, name: str) -> str:
+        """Same basename from two source folders: keep both (name-2.png, ...)."""
+        if name not in self._names:
+            return name
+        stem, ext = os.path.splitext(name)
+        n = 2
+        while f"{stem}-{n}{ext}" in self._names:
+            n += 1
+        return f"{stem}-{n}{ext}"
+
+    def add(self, name: str, data: bytes, source: Optional[str] = None, source_hash: Optional[str] = None) -> str:
+        """Append one member; returns '<shard path>/<member name>' (for BatchItem.out_path)."""
+        with self._lock:
+            if self._index is None:
+                raise ValueError("ArchiveSink is closed")
+            if self._archive is None:
+                self._open_shard()
+            name = self._unique(name.replace(os.sep, "/"))
+            self._names.add(name)
+            if self.fmt == "zip":
+                self._archive.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                self._archive.addfile(info, io.BytesIO(data))
+            shard = self._current[0]
+            self._index.write(json.dumps({"name": name, "archive": os.path.basename(shard), "size": len(data),
+                                          "source": source, "source_hash": source_hash}) + "\n")
+            self._index.flush()
+            self.count += 1
+            self._in_shard += 1
+            if self.shard_size and self._in_shard >= self.shard_size:
+                self._close_shard()
+            return f"{shard}/{name}"
+
+    def close(self):
+        with self._lock:
+            if self._index is None:
+                return
+            if not self.count and not self.shard_size:
+                self._open_shard()  # an empty run still leaves the archive it promised
+            self._close_shard()
+            self._index.close()
+            self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
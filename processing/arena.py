@@ -0,0 +1,78 @@
+# processing/arena.py
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils.settings import get_setting
+
+
+class ScratchArena:
+    """
+    Pool of temporary arrays keyed by size and dtype. Pipeline helpers borrow
+    their float working buffers here instead of allocating fresh full-frame
+    arrays, so repeated renders at one size (slider refreshes, batch runs,
+    video frames) reuse the same memory. Only scratch space comes from the
+    arena: stage outputs are always new arrays, since callers cache them.
+    Idle buffers beyond `budget_mb` are dropped, oldest first. Buffers over an
+    eighth of the budget (full-resolution stills) are not kept at all, so the
+    pool mainly serves preview proxies and video-sized frames. Thread-safe;
+    each borrower gets its own buffer.
+    """
+
+    def __init__(self, budget_mb: float = 256):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._free = OrderedDict()  # (element count, dtype) -> [flat arrays]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def idle_bytes(self) -> int:
+        return self._bytes
+
+    @contextmanager
+    def borrow(self, shape, dtype=np.float32):
+        """Uninitialised array of `shape`/`dtype`, returned to the pool on exit."""
+        shape = tuple(shape)
+        key = (int(np.prod(shape)), np.dtype(dtype).str)  # (H, W, 3) and (H*W, 3) share storage
+        buf = None
+        with self._lock:
+            stack = self._free.get(key)
+            if stack:
+                buf = stack.pop()
+                self._bytes -= buf.nbytes
+                if not stack:
+                    del self._free[key]
+                self.hits += 1
+            else:
+                self.misses += 1
+        if buf is None:
+            buf = np.empty(key[0], dtype)
+        try:
+            yield buf.reshape(shape)
+        finally:
+            self._give_back(key, buf)
+
+    def _give_back(self, key, buf):
+        if buf.nbytes > self.budget // 8:
+            return  # huge frames: keeping one would pin a large share of the budget
+        with self._lock:
+            self._free.setdefault(key, []).append(buf)
+            self._free.move_to_end(key)
+            self._bytes += buf.nbytes
+            while self._bytes > self.budget:
+                old_key, stack = next(iter(self._free.items()))
+                self._bytes -= stack.pop(0).nbytes
+                if not stack:
+                    del self._free[old_key]
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+            self._bytes = 0
+
+
+ARENA = ScratchArena(get_setting("scratch_budget_mb"))
@@ -0,0 +1,367 @@
+# processing/batch.py
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from utils.catalog import file_hash
+from utils.image_io import encode_bgr, load_bgr, save_bgr
+from utils.settings import get_setting
+from .admission import estimate_peak_bytes, memory_budget, render_pixels
+from .archive import ArchiveSink
+from .contact_sheet import Variant, render_variants
+from .export import ExportTarget, encode_image, export_base, export_image, reduced_input
+from .stages import CancelToken, StageTimes, run_stages, stage_params
+from .themes import get_pipeline, get_stages
+
+OUTPUT_SUFFIX = "_cyberpunk.png"
+
+
+@dataclass
+class BatchItem:
+    """Result for one input file, yielded as soon as it completes."""
+    index: int                 # completion order, 1-based
+    total: int
+    path: str
+    out_path: Optional[str]
+    ok: bool
+    seconds: float
+    error: Optional[str] = None
+    worker: Optional[str] = None                # "<pid>/<thread>" that rendered it
+    size: Optional[Tuple[int, int]] = None      # input (width, height), once decoded
+    stages: Optional[Dict[str, float]] = None   # seconds per step (load, stages, write), amortized like `seconds`
+
+
+class BatchStats:
+    """Running counters for throughput / ETA readouts."""
+
+    def __init__(self, total: int):
+        self.total = int(total)
+        self.done = 0
+        self.ok = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    def update(self, item: BatchItem):
+        self.done += 1
+        if item.ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Images per second since the run started."""
+        el = self.elapsed
+        return self.done / el if el > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.throughput
+        if rate <= 0:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+
+def output_path_for(path: str, outdir: str, suffix: str = OUTPUT_SUFFIX) -> str:
+    base = os.path.splitext(os.path.basename(path))[0] + suffix
+    return os.path.join(outdir, base)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "x"
+
+
+def variant_suffix(variant: Variant) -> str:
+    """'_<theme>_<preset>.png', e.g. '_ghibli_punchy-neon.png'."""
+    return f"_{_slug(variant.theme)}_{_slug(variant.preset)}.png"
+
+
+def _error(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+def _write(out, out_path, profile, encode=False):
+    """
+    [(path, error, data)] for one render: a single PNG, or every target of an
+    export profile. encode=True returns the file bytes as `data` instead of
+    writing them (archive output); otherwise data is None.
+    """
+    if encode:
+        if profile:
+            return [(p, err, data) for p, data, err in encode_image(out, export_base(out_path), profile)]
+        try:
+            return [(out_path, None, encode_bgr(out))]
+        except Exception as e:
+            return [(None, _error(e), None)]
+    if profile:
+        return [(p, err, None) for p, err in export_image(out, export_base(out_path), profile)]
+    try:
+        save_bgr(out_path, out, atomic=True)
+        return [(out_path, None, None)]
+    except Exception as e:
+        return [(None, _error(e), None)]
+
+
+def _timed(results, t0, times, size=None, source_hash=None):
+    """
+    [(out_path, seconds, error, payload, info)]; payload = (bytes, source hash)
+    for archive output, else None; info = BatchItem worker / size / stages.
+    """
+    n = max(1, len(results))
+    per_output = (time.perf_counter() - t0) / n  # amortized, for throughput readouts
+    info = {"worker": f"{os.getpid()}/{threading.current_thread().name}", "size": size,
+            "stages": {name: sec / n for name, sec in times.seconds.items()}}
+    return [(out_path, per_output, err, None if data is None else (data, source_hash), info)
+            for out_path, err, data in results]
+
+
+def _load(path, profile, reduced, times):
+    img = times.run("load", load_bgr, path)
+    size = (img.shape[1], img.shape[0])
+    if profile and reduced:
+        img = times.run("reduce", reduced_input, img, profile)
+    return img, size
+
+
+def _process_one(theme, path, outdir, params, profile=None, reduced=False, encode=False):
+    t0 = time.perf_counter()
+    times, size = StageTimes(), None
+    out_path = output_path_for(path, outdir)
+    try:
+        img, size = _load(path, profile, reduced, times)
+        out = run_stages(get_stages(theme), img, stage_params(get_pipeline(theme), params), times=times)
+    except Exception as e:
+        return _timed([(None, _error(e), None)] * len(profile or (None,)), t0, times, size)
+    results = times.run("write", _write, out, out_path, profile, encode)
+    return _timed(results, t0, times, size, file_hash(path) if encode else None)
+
+
+def _process_fanout(variants, path, outdir, profile=None, reduced=False, encode=False):
+    """Decode once, render all variants sharing their common stages, write each."""
+    t0 = time.perf_counter()
+    times, size = StageTimes(), None
+    try:
+        img, size = _load(path, profile, reduced, times)
+        outs = render_variants(img, variants, workers=1, times=times)
+    except Exception as e:
+        return _timed([(None, _error(e), None)] * (len(variants) * len(profile or (None,))), t0, times, size)
+    results = []
+    for v, out in zip(variants, outs):
+        results += times.run("write", _write, out, output_path_for(path, outdir, variant_suffix(v)), profile, encode)
+    return _timed(results, t0, times, size, file_hash(path) if encode else None)
+
+
+def _job_costs(targets, themes, profile, reduced, outputs) -> Dict[str, int]:
+    """Estimated peak bytes per target (header dimensions + per-theme cost model)."""
+    reduce = bool(profile) and reduced and all(t.max_side for t in profile)  # see export.reduced_input
+    side = max(t.max_side for t in profile) if reduce else None
+    costs = {}
+    for path in targets:
+        full = render_pixels(path)
+        px = render_pixels(path, side) if reduce else full
+        # a reduced render still decodes the full-size image first
+        costs[path] = estimate_peak_bytes(px, themes, outputs) + (3 * full if px != full else 0)
+    return costs
+
+
+def _admissible(todo, costs, free) -> Optional[int]:
+    """Index of the first (largest) queued job that fits in `free` bytes."""
+    return next((i for i, path in enumerate(todo) if costs[path] <= free), None)
+
+
+def _failed_future(error: Exception) -> Future:
+    fut = Future()
+    fut.set_exception(error)
+    return fut
+
+
+def _iter_jobs(targets, job, total, cancel, progress, workers, costs=None, budget=None,
+               recycle_after=0, sink=None) -> Iterator[BatchItem]:
+    """
+    Run job(path) -> [(out_path, seconds, error, payload, info)] over targets; yield one item per result.
+    Payloads (encoded bytes, source hash) are appended to `sink` here, on the
+    consuming thread, so worker processes never touch the archive.
+    With `costs` (path -> estimated peak bytes) jobs start largest first, and
+    only while the running ones fit in `budget` bytes (smaller jobs fill the
+    gaps; one job larger than the whole budget runs alone).
+    recycle_after > 0 runs the jobs in worker processes that are replaced
+    after that many files (job must then be picklable). If a worker process
+    dies (e.g. OOM-killed), the files in flight fail and the pool is
+    replaced for the files still queued.
+    """
+    done = 0
+    per_job = total // max(1, len(targets))
+
+    def emit(path, results):
+        nonlocal done
+        for out_path, seconds, error, payload, info in results:
+            if payload is not None:
+                try:
+                    out_path = sink.add(out_path, payload[0], path, payload[1])
+                except Exception as e:
+                    out_path, error = None, _error(e)
+            done += 1
+            item = BatchItem(done, total, path, out_path, error is None, seconds, error, **(info or {}))
+            if progress is not None:
+                progress(item)
+            yield item
+
+    if workers <= 1 and not recycle_after:
+        for path in targets:
+            if cancel is not None and cancel.cancelled:
+                return
+            yield from emit(path, job(path))
+        return
+
+    todo = list(targets)
+    if costs is not None:
+        todo.sort(key=lambda p: -costs[p])  # largest first: the long jobs do not end up in the tail
+    pending = {}
+    in_use = 0
+    # keep a small window in flight so cancel takes effect quickly; with a
+    # memory budget only admitted (running) jobs are submitted
+    window = workers if budget is not None else workers * 2
+
+    def new_pool():
+        if recycle_after:
+            return ProcessPoolExecutor(max_workers=int(workers), max_tasks_per_child=int(recycle_after))
+        return ThreadPoolExecutor(max_workers=int(workers))
+
+    pool = new_pool()
+
+    def replace_pool(broken):
+        """A dead worker breaks a process pool for good: the queued files go to a fresh one."""
+        nonlocal pool
+        if pool is broken:
+            pool = new_pool()
+            broken.shutdown(wait=False)
+
+    def fill():
+        nonlocal in_use
+        while len(pending) < window and todo:
+            if cancel is not None and cancel.cancelled:
+                return
+            i = 0 if budget is None or not pending else _admissible(todo, costs, budget - in_use)
+            if i is None:
+                return  # wait for memory to free up
+            path = todo.pop(i)
+            in_use += costs[path] if costs is not None else 0
+            try:
+                fut = pool.submit(job, path)
+            except BrokenProcessPool:  # broke since the last wait(): retry once on a new pool
+                replace_pool(pool)
+                try:
+                    fut = pool.submit(job, path)
+                except RuntimeError as e:
+                    fut = _failed_future(e)
+            except RuntimeError as e:
+                fut = _failed_future(e)
+            pending[fut] = (path, pool)
+
+    try:
+        fill()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                path, owner = pending.pop(fut)
+                in_use -= costs[path] if costs is not None else 0
+                try:
+                    results = fut.result()
+                except BrokenProcessPool as e:  # a worker died: this file was in flight
+                    replace_pool(owner)
+                    results = [(None, 0.0, _error(e), None, None)] * per_job
+                except Exception as e:
+                    results = [(None, 0.0, _error(e), None, None)] * per_job
+                yield from emit(path, results)
+            fill()
+    finally:
+        pool.shutdown(wait=True)
+
+
+def _scheduling(targets, themes, profile, reduced, outputs, workers, budget_mb, recycle_after):
+    """(costs, budget, recycle_after) for _iter_jobs; None/None reads settings."""
+    if recycle_after is None:
+        recycle_after = int(get_setting("batch_recycle_after") or 0)
+    if workers <= 1 and not recycle_after:
+        return None, None, 0
+    costs = _job_costs(targets, themes, profile, reduced, outputs)
+    return costs, memory_budget(budget_mb), recycle_after
+
+
+def iter_batch(
+    targets: Sequence[str],
+    theme: str,
+    params: dict,
+    outdir: str,
+    cancel: Optional[CancelToken] = None,
+    progress: Optional[Callable[[BatchItem], None]] = None,
+    workers: int = 1,
+    profile: Optional[Sequence[ExportTarget]] = None,
+    reduced: bool = False,
+    budget_mb: Optional[float] = None,
+    recycle_after: Optional[int] = None,
+    sink: Optional[ArchiveSink] = None,
+) -> Iterator[BatchItem]:
+    """
+    Process `targets` with the theme pipeline and yield a BatchItem per file
+    as it completes (completion order when workers > 1).
+    Stops early once `cancel` is set; items already running still finish.
+    Errors never escape: they are reported on the item instead.
+    With an export `profile`, each render is written at every profile size
+    (one item per output); `reduced` renders at the largest profile size
+    when none of them is full resolution (see export.reduced_input).
+    With workers > 1, files start largest first and only as many run at once
+    as fit in the memory budget (`budget_mb`, else settings "batch_memory_mb";
+    see processing/admission.py). recycle_after > 0 (else settings
+    "batch_recycle_after") renders in worker processes replaced after that
+    many files, which returns fragmented memory to the OS.
+    With an ArchiveSink, outputs are encoded in memory and streamed into the
+    archive instead of `outdir` (item.out_path is then '<archive>/<name>').
+    """
+    costs, budget, recycle_after = _scheduling(targets, [theme], profile, reduced, 1, workers,
+                                               budget_mb, recycle_after)
+    job = partial(_process_one, theme, outdir="" if sink else outdir, params=params, profile=profile,
+                  reduced=reduced, encode=sink is not None)
+    return _iter_jobs(targets, job, len(targets) * len(profile or (None,)), cancel, progress, workers,
+                      costs, budget, recycle_after, sink)
+
+
+def iter_fanout(
+    targets: Sequence[str],
+    variants: Sequence[Variant],
+    outdir: str,
+    cancel: Optional[CancelToken] = None,
+    progress: Optional[Callable[[BatchItem], None]] = None,
+    workers: int = 1,
+    profile: Optional[Sequence[ExportTarget]] = None,
+    reduced: bool = False,
+    budget_mb: Optional[float] = None,
+    recycle_after: Optional[int] = None,
+    sink: Optional[ArchiveSink] = None,
+) -> Iterator[BatchItem]:
+    """
+    Like iter_batch, but every file is decoded once and rendered with all
+    `variants` (theme + preset) together: stages the variants have in common
+    run once per file (see contact_sheet.render_variants). Outputs are named
+    <name>_<theme>_<preset>.png; one BatchItem per output. `profile`,
+    `reduced`, `budget_mb`, `recycle_after` and `sink` work as in iter_batch.
+    """
+    variants = list(variants)
+    if not variants:
+        return iter(())
+    costs, budget, recycle_after = _scheduling(targets, [v.theme for v in variants], profile, reduced,
+                                               len(variants), workers, budget_mb, recycle_after)
+    job = partial(_process_fanout, variants, outdir="" if sink else outdir, profile=profile, reduced=reduced,
+                  encode=sink is not None)
+    return _iter_jobs(targets, job, len(targets) * len(variants) * len(profile or (None,)), cancel, progress,
+                      workers, costs, budget, recycle_after, sink)
@@ -0,0 +1,83 @@
+# processing/contact_sheet.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from utils.image_io import resize_max
+from utils.presets import get_preset_names, get_preset
+from .stages import StageTimes, apply_stage, convert, stage_params
+from .themes import get_pipeline, get_stages, resolve_theme
+
+CONTACT_THUMB_MAX = 256
+
+
+@dataclass
+class Variant:
+    theme: str
+    preset: str
+    params: dict  # complete params (pipeline defaults filled in)
+
+
+def variant_for(theme: str, preset: str) -> Variant:
+    theme = resolve_theme(theme)
+    return Variant(theme, preset, stage_params(get_pipeline(theme), get_preset(theme, preset)))
+
+
+def preset_variants(themes: Sequence[str]) -> List[Variant]:
+    """One Variant per preset of each theme, in combobox order."""
+    return [variant_for(theme, name) for theme in themes for name in get_preset_names(theme)]
+
+
+def render_variants(img_bgr, variants: Sequence[Variant], workers: Optional[int] = None,
+                    times: Optional[StageTimes] = None):
+    """
+    Render every variant of `img_bgr`, returning outputs in variant order.
+    Variants are merged into a prefix tree on Stage.key, so an upstream step
+    shared by several variants (same step, same params) runs once; all the
+    distinct steps at one tree depth run in parallel. Intermediates stay in
+    their stage's native colour space, as in run_stages. `times` accumulates
+    the seconds per step.
+    """
+    if not variants:
+        return []
+    paths = []
+    for v in variants:
+        stages = get_stages(v.theme)
+        paths.append((stages, tuple(st.key(v.params) for st in stages), v.params))
+
+    leaves = {keys for _, keys, _ in paths}
+    outputs = {(): (img_bgr, "bgr")}   # node -> (image, colour space)
+    max_depth = max(len(keys) for _, keys, _ in paths)
+    workers = workers or min(8, os.cpu_count() or 2)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for depth in range(max_depth):
+            jobs = {}
+            for stages, keys, params in paths:
+                if depth >= len(keys):
+                    continue
+                node = keys[:depth + 1]
+                if node in jobs or node in outputs:
+                    continue
+                st = stages[depth]
+                img, space = outputs[keys[:depth]]
+                if times is None:
+                    jobs[node] = pool.submit(apply_stage, st, img, space, img_bgr, params)
+                else:
+                    jobs[node] = pool.submit(times.run, st.name, apply_stage, st, img, space, img_bgr, params)
+            for node, fut in jobs.items():
+                outputs[node] = fut.result()
+            # intermediates of this depth are no longer needed by anyone
+            for node in [n for n in outputs if len(n) == depth and n not in leaves]:
+                del outputs[node]
+
+    return [convert(*outputs[keys], "bgr") for _, keys, _ in paths]
+
+
+def render_contact_sheet(img_bgr, themes: Sequence[str], max_side: int = CONTACT_THUMB_MAX,
+                         workers: Optional[int] = None) -> List[Tuple[Variant, object]]:
+    """Every preset of `themes` rendered on a `max_side` proxy of `img_bgr`."""
+    proxy = resize_max(img_bgr, max_side, max_side)
+    variants = preset_variants(themes)
+    return list(zip(variants, render_variants(proxy, variants, workers=workers)))
@@ -0,0 +1,121 @@
+# processing/export.py
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.image_io import encode_bgr, resize_max, save_bgr
+from utils.settings import get_setting
+
+
+@dataclass(frozen=True)
+class ExportTarget:
+    """One output of an export profile."""
+    suffix: str                     # appended to the output name ("" = the master)
+    max_side: Optional[int] = None  # longest side in pixels; None keeps the render size
+    fmt: str = "png"                # png / jpg / webp
+    quality: int = 92               # jpg / webp only
+
+
+EXPORT_PROFILES: Dict[str, Tuple[ExportTarget, ...]] = {
+    "master": (ExportTarget(""),),
+    "master+web+thumb": (
+        ExportTarget(""),
+        ExportTarget("_web", 2048, "jpg", 90),
+        ExportTarget("_thumb", 400, "jpg", 85),
+    ),
+    "web+thumb": (
+        ExportTarget("_web", 2048, "jpg", 90),
+        ExportTarget("_thumb", 400, "jpg", 85),
+    ),
+}
+
+
+def profile_names() -> List[str]:
+    custom = get_setting("export_profiles") or {}
+    return list(EXPORT_PROFILES) + [n for n in custom if n not in EXPORT_PROFILES]
+
+
+def get_profile(name: str) -> Tuple[ExportTarget, ...]:
+    """
+    Built-in profile, or one defined in settings.json under "export_profiles"
+    as a list of {"suffix", "max_side", "format", "quality"} objects.
+    """
+    custom = (get_setting("export_profiles") or {}).get(name)
+    if custom:
+        return tuple(ExportTarget(t.get("suffix", ""), t.get("max_side"), t.get("format", "png").lower(),
+                                  int(t.get("quality", 92))) for t in custom)
+    if name not in EXPORT_PROFILES:
+        raise ValueError(f"Unknown export profile: {name}")
+    return EXPORT_PROFILES[name]
+
+
+def reduced_input(img_bgr, targets: Sequence[ExportTarget]):
+    """
+    If no target needs full resolution, downscale the *input* to the largest
+    target size so the theme renders only the pixels that will be kept.
+    Pixel-sized effects (edge width, glow radius, scanlines) then look
+    relatively stronger than on a downscaled full render. Returns img_bgr
+    unchanged when some target is full size.
+    """
+    if not targets or any(t.max_side is None for t in targets):
+        return img_bgr
+    side = max(t.max_side for t in targets)
+    return resize_max(img_bgr, side, side)
+
+
+def pyramid(img_bgr, targets: Sequence[ExportTarget]) -> list:
+    """
+    Resized copies for `targets` (same order), built largest first with area
+    averaging, each level from the previous one rather than from the full
+    image.
+    """
+    order = sorted(range(len(targets)), key=lambda i: -(targets[i].max_side or float("inf")))
+    out = [None] * len(targets)
+    level = img_bgr
+    for i in order:
+        side = targets[i].max_side
+        if side is not None and max(level.shape[:2]) > side:
+            level = resize_max(level, side, side)
+        out[i] = level
+    return out
+
+
+def export_path(base: str, target: ExportTarget) -> str:
+    ext = {"jpeg": "jpg"}.get(target.fmt, target.fmt)
+    return f"{base}{target.suffix}.{ext}"
+
+
+def _options(target: ExportTarget) -> dict:
+    return {"quality": target.quality} if target.fmt in ("jpg", "jpeg", "webp") else {}
+
+
+def export_image(img_bgr, base: str, targets: Sequence[ExportTarget]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Write every target of a profile for one render; `base` is the output
+    path without extension. Returns (path, error) per target, in order.
+    """
+    results = []
+    for target, img in zip(targets, pyramid(img_bgr, targets)):
+        path = export_path(base, target)
+        try:
+            save_bgr(path, img, atomic=True, **_options(target))
+            results.append((path, None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def encode_image(img_bgr, base: str, targets: Sequence[ExportTarget]) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """Like export_image, but returns (path, encoded bytes, error) per target instead of writing files."""
+    results = []
+    for target, img in zip(targets, pyramid(img_bgr, targets)):
+        path = export_path(base, target)
+        try:
+            results.append((path, encode_bgr(img, target.fmt, **_options(target)), None))
+        except Exception as e:
+            results.append((path, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def export_base(path: str) -> str:
+    return os.path.splitext(path)[0]
@@ -0,0 +1,92 @@
+# processing/fused.py
+import importlib.util
+from functools import lru_cache
+
+import numpy as np
+
+from utils.startup import timed_import
+
+# Optional Numba backend: per-pixel stages that run back to back are fused
+# into one parallel pass over the uint8 image, without the float temporaries
+# of the NumPy stages. Nothing here imports Numba until a kernel is first used.
+AVAILABLE = importlib.util.find_spec("numba") is not None
+
+prange = range  # numba.prange once jit() has run (plain range lets the kernels run as Python)
+
+
+def _grade_rows(img, out, contrast, sat, vib):
+    """
+    contrast_saturation + vibrance. Scaling HSV saturation with H and V fixed
+    moves every channel towards/away from the max by the same factor, so no
+    HSV round trips are needed. Grey pixels get hue 0 like OpenCV's HSV.
+    """
+    h, w = img.shape[0], img.shape[1]
+    for y in prange(h):
+        for x in range(w):
+            b = float(int(min(max((img[y, x, 0] / 255.0 - 0.5) * contrast + 0.5, 0.0), 1.0) * 255.0))
+            g = float(int(min(max((img[y, x, 1] / 255.0 - 0.5) * contrast + 0.5, 0.0), 1.0) * 255.0))
+            r = float(int(min(max((img[y, x, 2] / 255.0 - 0.5) * contrast + 0.5, 0.0), 1.0) * 255.0))
+            v = max(b, g, r)
+            lo = min(b, g, r)
+            s = (v - lo) / v if v > 0 else 0.0
+            s2 = min(max(s * sat, 0.0), 1.0)
+            s2 = min(max(s2 + vib * (1.0 - s2) * (0.6 + 0.4 * v / 255.0), 0.0), 1.0)
+            if s > 0:
+                f = s2 / s
+                b, g, r = v - (v - b) * f, v - (v - g) * f, v - (v - r) * f
+            else:
+                b, g, r = v * (1.0 - s2), v * (1.0 - s2), v
+            out[y, x, 0] = int(min(max(b + 0.5, 0.0), 255.0))
+            out[y, x, 1] = int(min(max(g + 0.5, 0.0), 255.0))
+            out[y, x, 2] = int(min(max(r + 0.5, 0.0), 255.0))
+
+
+def _finish_rows(img, out, tint, tint_first, edges, edge_color, alpha, vmask):
+    """
+    Warm tint, edge overlay (either order) and vignette multiply (float32),
+    truncating to uint8 after each step exactly like the separate NumPy stages.
+    """
+    h, w = img.shape[0], img.shape[1]
+    for y in prange(h):
+        for x in range(w):
+            m = alpha if edges[y, x] > 0 else 0.0
+            for c in range(3):
+                v = float(img[y, x, c])
+                if tint_first:
+                    v = float(int(min(max(v + tint[c], 0.0), 255.0)))
+                v = float(int(min(max(v * (1.0 - m) + edge_color[c] * m, 0.0), 255.0)))
+                if not tint_first:
+                    v = float(int(min(max(v + tint[c], 0.0), 255.0)))
+                # float32 product, like pipeline._apply_mask (a float64 one rounds differently)
+                out[y, x, c] = int(max(np.float32(v) * vmask[y, x], 0.0))
+
+
+@lru_cache(maxsize=None)
+def jit(kernel):
+    """`kernel` compiled with Numba, parallel over rows (compiled on first call, cached on disk)."""
+    global prange
+    numba = timed_import("numba")
+    prange = numba.prange
+    return numba.njit(parallel=True, nogil=True, cache=True)(kernel)
+
+
+def grade(img_bgr, contrast, sat, vib, kernel=None):
+    """contrast_saturation followed by vibrance in one pass; `kernel` overrides the compiled one."""
+    img = np.ascontiguousarray(img_bgr)
+    out = np.empty_like(img)
+    (kernel or jit(_grade_rows))(img, out, float(contrast), float(sat), float(vib))
+    return out
+
+
+def finish(img_bgr, tint_bgr, tint_first, edges, edge_color, alpha, vmask, kernel=None):
+    """
+    Tint (`tint_bgr`, already scaled by the tint strength), edges (uint8
+    mask, dilated) blended towards `edge_color` with `alpha`, then the
+    vignette mask `vmask` (float32, H x W).
+    """
+    img = np.ascontiguousarray(img_bgr)
+    out = np.empty_like(img)
+    (kernel or jit(_finish_rows))(img, out, np.asarray(tint_bgr, np.float64), bool(tint_first),
+                                  np.ascontiguousarray(edges), np.asarray(edge_color, np.float64),
+                                  float(max(0.0, min(1.0, alpha))), np.ascontiguousarray(vmask))
+    return out
@@ -1,7 +1,19 @@
 # processing/pipeline.py
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+
 import cv2
 import numpy as np
 
+from . import fused
+from .arena import ARENA
+from .stages import Stage, register_conversion, register_fast_path, run_stages
+
+_scratch = ARENA.borrow
+
 # ============================================================
 # Core helpers (kept compatible with your existing UI)
 # ============================================================
@@ -10,100 +22,238 @@ def unsharp_mask(img_bgr, amount=0.6, radius=1.5):
     blur = cv2.GaussianBlur(img_bgr, (0, 0), radius)
     return cv2.addWeighted(img_bgr, 1 + amount, blur, -amount, 0)
 
-def clahe_contrast(img_bgr, clip=2.0):
-    lab = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2LAB)
+# 8-bit colour conversions between the stages' native spaces (see Stage.spaces)
+register_conversion("bgr", "lab", lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2LAB))
+register_conversion("lab", "bgr", lambda img: cv2.cvtColor(img, cv2.COLOR_LAB2BGR))
+register_conversion("bgr", "hsv", lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2HSV))
+register_conversion("hsv", "bgr", lambda img: cv2.cvtColor(img, cv2.COLOR_HSV2BGR))
+
+def _clahe_lab(lab, clip=2.0):
     L, A, B = cv2.split(lab)
     clahe = cv2.createCLAHE(clipLimit=max(0.1, clip), tileGridSize=(8, 8))
-    L2 = clahe.apply(L)
-    lab2 = cv2.merge([L2, A, B])
-    return cv2.cvtColor(lab2, cv2.COLOR_LAB2BGR)
+    return cv2.merge([clahe.apply(L), A, B])
+
+def clahe_contrast(img_bgr, clip=2.0):
+    return cv2.cvtColor(_clahe_lab(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2LAB), clip), cv2.COLOR_LAB2BGR)
+
+def _scaled(img_bgr, buf, scale=None):
+    """Copy uint8 `img_bgr` into float32 `buf` (same shape), optionally divided by `scale`."""
+    np.copyto(buf, img_bgr, casting="unsafe")
+    if scale is not None:
+        buf /= scale
+    return buf
+
+def _contrast_saturation_hsv(img_bgr, contrast=1.2, sat=1.3):
+    """adjust_contrast_saturation, returning HSV (the saturation step works there anyway)."""
+    h, w = img_bgr.shape[:2]
+    with _scratch(img_bgr.shape) as img, _scratch(img_bgr.shape, np.uint8) as img8, _scratch((h, w)) as s:
+        _scaled(img_bgr, img, 255.0)
+        img -= 0.5
+        img *= float(contrast)
+        img += 0.5
+        np.clip(img, 0, 1, out=img)
+        img *= 255
+        np.copyto(img8, img, casting="unsafe")
+        hsv = cv2.cvtColor(img8, cv2.COLOR_BGR2HSV)
+        # only saturation changes; H and V go back untouched
+        np.copyto(s, hsv[:, :, 1], casting="unsafe")
+        s *= float(sat)
+        np.clip(s, 0, 255, out=s)
+        np.copyto(hsv[:, :, 1], s, casting="unsafe")
+    return hsv
 
 def adjust_contrast_saturation(img_bgr, contrast=1.2, sat=1.3):
-    img = img_bgr.astype(np.float32) / 255.0
-    img = np.clip((img - 0.5) * float(contrast) + 0.5, 0, 1)
-    hsv = cv2.cvtColor((img * 255).astype(np.uint8), cv2.COLOR_BGR2HSV).astype(np.float32)
-    hsv[:, :, 1] = np.clip(hsv[:, :, 1] * float(sat), 0, 255)
-    out = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR)
-    return out
+    return cv2.cvtColor(_contrast_saturation_hsv(img_bgr, contrast, sat), cv2.COLOR_HSV2BGR)
+
+def _vibrance_hsv(hsv, vib=0.6):
+    """vibrance on an HSV image; returns a new HSV image (`hsv` is left untouched)."""
+    hsv = hsv.copy()
+    h, w = hsv.shape[:2]
+    with _scratch((h, w)) as s, _scratch((h, w)) as v, _scratch((h, w)) as boost:
+        _scaled(hsv[:, :, 1], s, 255.0)
+        _scaled(hsv[:, :, 2], v, 255.0)
+        np.subtract(1.0, s, out=boost)      # vib * (1 - s) * (0.6 + 0.4 v)
+        boost *= float(vib)
+        v *= 0.4
+        v += 0.6
+        boost *= v
+        s += boost
+        np.clip(s, 0, 1, out=s)
+        s *= 255.0
+        np.copyto(hsv[:, :, 1], s, casting="unsafe")
+    return hsv
 
 def vibrance(img_bgr, vib=0.6):
-    hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV).astype(np.float32)
-    s = hsv[:, :, 1] / 255.0
-    v = hsv[:, :, 2] / 255.0
-    boost = float(vib) * (1.0 - s) * (0.6 + 0.4 * v)
-    s2 = np.clip((s + boost), 0, 1)
-    hsv[:, :, 1] = s2 * 255.0
-    return cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR)
+    return cv2.cvtColor(_vibrance_hsv(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV), vib), cv2.COLOR_HSV2BGR)
 
 def split_tone(img_bgr, shadow_tint=(180, 255, 255), highlight_tint=(255, 80, 220), strength=0.3):
-    img = img_bgr.astype(np.float32) / 255.0
-    lum = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY).astype(np.float32) / 255.0
-    lum = cv2.GaussianBlur(lum, (0, 0), 1.2)
+    h, w = img_bgr.shape[:2]
     st = np.array(shadow_tint, np.float32) / 255.0
     ht = np.array(highlight_tint, np.float32) / 255.0
-    lum_3 = np.repeat(lum[:, :, None], 3, axis=2)
-    tint = ht * lum_3 + st * (1 - lum_3)
-    out = np.clip(img * (1 - float(strength)) + tint * float(strength), 0, 1)
-    return (out * 255).astype(np.uint8)
+    with _scratch(img_bgr.shape) as img, _scratch(img_bgr.shape) as tint, _scratch(img_bgr.shape) as tmp, \
+            _scratch((h, w)) as lum, _scratch((h, w)) as inv:
+        _scaled(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY), lum, 255.0)
+        lum = cv2.GaussianBlur(lum, (0, 0), 1.2, dst=inv)
+        np.multiply(lum[:, :, None], ht, out=tint)   # ht * lum + st * (1 - lum), lum broadcast over BGR
+        np.subtract(1, lum, out=lum)
+        np.multiply(lum[:, :, None], st, out=tmp)
+        tint += tmp
+        _scaled(img_bgr, img, 255.0)
+        img *= (1 - float(strength))
+        tint *= float(strength)
+        img += tint
+        np.clip(img, 0, 1, out=img)
+        img *= 255
+        return img.astype(np.uint8)
 
 def neon_bloom(img_bgr, strength=0.8):
-    img = img_bgr.astype(np.float32) / 255.0
-    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY).astype(np.float32) / 255.0
-    mask = np.clip((gray - 0.5) * 3.0, 0, 1)
-    mask = cv2.GaussianBlur(mask, (0, 0), 2.0)
-    bright = img * mask[:, :, None]
-    glow = cv2.GaussianBlur(bright, (0, 0), 6.0)
-    out = np.clip(img + glow * float(strength), 0, 1)
-    return (out * 255).astype(np.uint8)
+    h, w = img_bgr.shape[:2]
+    with _scratch(img_bgr.shape) as img, _scratch(img_bgr.shape) as bright, _scratch(img_bgr.shape) as glow, \
+            _scratch((h, w)) as gray, _scratch((h, w)) as mask:
+        _scaled(img_bgr, img, 255.0)
+        _scaled(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY), gray, 255.0)
+        gray -= 0.5
+        gray *= 3.0
+        np.clip(gray, 0, 1, out=gray)
+        mask = cv2.GaussianBlur(gray, (0, 0), 2.0, dst=mask)
+        np.multiply(img, mask[:, :, None], out=bright)
+        glow = cv2.GaussianBlur(bright, (0, 0), 6.0, dst=glow)
+        glow *= float(strength)
+        img += glow
+        np.clip(img, 0, 1, out=img)
+        img *= 255
+        return img.astype(np.uint8)
 
 def thin_neon_edges(img_bgr, strength=0.4, low_th=110, high_th=220, soften=1.5):
-    base = img_bgr.copy()
+    h, w = img_bgr.shape[:2]
     blur = cv2.GaussianBlur(img_bgr, (0, 0), 0.8)
     edges = cv2.Canny(blur, int(low_th), int(high_th))
     if soften and soften > 0:
         edges = cv2.GaussianBlur(edges, (0, 0), float(soften))
-    neon = np.zeros_like(img_bgr, dtype=np.float32)
-    neon[:, :, 0] = 180  # B
-    neon[:, :, 1] = 60   # G
-    neon[:, :, 2] = 255  # R
-    mask = (edges.astype(np.float32) / 255.0)[:, :, None]
-    mix = np.clip(base.astype(np.float32) + neon * mask * float(strength), 0, 255)
-    return mix.astype(np.uint8)
+    neon = np.array([180, 60, 255], np.float32)  # B, G, R (broadcast, no full-frame plane)
+    with _scratch(img_bgr.shape) as mix, _scratch(img_bgr.shape) as glow, _scratch((h, w)) as mask:
+        _scaled(edges, mask, 255.0)
+        np.multiply(mask[:, :, None], neon, out=glow)
+        glow *= float(strength)
+        _scaled(img_bgr, mix)
+        mix += glow
+        np.clip(mix, 0, 255, out=mix)
+        return mix.astype(np.uint8)
+
+def _vignette_distance_region(full_h, full_w, x0, y0, h, w):
+    """Normalized distance from the frame centre, ** 1.5, for an h x w window at (x0, y0) (float32)."""
+    y = np.arange(y0, y0 + h)[:, None]
+    x = np.arange(x0, x0 + w)[None, :]
+    yc, xc = (full_h - 1) / 2.0, (full_w - 1) / 2.0
+    dist = np.sqrt((x - xc) ** 2 + (y - yc) ** 2)
+    dist /= (np.sqrt(xc ** 2 + yc ** 2) + 1e-6)  # corner distance = max over the full frame
+    return (dist ** 1.5).astype(np.float32)
+
+@lru_cache(maxsize=1)
+def _vignette_distance(h, w):
+    """Read-only distance term of the last frame size (does not depend on the strength slider)."""
+    d = _vignette_distance_region(h, w, 0, 0, h, w)
+    d.flags.writeable = False
+    return d
+
+def _vignette_falloff(d, strength, out=None):
+    """Falloff mask 1 - d * strength (float32) from a distance term."""
+    out = np.multiply(d, np.float32(-strength), out=out)
+    out += np.float32(1)
+    return out
+
+def _vignette_region(full_h, full_w, strength, x0, y0, h, w):
+    """Falloff mask for an h x w window at (x0, y0) of a full_h x full_w frame."""
+    return _vignette_falloff(_vignette_distance_region(full_h, full_w, x0, y0, h, w), strength)
+
+def _vignette_mask(h, w, strength):
+    """Full-frame falloff mask (a new array; only the distance term is cached)."""
+    return _vignette_falloff(_vignette_distance(h, w), strength)
+
+def _apply_mask(img_bgr, mask):
+    with _scratch(img_bgr.shape) as img:
+        _scaled(img_bgr, img)
+        img *= mask[:, :, None]
+        return img.astype(np.uint8)
 
 def vignette(img_bgr, strength=0.35):
     h, w = img_bgr.shape[:2]
-    y, x = np.ogrid[:h, :w]
-    yc, xc = (h - 1) / 2.0, (w - 1) / 2.0
-    dist = np.sqrt((x - xc) ** 2 + (y - yc) ** 2)
-    dist /= (dist.max() + 1e-6)
-    mask = 1 - (dist ** 1.5) * float(strength)
-    mask = mask.astype(np.float32)
-    return (img_bgr.astype(np.float32) * mask[:, :, None]).astype(np.uint8)
+    with _scratch((h, w)) as mask:
+        return _apply_mask(img_bgr, _vignette_falloff(_vignette_distance(h, w), float(strength), out=mask))
 
-def add_scanlines(img_bgr, alpha=0.05):
+def add_scanlines(img_bgr, alpha=0.05, first_row=0):
+    """Darken every other row, starting at `first_row` (0 or 1)."""
     if alpha <= 0:
         return img_bgr
-    out = img_bgr.copy().astype(np.float32)
-    out[::2, :, :] *= (1 - float(alpha))
-    return np.clip(out, 0, 255).astype(np.uint8)
+    out = img_bgr.copy()
+    rows = out[first_row::2]  # only even rows (of the full frame) are darkened
+    with _scratch(rows.shape) as dark:
+        _scaled(rows, dark)
+        dark *= (1 - float(alpha))
+        np.clip(dark, 0, 255, out=dark)
+        np.copyto(rows, dark, casting="unsafe")
+    return out
 
-def tiny_glitch(img_bgr, n=6, max_shift=14):
-    if n <= 0:
-        return img_bgr
+def image_seed(img_bgr):
+    """
+    Stable 32-bit seed for an image's identity: CRC of its shape plus a
+    64x64 grid of pixels at fixed relative positions (no full-frame pass).
+    """
+    h, w = img_bgr.shape[:2]
+    ys = ((np.arange(64) + 0.5) * h / 64).astype(np.intp)
+    xs = ((np.arange(64) + 0.5) * w / 64).astype(np.intp)
+    sample = np.ascontiguousarray(img_bgr[ys[:, None], xs])
+    return zlib.crc32(sample.tobytes(), zlib.crc32(repr(img_bgr.shape).encode()))
+
+def _glitch_row_shifts(h, n, max_shift, seed):
+    """Per-row horizontal shift (mostly zero) of the glitch bands for an h-row frame."""
+    rng = np.random.default_rng(seed)
+    ys = (rng.random(n) * h).astype(np.int64)
+    band_h = rng.integers(2, max(3, h // 45), size=n)
+    shifts = rng.integers(-int(max_shift), int(max_shift) + 1, size=n)
+
+    # per-row shift via a difference array
+    diff = np.zeros(h + 1, np.int64)
+    np.add.at(diff, ys, shifts)
+    np.add.at(diff, np.minimum(h, ys + band_h), -shifts)
+    return np.cumsum(diff[:-1])
+
+def _shift_rows(img_bgr, row_shift, x0=0, full_w=None):
+    """
+    dst(x) = src(x - shift) per row, reflected at the borders of a frame
+    `full_w` wide of which img_bgr is the window starting at column x0.
+    """
     h, w = img_bgr.shape[:2]
+    full_w = w if full_w is None else full_w
+    rows = np.flatnonzero(row_shift)
+    if rows.size == 0:
+        return img_bgr
+
+    # BORDER_REFLECT (fedcba|abcdef|fedcba) in full-frame columns
+    src_x = np.arange(x0, x0 + w)[None, :] - row_shift[rows][:, None]
+    src_x = np.mod(src_x, 2 * full_w)
+    src_x = np.where(src_x < full_w, src_x, 2 * full_w - 1 - src_x)
+    if x0 or full_w != w:
+        src_x = np.clip(src_x - x0, 0, w - 1)  # window: its halo covers the shift
+
+    # gather every shifted pixel in one take over the flattened (pixels, channels) view
+    flat = np.ascontiguousarray(img_bgr).reshape(h * w, -1)
+    idx = (rows[:, None] * w + src_x).ravel()
     out = img_bgr.copy()
-    rng = np.random.default_rng()
-    for _ in range(int(n)):
-        y = int(rng.integers(0, h))
-        band_h = int(rng.integers(2, max(3, h // 45)))
-        x_shift = int(rng.integers(-int(max_shift), int(max_shift) + 1))
-        y2 = min(h, y + band_h)
-        band = out[y:y2].copy()
-        M = np.float32([[1, 0, x_shift], [0, 1, 0]])
-        band = cv2.warpAffine(band, M, (w, band.shape[0]), borderMode=cv2.BORDER_REFLECT)
-        out[y:y2] = band
+    out[rows] = np.take(flat, idx, axis=0).reshape((rows.size,) + img_bgr.shape[1:])
     return out
 
+def tiny_glitch(img_bgr, n=6, max_shift=14, seed=None):
+    """
+    Shift a few random horizontal bands sideways (reflected at the borders).
+    Deterministic: `seed` defaults to image_seed(img_bgr). Overlapping bands
+    add up their shifts; all rows are remapped with one index gather.
+    """
+    if n <= 0:
+        return img_bgr
+    seed = image_seed(img_bgr) if seed is None else int(seed)
+    return _shift_rows(img_bgr, _glitch_row_shifts(img_bgr.shape[0], int(n), max_shift, seed))
+
 # Extra helpers for painterly themes
 def _edges_mask(img_bgr, low, high, sigma=1.0):
     gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
@@ -111,6 +261,13 @@ def _edges_mask(img_bgr, low, high, sigma=1.0):
         gray = cv2.GaussianBlur(gray, (0, 0), float(sigma))
     return cv2.Canny(gray, int(low), int(high))
 
+def _thicken(edges, thick_px):
+    """Edges dilated to `thick_px` (square kernel); unchanged for 1 px."""
+    if thick_px and thick_px > 1:
+        k = cv2.getStructuringElement(cv2.MORPH_RECT, (int(thick_px), int(thick_px)))
+        return cv2.dilate(edges, k, 1)
+    return edges
+
 def _overlay_edges_color(img_bgr, edges, color_bgr=(255, 255, 255), alpha=0.4, thick_px=1):
     """
     Overlay colored edges onto a BGR image.
@@ -126,35 +283,218 @@ def _overlay_edges_color(img_bgr, edges, color_bgr=(255, 255, 255), alpha=0.4, t
     if e.ndim == 3:
         e = cv2.cvtColor(e, cv2.COLOR_BGR2GRAY)
 
-    # Optional thickness
-    if thick_px and thick_px > 1:
-        k = cv2.getStructuringElement(cv2.MORPH_RECT, (int(thick_px), int(thick_px)))
-        e = cv2.dilate(e, k, 1)
+    e = _thicken(e, thick_px)
 
-    # Build a 3-channel mask in [0,1]
-    m = (e > 0).astype(np.float32)[:, :, None]  # H×W×1
     a = float(max(0.0, min(1.0, alpha)))        # clamp alpha
-    color = np.array(color_bgr, dtype=np.float32).reshape(1, 1, 3)
+    color = np.array(color_bgr, dtype=np.float32)
 
     # Blend only where mask==1: out = img*(1-a*m) + color*(a*m)
-    out = img_bgr.astype(np.float32)
-    out = out * (1.0 - a * m) + color * (a * m)
-    return np.clip(out, 0, 255).astype(np.uint8)
+    with _scratch(img_bgr.shape) as out, _scratch(img_bgr.shape) as ink, \
+            _scratch(e.shape) as am, _scratch(e.shape) as keep:
+        np.greater(e, 0, out=am, casting="unsafe")   # mask m in {0, 1}, H×W
+        am *= a
+        np.subtract(1.0, am, out=keep)
+        _scaled(img_bgr, out)
+        out *= keep[:, :, None]
+        np.multiply(am[:, :, None], color, out=ink)
+        out += ink
+        np.clip(out, 0, 255, out=out)
+        return out.astype(np.uint8)
 
 
 def _kmeans_quantize(img_bgr, k=12, attempts=1):
-    Z = img_bgr.reshape((-1, 3)).astype(np.float32)
     K = max(2, int(k))
     criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
-    _compactness, labels, centers = cv2.kmeans(Z, K, None, criteria, int(attempts), cv2.KMEANS_PP_CENTERS)
+    with _scratch((img_bgr.size // 3, 3)) as Z:
+        _scaled(img_bgr.reshape((-1, 3)), Z)
+        _compactness, labels, centers = cv2.kmeans(Z, K, None, criteria, int(attempts), cv2.KMEANS_PP_CENTERS)
     centers = centers.astype(np.uint8)
     q = centers[labels.flatten()].reshape(img_bgr.shape)
     return q
 
+def _nearest_labels(Z, centers, chunk=1 << 18):
+    """Index of the nearest center for each row of Z (float32, N x 3)."""
+    c = np.asarray(centers, np.float32)
+    c2 = (c * c).sum(axis=1)
+    labels = np.empty(len(Z), np.int32)
+    for i in range(0, len(Z), chunk):
+        z = Z[i:i + chunk]
+        labels[i:i + chunk] = np.argmin(c2[None, :] - 2.0 * (z @ c.T), axis=1)
+    return labels
+
+def kmeans_palette(img_bgr, k=12, init_centers=None):
+    """
+    Like _kmeans_quantize but also returns the float32 centers. With
+    `init_centers` (e.g. the previous video frame's palette) k-means starts
+    from those clusters instead of k-means++ seeding, which converges in a
+    few iterations and keeps colours stable from frame to frame.
+    """
+    K = max(2, int(k))
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
+    with _scratch((img_bgr.size // 3, 3)) as Z:
+        _scaled(img_bgr.reshape((-1, 3)), Z)
+        if init_centers is None or len(init_centers) != K:
+            _compactness, labels, centers = cv2.kmeans(Z, K, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+        else:
+            labels = _nearest_labels(Z, init_centers).reshape(-1, 1)
+            _compactness, labels, centers = cv2.kmeans(Z, K, labels, criteria, 1, cv2.KMEANS_USE_INITIAL_LABELS)
+    q = centers.astype(np.uint8)[labels.flatten()].reshape(img_bgr.shape)
+    return q, centers
+
+def quantize_to_palette(img_bgr, centers):
+    """Map every pixel to its nearest palette colour (no k-means iterations)."""
+    with _scratch((img_bgr.size // 3, 3)) as Z:
+        labels = _nearest_labels(_scaled(img_bgr.reshape((-1, 3)), Z), centers)
+    return np.asarray(centers).astype(np.uint8)[labels].reshape(img_bgr.shape)
+
+KMEANS_SAMPLES = 1 << 16  # pixels the sampled fast path fits k-means on
+
+def _kmeans_quantize_sampled(img_bgr, k=12, samples=KMEANS_SAMPLES):
+    """
+    Fast path for _kmeans_quantize: fit k-means on a fixed random subsample of
+    the pixels, then map every pixel to its nearest center.
+    """
+    flat = img_bgr.reshape((-1, 3))
+    if len(flat) <= samples:
+        return _kmeans_quantize(img_bgr, k=k)
+    pick = np.random.default_rng(0).integers(0, len(flat), int(samples))
+    _, centers = kmeans_palette(flat[pick].reshape((-1, 1, 3)), k)
+    return quantize_to_palette(img_bgr, centers)
+
+# ============================================================
+# Shared grading prefix (same step names across themes so that
+# renders of several variants can reuse it, see processing/contact_sheet.py)
+# ============================================================
+
+def _pipeline_params(local_vars):
+    """Pipeline keyword args (everything but the image) as a params dict."""
+    params = dict(local_vars)
+    params.pop("img_bgr", None)
+    return params
+
+# contrast_saturation -> vibrance hand over HSV: one conversion pair instead of two
+_CLAHE = Stage("clahe", ("clahe_clip",),
+               lambda img, src, p: clahe_contrast(img, clip=p["clahe_clip"]), whole_image=True,  # 8x8 tile grid
+               spaces=("lab", "lab"), native_fn=lambda img, src, p: _clahe_lab(img, clip=p["clahe_clip"]))
+_CONTRAST_SAT = Stage("contrast_saturation", ("contrast", "saturation"),
+                      lambda img, src, p: adjust_contrast_saturation(img, contrast=p["contrast"], sat=p["saturation"]),
+                      spaces=("bgr", "hsv"),
+                      native_fn=lambda img, src, p: _contrast_saturation_hsv(img, p["contrast"], p["saturation"]))
+_VIBRANCE = Stage("vibrance", ("vibr",),
+                  lambda img, src, p: vibrance(img, vib=p["vibr"]),
+                  spaces=("hsv", "hsv"), native_fn=lambda img, src, p: _vibrance_hsv(img, vib=p["vibr"]))
+_VIGNETTE = Stage("vignette", ("vignette_amt",),
+                  lambda img, src, p: vignette(img, strength=p["vignette_amt"]),
+                  roi_fn=lambda img, src, p, roi: _apply_mask(img, _vignette_region(
+                      roi.full_h, roi.full_w, float(p["vignette_amt"]), roi.x0, roi.y0, *img.shape[:2])))
+
+GRADE_PREFIX = (_CLAHE, _CONTRAST_SAT, _VIBRANCE)
+
+# stage name -> k for the k-means palette steps (processing/sequence.py swaps
+# these for warm-started / palette-locked versions)
+PALETTE_STAGES = {}
+
+def _kmeans_stage(k):
+    name = f"kmeans_{k}"
+    PALETTE_STAGES[name] = k
+    register_fast_path(name, lambda img, src, p: _kmeans_quantize_sampled(img, k=k))
+    return Stage(name, (), lambda img, src, p: _kmeans_quantize(img, k=k))
+
+
+_TINTS = {}        # tint stage name -> BGR offset at tone_strength 1
+_EDGE_STYLES = {}  # source-edge stage name -> (colour, thickness)
+
+def _tint_stage(name, bgr):
+    warm = np.array(bgr, np.float32)
+    _TINTS[name] = warm
+
+    def fn(img, src, p):
+        with _scratch(img.shape) as out:
+            _scaled(img, out)
+            out += warm * float(p["tone_strength"])
+            np.clip(out, 0, 255, out=out)
+            return out.astype(np.uint8)
+    return Stage(name, ("tone_strength",), fn)
+
+
+_SOURCE_PLANES = {}  # id(src) -> (weakref to src, OrderedDict key -> plane)
+_SOURCE_PLANES_LOCK = threading.Lock()
+_SOURCE_PLANES_PER_IMAGE = 4
+
+def _source_plane(src, key, compute):
+    """
+    Plane derived from a pipeline input (e.g. its edge mask), memoized while
+    `src` is alive so that several themes/presets rendered from the same
+    image (contact sheet, fan-out batch) compute it once. Keeps the last few
+    keys per image; pipeline inputs are never modified in place.
+    """
+    ident = id(src)
+    with _SOURCE_PLANES_LOCK:
+        entry = _SOURCE_PLANES.get(ident)
+        if entry is None or entry[0]() is not src:
+            ref = weakref.ref(src, lambda _r, i=ident: _SOURCE_PLANES.pop(i, None))
+            entry = _SOURCE_PLANES[ident] = (ref, OrderedDict())
+        planes = entry[1]
+        plane = planes.get(key)
+        if plane is not None:
+            planes.move_to_end(key)
+            return plane
+    plane = compute()
+    plane.flags.writeable = False
+    with _SOURCE_PLANES_LOCK:
+        planes[key] = plane
+        while len(planes) > _SOURCE_PLANES_PER_IMAGE:
+            planes.popitem(last=False)
+    return plane
+
+def _src_edges(src, p):
+    key = ("edges", p["edge_low"], p["edge_high"], p["edge_soften"])
+    return _source_plane(src, key, lambda: _edges_mask(src, p["edge_low"], p["edge_high"], sigma=p["edge_soften"]))
+
+def _src_edges_stage(name, color_bgr, thick_px):
+    _EDGE_STYLES[name] = (color_bgr, thick_px)
+
+    def fn(img, src, p):
+        return _overlay_edges_color(img, _src_edges(src, p), color_bgr=color_bgr, alpha=p["edge_strength"],
+                                    thick_px=thick_px)
+    return Stage(name, ("edge_low", "edge_high", "edge_soften", "edge_strength"), fn, halo=12)
+
 # ============================================================
 # Cyberpunk (your existing look)
 # ============================================================
 
+def _cyber_glitch(img, src, p):
+    if p["do_glitch"]:
+        # seed from the pipeline input so unrelated sliders don't reshuffle the bands
+        seed = p["glitch_seed"] if p["glitch_seed"] is not None else image_seed(src)
+        img = tiny_glitch(img, n=p["glitch_n"], max_shift=p["glitch_shift"], seed=seed)
+    return img
+
+def _cyber_glitch_roi(img, src, p, roi):
+    if not p["do_glitch"] or p["glitch_n"] <= 0:
+        return img
+    seed = p["glitch_seed"] if p["glitch_seed"] is not None else image_seed(roi.source)
+    row_shift = _glitch_row_shifts(roi.full_h, int(p["glitch_n"]), p["glitch_shift"], int(seed))
+    return _shift_rows(img, row_shift[roi.y0:roi.y0 + img.shape[0]], x0=roi.x0, full_w=roi.full_w)
+
+CYBERPUNK_STAGES = (
+    Stage("unsharp", (), lambda img, src, p: unsharp_mask(img, amount=0.55, radius=1.3), halo=4),
+    *GRADE_PREFIX,
+    Stage("split_tone", ("tone_strength",),
+          lambda img, src, p: split_tone(img, shadow_tint=(180, 255, 255), highlight_tint=(255, 80, 220),
+                                         strength=p["tone_strength"]), halo=5),
+    Stage("neon_bloom", ("glow",), lambda img, src, p: neon_bloom(img, strength=p["glow"]), halo=32),
+    Stage("neon_edges", ("edge_strength", "edge_low", "edge_high", "edge_soften"),
+          lambda img, src, p: thin_neon_edges(img, strength=p["edge_strength"], low_th=p["edge_low"],
+                                              high_th=p["edge_high"], soften=p["edge_soften"]), halo=12),
+    _VIGNETTE,
+    Stage("scanlines", ("scan_alpha",), lambda img, src, p: add_scanlines(img, alpha=p["scan_alpha"]),
+          orientation_sensitive=True,
+          roi_fn=lambda img, src, p, roi: add_scanlines(img, alpha=p["scan_alpha"], first_row=roi.y0 % 2)),
+    Stage("glitch", ("do_glitch", "glitch_n", "glitch_shift", "glitch_seed"), _cyber_glitch, orientation_sensitive=True,
+          halo=40, roi_fn=_cyber_glitch_roi),  # halo: Glitch Shift slider maximum
+)
+
 def cyberpunkify_pipeline(
     img_bgr,
     clahe_clip=2.2,
@@ -172,24 +512,36 @@ def cyberpunkify_pipeline(
     do_glitch=True,
     glitch_n=6,
     glitch_shift=14,
+    glitch_seed=None,
 ):
-    img = unsharp_mask(img_bgr, amount=0.55, radius=1.3)
-    img = clahe_contrast(img, clip=clahe_clip)
-    img = adjust_contrast_saturation(img, contrast=contrast, sat=saturation)
-    img = vibrance(img, vib=vibr)
-    img = split_tone(img, shadow_tint=(180, 255, 255), highlight_tint=(255, 80, 220), strength=tone_strength)
-    img = neon_bloom(img, strength=glow)
-    img = thin_neon_edges(img, strength=edge_strength, low_th=edge_low, high_th=edge_high, soften=edge_soften)
-    img = vignette(img, strength=vignette_amt)
-    img = add_scanlines(img, alpha=scan_alpha)
-    if do_glitch:
-        img = tiny_glitch(img, n=glitch_n, max_shift=glitch_shift)
-    return img
+    """
+    Unsharp -> CLAHE -> contrast/saturation -> vibrance -> split tone ->
+    neon bloom -> neon edges -> vignette -> scanlines -> optional glitch.
+    glitch_seed=None derives the glitch pattern from the input image.
+    """
+    return run_stages(CYBERPUNK_STAGES, img_bgr, _pipeline_params(locals()))
 
 # ============================================================
 # New themes
 # ============================================================
 
+def _ghibli_soften(img, src, p):
+    # Edge-preserving watercolor feel (fallback to bilateral if not available)
+    glow = float(p["glow"])
+    try:
+        return cv2.edgePreservingFilter(img, flags=1, sigma_s=int(50 * glow + 10), sigma_r=0.35)
+    except Exception:
+        return cv2.bilateralFilter(img, d=7, sigmaColor=40 + int(30 * glow), sigmaSpace=7)
+
+GHIBLI_STAGES = (
+    *GRADE_PREFIX,
+    Stage("ghibli_soften", ("glow",), _ghibli_soften, halo=96),
+    _kmeans_stage(12),                                                          # gentle posterization
+    _tint_stage("ghibli_warm", (0, 12, 24)),                                   # warm tilt
+    _src_edges_stage("ghibli_edges", color_bgr=(20, 20, 20), thick_px=1),      # thin, soft, dark edges
+    _VIGNETTE,
+)
+
 def ghibli_pipeline(
     img_bgr,
     clahe_clip=2.0,
@@ -207,34 +559,23 @@ def ghibli_pipeline(
     do_glitch=False,
     glitch_n=0,
     glitch_shift=0,
+    glitch_seed=None,
 ):
     """
     Soft watercolor/cartoon vibe: edge-preserving smoothing + gentle posterization and warm tint.
     """
-    img = img_bgr.copy()
-    img = clahe_contrast(img, clip=clahe_clip)
-    img = adjust_contrast_saturation(img, contrast=contrast, sat=saturation)
-    img = vibrance(img, vib=vibr)
-
-    # Edge-preserving watercolor feel (fallback to bilateral if not available)
-    try:
-        img = cv2.edgePreservingFilter(img, flags=1, sigma_s=int(50 * float(glow) + 10), sigma_r=0.35)
-    except Exception:
-        img = cv2.bilateralFilter(img, d=7, sigmaColor=40 + int(30 * float(glow)), sigmaSpace=7)
-
-    # Gentle posterization
-    img = _kmeans_quantize(img, k=12)
-
-    # Warm tint based on tone_strength
-    warm = np.array([0, 12, 24], np.float32) * float(tone_strength)  # BGR
-    img = np.clip(img.astype(np.float32) + warm, 0, 255).astype(np.uint8)
-
-    # Thin, soft, dark edges
-    edges = _edges_mask(img_bgr, edge_low, edge_high, sigma=edge_soften)
-    img = _overlay_edges_color(img, edges, color_bgr=(20, 20, 20), alpha=edge_strength, thick_px=1)
-
-    img = vignette(img, strength=vignette_amt)
-    return img
+    return run_stages(GHIBLI_STAGES, img_bgr, _pipeline_params(locals()))
+
+MUGHAL_STAGES = (
+    *GRADE_PREFIX,
+    _kmeans_stage(9),                                                           # palette reduction
+    Stage("mughal_smooth", ("glow",),                                          # gentle smoothing
+          lambda img, src, p: cv2.bilateralFilter(img, d=7, sigmaColor=40 + int(30 * float(p["glow"])), sigmaSpace=7),
+          halo=4),
+    _tint_stage("mughal_parchment", (20, 30, 60)),                             # warm parchment tint
+    _src_edges_stage("mughal_edges", color_bgr=(10, 25, 35), thick_px=2),      # stronger dark outlines
+    _VIGNETTE,
+)
 
 def mughal_pipeline(
     img_bgr,
@@ -253,31 +594,30 @@ def mughal_pipeline(
     do_glitch=False,
     glitch_n=0,
     glitch_shift=0,
+    glitch_seed=None,
 ):
     """
     Miniature painting vibe: earthy palette (quantized), warm parchment tint, clear outlines.
     """
-    img = img_bgr.copy()
-    img = clahe_contrast(img, clip=clahe_clip)
-    img = adjust_contrast_saturation(img, contrast=contrast, sat=saturation)
-    img = vibrance(img, vib=vibr)
-
-    # Palette reduction for painted look
-    img = _kmeans_quantize(img, k=9)
-
-    # Gentle smoothing
-    img = cv2.bilateralFilter(img, d=7, sigmaColor=40 + int(30 * float(glow)), sigmaSpace=7)
+    return run_stages(MUGHAL_STAGES, img_bgr, _pipeline_params(locals()))
 
-    # Warm parchment tint
-    tint = np.array([20, 30, 60], np.float32) * float(tone_strength)  # BGR
-    img = np.clip(img.astype(np.float32) + tint, 0, 255).astype(np.uint8)
-
-    # Stronger dark outlines
-    edges = _edges_mask(img_bgr, edge_low, edge_high, sigma=edge_soften)
-    img = _overlay_edges_color(img, edges, color_bgr=(10, 25, 35), alpha=edge_strength, thick_px=2)
+def _hand_stylize(img, src, p):
+    # Watercolor/oil hybrid (fallback if stylization not present)
+    glow = float(p["glow"])
+    try:
+        sigma_s = int(60 + glow * 80)                            # 10..200
+        sigma_r = float(min(1.0, max(0.05, 0.25 + 0.25 * glow)))  # 0..1
+        return cv2.stylization(img, sigma_s=max(10, sigma_s), sigma_r=sigma_r)
+    except Exception:
+        return cv2.edgePreservingFilter(img, flags=1, sigma_s=80, sigma_r=0.35)
 
-    img = vignette(img, strength=vignette_amt)
-    return img
+HAND_PAINTING_STAGES = (
+    *GRADE_PREFIX,
+    Stage("hand_stylize", ("glow",), _hand_stylize, whole_image=True),  # stylization normalizes globally
+    _src_edges_stage("hand_edges", color_bgr=(30, 30, 30), thick_px=1),        # gentle outlines
+    _tint_stage("hand_canvas", (5, 10, 18)),                                   # slight warm canvas bias
+    _VIGNETTE,
+)
 
 def hand_painting_pipeline(
     img_bgr,
@@ -296,30 +636,36 @@ def hand_painting_pipeline(
     do_glitch=False,
     glitch_n=0,
     glitch_shift=0,
+    glitch_seed=None,
 ):
     """
     Painterly/illustrative: OpenCV stylization + gentle outlines + slight warmth.
     """
-    img = img_bgr.copy()
-    img = clahe_contrast(img, clip=clahe_clip)
-    img = adjust_contrast_saturation(img, contrast=contrast, sat=saturation)
-    img = vibrance(img, vib=vibr)
+    return run_stages(HAND_PAINTING_STAGES, img_bgr, _pipeline_params(locals()))
 
-    # Watercolor/oil hybrid (fallback if stylization not present)
-    try:
-        sigma_s = int(60 + float(glow) * 80)            # 10..200
-        sigma_r = float(min(1.0, max(0.05, 0.25 + 0.25 * float(glow))))  # 0..1
-        img = cv2.stylization(img, sigma_s=max(10, sigma_s), sigma_r=sigma_r)
-    except Exception:
-        img = cv2.edgePreservingFilter(img, flags=1, sigma_s=80, sigma_r=0.35)
-
-    # Gentle outlines to keep structure
-    edges = _edges_mask(img_bgr, edge_low, edge_high, sigma=edge_soften)
-    img = _overlay_edges_color(img, edges, color_bgr=(30, 30, 30), alpha=edge_strength, thick_px=1)
-
-    # Slight warm canvas bias
-    warm = np.array([5, 10, 18], np.float32) * float(tone_strength)
-    img = np.clip(img.astype(np.float32) + warm, 0, 255).astype(np.uint8)
+# ============================================================
+# Fused kernels (optional Numba backend, processing/fused.py):
+# registered as fast paths for runs of consecutive stages
+# ============================================================
 
-    img = vignette(img, strength=vignette_amt)
-    return img
+def _fused_grade(img, src, p):
+    return fused.grade(img, p["contrast"], p["saturation"], p["vibr"])
+
+def _fused_finish(stages):
+    """Fast path for a theme's trailing tint + source edges + vignette stages (either order)."""
+    names = [st.name for st in stages]
+    tint_name = next(n for n in names if n in _TINTS)
+    edge_name = next(n for n in names if n in _EDGE_STYLES)
+    color, thick = _EDGE_STYLES[edge_name]
+
+    def fn(img, src, p):
+        h, w = img.shape[:2]
+        return fused.finish(img, _TINTS[tint_name] * float(p["tone_strength"]), names.index(tint_name) == 0,
+                            _thicken(_src_edges(src, p), thick), color, p["edge_strength"],
+                            _vignette_mask(h, w, float(p["vignette_amt"])))
+    return "+".join(names), fn
+
+if fused.AVAILABLE:
+    register_fast_path("contrast_saturation+vibrance", _fused_grade, backend="numba")
+    for _stages in (GHIBLI_STAGES, MUGHAL_STAGES, HAND_PAINTING_STAGES):
+        register_fast_path(*_fused_finish(_stages[-3:]), backend="numba")
@@ -0,0 +1,173 @@
+# processing/report.py
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .batch import BatchItem
+
+REPORT_VERSION = 1
+SLOWEST_N = 10
+
+
+def peak_rss_bytes() -> Dict[str, Optional[int]]:
+    """
+    Peak resident memory of this process, of its largest finished child
+    (batch worker processes) and the larger of the two; None off POSIX.
+    """
+    try:
+        import resource
+    except ImportError:
+        return {"self": None, "children": None, "max": None}
+    unit = 1 if sys.platform == "darwin" else 1024  # ru_maxrss: bytes on macOS, KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    return {"self": own, "children": children, "max": max(own, children)}
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "mean": float(np.mean(values)), "max": float(max(values))}
+
+
+class BatchReport:
+    """
+    Collects the BatchItems of one run (feed it from the progress callback or
+    the iterator) and turns them into a machine-readable report: throughput
+    overall and per worker, per-file latency percentiles (one decode, render
+    and write of all its outputs), time per step, peak RSS, the slowest
+    files with their dimensions, and failures.
+    """
+
+    def __init__(self, total: int, meta: Optional[dict] = None):
+        self.total = int(total)
+        self.meta = dict(meta or {})
+        self.items: List[BatchItem] = []
+        self.started = time.perf_counter()
+        self.created = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.elapsed: Optional[float] = None
+        self.cancelled = False
+        self.error: Optional[str] = None  # why the run stopped early (not a per-file failure)
+
+    def add(self, item: BatchItem):
+        self.items.append(item)
+
+    def finish(self, cancelled: bool = False, error: Optional[str] = None):
+        """End the run: completed, cancelled, or failed with `error`."""
+        self.elapsed = time.perf_counter() - self.started
+        self.cancelled = bool(cancelled)
+        self.error = error
+
+    def to_dict(self, slowest: int = SLOWEST_N) -> dict:
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        files: Dict[str, dict] = {}
+        workers: Dict[str, dict] = {}
+        stages: Dict[str, float] = {}
+        for it in self.items:
+            f = files.setdefault(it.path, {"seconds": 0.0, "size": None, "outputs": 0})
+            f["seconds"] += it.seconds
+            f["outputs"] += 1
+            f["size"] = f["size"] or it.size
+            w = workers.setdefault(it.worker or "?", {"outputs": 0, "busy_seconds": 0.0})
+            w["outputs"] += 1
+            w["busy_seconds"] += it.seconds
+            for name, sec in (it.stages or {}).items():
+                stages[name] = stages.get(name, 0.0) + sec
+        for w in workers.values():
+            w["outputs_per_second"] = w["outputs"] / w["busy_seconds"] if w["busy_seconds"] > 0 else None
+        stage_total = sum(stages.values())
+        ok = sum(1 for it in self.items if it.ok)
+        ranked = sorted(files.items(), key=lambda kv: -kv[1]["seconds"])[:max(0, int(slowest))]
+        return {
+            "version": REPORT_VERSION,
+            "created": self.created,
+            "host": {"node": platform.node(), "python": platform.python_version(), "cpus": os.cpu_count()},
+            "meta": self.meta,
+            "cancelled": self.cancelled,
+            "error": self.error,
+            "elapsed_seconds": elapsed,
+            "outputs": {"total": self.total, "ok": ok, "failed": len(self.items) - ok,
+                        "skipped": self.total - len(self.items)},
+            "files": len(files),
+            "throughput": {
+                "outputs_per_second": len(self.items) / elapsed if elapsed > 0 else None,
+                "files_per_second": len(files) / elapsed if elapsed > 0 else None,
+                "per_worker": workers,
+            },
+            "latency_seconds": _percentiles([f["seconds"] for f in files.values()]),
+            "stage_seconds": {name: {"seconds": sec, "share": sec / stage_total if stage_total else 0.0}
+                              for name, sec in sorted(stages.items(), key=lambda kv: -kv[1])},
+            "peak_rss_bytes": peak_rss_bytes(),
+            "slowest": [{"path": path, "seconds": f["seconds"], "outputs": f["outputs"],
+                         "width": f["size"][0] if f["size"] else None,
+                         "height": f["size"][1] if f["size"] else None}
+                        for path, f in ranked],
+            "failures": [{"path": it.path, "error": it.error} for it in self.items if not it.ok],
+        }
+
+    def save(self, path: str) -> str:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        os.replace(tmp, path)
+        return path
+
+
+def default_report_path(outdir: str) -> str:
+    return os.path.join(outdir, time.strftime("batch-report-%Y%m%d-%H%M%S.json"))
+
+
+def load_report(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# (label, path into the report, True if higher is better)
+COMPARED = (
+    ("outputs/s", ("throughput", "outputs_per_second"), True),
+    ("files/s", ("throughput", "files_per_second"), True),
+    ("latency p50 s", ("latency_seconds", "p50"), False),
+    ("latency p95 s", ("latency_seconds", "p95"), False),
+    ("latency p99 s", ("latency_seconds", "p99"), False),
+    ("peak RSS MB", ("peak_rss_bytes", "max"), False),
+    ("failed", ("outputs", "failed"), False),
+)
+
+
+def _get(report: dict, keys):
+    for k in keys:
+        report = report.get(k) if isinstance(report, dict) else None
+    return report
+
+
+def compare_reports(a: dict, b: dict) -> List[Tuple[str, Optional[float], Optional[float], Optional[float], bool]]:
+    """
+    Rows of (metric, a, b, change in %, worse) for report `b` against
+    baseline `a`: the headline metrics, then seconds per file of every step.
+    """
+    rows = []
+
+    def row(label, va, vb, higher_better):
+        change = (vb - va) / va * 100.0 if va and vb is not None else None
+        worse = change is not None and (change < 0 if higher_better else change > 0)
+        rows.append((label, va, vb, change, worse))
+
+    for label, keys, higher_better in COMPARED:
+        va, vb = _get(a, keys), _get(b, keys)
+        if label.endswith("MB"):
+            va, vb = (v / (1024 * 1024) if v is not None else None for v in (va, vb))
+        row(label, va, vb, higher_better)
+    files_a, files_b = max(1, a.get("files") or 0), max(1, b.get("files") or 0)
+    sa, sb = a.get("stage_seconds") or {}, b.get("stage_seconds") or {}
+    for name in list(sa) + [n for n in sb if n not in sa]:
+        va = sa[name]["seconds"] / files_a if name in sa else None
+        vb = sb[name]["seconds"] / files_b if name in sb else None
+        row(f"{name} s/file", va, vb, False)
+    return rows
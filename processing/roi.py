@@ -0,0 +1,91 @@
+# processing/roi.py
+import threading
+from typing import Tuple
+
+import numpy as np
+
+from utils.image_io import make_proxy
+from .pipeline import PALETTE_STAGES, kmeans_palette, quantize_to_palette
+from .stages import Roi, apply_stage, convert, run_stages, stage_params
+from .themes import get_pipeline, get_stages, resolve_theme
+
+
+class RoiRenderer:
+    """
+    Full-resolution renders of small rectangles of a large image (1:1 zoom).
+
+    Steps up to the last whole-image one (CLAHE, stylization) run once at
+    full size and are cached for as long as their params stay the same. The remaining
+    steps run on the requested rectangle plus a halo wide enough for their
+    blurs and shifts; position-dependent steps (vignette, scanlines,
+    glitch) use their Stage.roi_fn with the window's full-frame offset, and
+    k-means steps map to a palette computed once on a proxy.
+    Local steps match a full render up to OpenCV's rounding at row ends;
+    the proxy palette is a close approximation of the full-size one.
+    """
+
+    def __init__(self, source: np.ndarray, theme: str):
+        self.source = source
+        self.theme = resolve_theme(theme)
+        stages = get_stages(self.theme)
+        cut = max((i + 1 for i, st in enumerate(stages) if st.whole_image), default=0)
+        self.stages = stages
+        self.prefix, self.rest = stages[:cut], stages[cut:]
+        self.halo = sum(st.halo for st in self.rest)
+        self._context = (None, None)   # (prefix keys, full-size prefix output)
+        self._palettes = {}            # stage keys up to a k-means step -> centers
+        self._proxy = None
+        self._lock = threading.Lock()
+
+    def context(self, params: dict) -> np.ndarray:
+        """Full-size output of the whole-image prefix (cached for the last params)."""
+        params = stage_params(get_pipeline(self.theme), params)
+        keys = tuple(st.key(params) for st in self.prefix)
+        with self._lock:
+            if self._context[0] == keys:
+                return self._context[1]
+        out = run_stages(self.prefix, self.source, params)
+        with self._lock:
+            self._context = (keys, out)
+        return out
+
+    def _palette(self, index: int, params: dict):
+        keys = tuple(st.key(params) for st in self.stages[:index + 1])
+        with self._lock:
+            centers = self._palettes.get(keys)
+        if centers is None:
+            if self._proxy is None:
+                self._proxy = make_proxy(self.source)
+            upstream = run_stages(self.stages[:index], self._proxy, params)
+            _, centers = kmeans_palette(upstream, PALETTE_STAGES[self.stages[index].name])
+            with self._lock:
+                if len(self._palettes) >= 8:
+                    self._palettes.pop(next(iter(self._palettes)))
+                self._palettes[keys] = centers
+        return centers
+
+    def render(self, params: dict, rect: Tuple[int, int, int, int]) -> np.ndarray:
+        """BGR render of rect = (x0, y0, x1, y1) in full-image pixels (clipped to the image)."""
+        params = stage_params(get_pipeline(self.theme), params)
+        H, W = self.source.shape[:2]
+        x0, y0, x1, y1 = (int(v) for v in rect)
+        x0, x1 = max(0, min(W - 1, x0)), max(1, min(W, x1))
+        y0, y1 = max(0, min(H - 1, y0)), max(1, min(H, y1))
+        x1, y1 = max(x1, x0 + 1), max(y1, y0 + 1)
+        cx0, cy0 = max(0, x0 - self.halo), max(0, y0 - self.halo)
+        cx1, cy1 = min(W, x1 + self.halo), min(H, y1 + self.halo)
+
+        img = self.context(params)[cy0:cy1, cx0:cx1]
+        src = self.source[cy0:cy1, cx0:cx1]
+        roi = Roi(cx0, cy0, W, H, self.source)
+        offset = len(self.prefix)
+        space = "bgr"
+        for i, st in enumerate(self.rest, start=offset):
+            if st.name in PALETTE_STAGES:
+                img, space = quantize_to_palette(convert(img, space, "bgr"), self._palette(i, params)), "bgr"
+            elif st.roi_fn is not None:
+                img, space = st.roi_fn(convert(img, space, "bgr"), src, params, roi), "bgr"
+            else:
+                img, space = apply_stage(st, img, space, src, params)
+        img = convert(img, space, "bgr")
+        return np.ascontiguousarray(img[y0 - cy0:y1 - cy0, x0 - cx0:x1 - cx0])
@@ -0,0 +1,233 @@
+# processing/sequence.py
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.image_io import list_images_in_folder, load_bgr, save_bgr
+from .pipeline import PALETTE_STAGES, kmeans_palette, quantize_to_palette, _kmeans_quantize
+from .stages import CancelToken, RenderCancelled, Stage, active_fast_paths, fused_names, run_stages, stage_params
+from .themes import get_pipeline, get_stages, resolve_theme
+
+VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+PALETTE_MODES = ("lock", "warm", "off")
+PALETTE_WAIT_POLL_S = 0.1  # how often a frame waiting for a palette checks for cancellation
+
+
+@dataclass(frozen=True)
+class FrameJob:
+    index: int
+    shot: int
+    shot_start: bool    # first frame of its shot (scene cut or start of sequence)
+
+
+def glitch_seed_for(index: int, base_seed: Optional[int], hold: int) -> int:
+    """
+    Glitch seed of frame `index`: bands change every `hold` frames
+    (hold=0 keeps one pattern for the whole sequence).
+    """
+    base = 0 if base_seed is None else int(base_seed)
+    return base if hold <= 0 else base + index // int(hold)
+
+
+def _thumb(frame):
+    return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (32, 32), interpolation=cv2.INTER_AREA)
+
+
+class _Palettes:
+    """
+    Palettes handed between frames rendered on different threads.
+    lock: the first frame of a shot computes the palette, the rest of the shot
+          waits for it and only maps pixels to it (no k-means, no flicker).
+    warm: every frame runs k-means seeded with the previous frame's centers
+          (the palette step is serialized; everything around it runs in parallel).
+    A slot published as None (its owner failed or was cancelled) makes
+    waiters fall back to plain k-means for that frame. Waiters give up with
+    RenderCancelled once `cancel` is set.
+    """
+
+    def __init__(self, mode: str, cancel: Optional[CancelToken] = None):
+        self.mode = mode
+        self.cancel = cancel
+        self._slots = {}
+        self._cond = threading.Condition()
+
+    def _wait(self, slot):
+        with self._cond:
+            while not self._cond.wait_for(lambda: slot in self._slots, timeout=PALETTE_WAIT_POLL_S):
+                if self.cancel is not None and self.cancel.cancelled:
+                    raise RenderCancelled("palette")
+            return self._slots[slot] if self.mode == "lock" else self._slots.pop(slot)
+
+    def _publish(self, slot, centers):
+        with self._cond:
+            self._slots.setdefault(slot, centers)
+            self._cond.notify_all()
+
+    def _owned(self, job: FrameJob):
+        if self.mode == "lock":
+            return [(job.shot, name) for name in PALETTE_STAGES] if job.shot_start else []
+        return [(job.index, name) for name in PALETTE_STAGES]
+
+    def release(self, job: FrameJob):
+        """Unblock waiters on anything `job` should have published (call when it ends)."""
+        for slot in self._owned(job):
+            self._publish(slot, None)
+
+    def stage(self, st: Stage, job: FrameJob) -> Stage:
+        k = PALETTE_STAGES[st.name]
+
+        def locked(img, src, p):
+            slot = (job.shot, st.name)
+            if job.shot_start:
+                q, centers = kmeans_palette(img, k)
+                self._publish(slot, centers)
+                return q
+            centers = self._wait(slot)
+            return _kmeans_quantize(img, k=k) if centers is None else quantize_to_palette(img, centers)
+
+        def warm(img, src, p):
+            prev = None if job.shot_start else self._wait((job.index - 1, st.name))
+            q, centers = kmeans_palette(img, k, init_centers=prev)
+            self._publish((job.index, st.name), centers)
+            return q
+
+        return Stage(st.name, st.keys, locked if self.mode == "lock" else warm, st.orientation_sensitive)
+
+
+def iter_sequence(
+    frames: Iterable[np.ndarray],
+    theme: str,
+    params: dict,
+    workers: int = 1,
+    palette: str = "lock",
+    shot_threshold: float = 30.0,
+    glitch_hold: int = 1,
+    cancel: Optional[CancelToken] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Render a frame stream with the theme and yield (index, frame) in input
+    order while up to `workers` frames render concurrently.
+    - palette: "lock" / "warm" reuse k-means palettes between frames (see
+      _Palettes); "off" renders every frame independently.
+    - shot_threshold: mean absolute difference (0-255) of 32x32 grey
+      thumbnails above which a frame starts a new shot (palettes reset).
+    - glitch_hold: the glitch seed advances every N frames, starting from
+      params["glitch_seed"] (or 0), instead of following the image content.
+    """
+    theme = resolve_theme(theme)
+    stages = get_stages(theme)
+    base = stage_params(get_pipeline(theme), params)
+    palettes = _Palettes(palette, cancel) if palette in ("lock", "warm") else None
+    impls = {n: fn for n, fn in active_fast_paths().items()
+             if not set(fused_names(n)) & set(PALETTE_STAGES)}  # keep the shared palettes
+    workers = max(1, int(workers))
+
+    def render(job: FrameJob, frame):
+        p = dict(base, glitch_seed=glitch_seed_for(job.index, base.get("glitch_seed"), glitch_hold))
+        if palettes is None:
+            return run_stages(stages, frame, p)
+        try:
+            frame_stages = [palettes.stage(st, job) if st.name in PALETTE_STAGES else st for st in stages]
+            return run_stages(frame_stages, frame, p, impls=impls)
+        finally:
+            palettes.release(job)
+
+    pending = deque()
+    prev_thumb, shot = None, 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # tasks start in submission order, so a frame waiting on an earlier
+        # frame's palette never waits on a task that has not started
+        for index, frame in enumerate(frames):
+            if cancel is not None and cancel.cancelled:
+                break
+            thumb = _thumb(frame)
+            cut = prev_thumb is None or thumb.shape != prev_thumb.shape or \
+                float(cv2.absdiff(thumb, prev_thumb).mean()) > shot_threshold
+            if cut and prev_thumb is not None:
+                shot += 1
+            prev_thumb = thumb
+            job = FrameJob(index, shot, cut)
+            pending.append((job, pool.submit(render, job, frame)))
+            while len(pending) >= workers * 2 and not (cancel is not None and cancel.cancelled):
+                job, fut = pending.popleft()
+                yield job.index, fut.result()
+        while pending:
+            job, fut = pending.popleft()
+            if cancel is not None and cancel.cancelled:
+                # a frame that never starts never releases its palette slots
+                if fut.cancel() and palettes is not None:
+                    palettes.release(job)
+                continue
+            yield job.index, fut.result()
+
+
+# ============================================================
+# Frame sources / sinks (a folder of images or a video file)
+# ============================================================
+
+def is_video(path: str) -> bool:
+    return os.path.splitext(path.lower())[1] in VIDEO_EXTS
+
+
+def read_frames(source: str) -> Iterator[Tuple[str, np.ndarray]]:
+    """Yield (name, BGR frame) from a folder of images (sorted) or a video file."""
+    if os.path.isdir(source):
+        for path in list_images_in_folder(source):
+            yield os.path.splitext(os.path.basename(path))[0], load_bgr(path)
+        return
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {source}")
+    try:
+        index = 0
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                return
+            yield f"frame_{index:06d}", frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def source_fps(source: str, default: float = 24.0) -> float:
+    if os.path.isdir(source):
+        return default
+    cap = cv2.VideoCapture(source)
+    fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0
+    cap.release()
+    return fps if fps and fps > 0 else default
+
+
+class FrameWriter:
+    """Writes frames to a video file (by extension) or as PNGs into a folder."""
+
+    def __init__(self, target: str, fps: float = 24.0):
+        self.target = target
+        self.fps = fps
+        self._video = None
+        if not is_video(target):
+            os.makedirs(target, exist_ok=True)
+
+    def write(self, name: str, frame: np.ndarray):
+        if not is_video(self.target):
+            save_bgr(os.path.join(self.target, name + ".png"), frame, atomic=True)
+            return
+        if self._video is None:
+            h, w = frame.shape[:2]
+            self._video = cv2.VideoWriter(self.target, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (w, h))
+            if not self._video.isOpened():
+                raise ValueError(f"Cannot write video: {self.target}")
+        self._video.write(frame)
+
+    def close(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
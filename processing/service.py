@@ -0,0 +1,337 @@
+# processing/service.py
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Host / Origin names accepted besides the address the server is bound to
+LOOPBACK_HOSTS = frozenset({"127.0.0.1", "localhost", "::1"})
+
+# ============================================================
+# Worker side (runs in the pool processes)
+# ============================================================
+
+def _warm():
+    """Pool initializer: import OpenCV/NumPy/themes once and JIT the first render."""
+    from processing.themes import THEME_NAMES, get_pipeline
+    tiny = np.zeros((32, 32, 3), np.uint8)
+    for name in THEME_NAMES:
+        get_pipeline(name)(tiny)
+
+
+def attach_shm(name: str) -> shared_memory.SharedMemory:
+    """Attach to a block owned by someone else without adopting it for cleanup."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+def _render_one(spec: dict) -> dict:
+    from processing.themes import get_pipeline
+    from utils.image_io import load_bgr, save_bgr
+
+    t0 = time.perf_counter()
+    blocks = []
+    try:
+        src = spec["input"]
+        if "shm" in src:
+            shm = attach_shm(src["shm"])
+            blocks.append(shm)
+            img = np.ndarray(tuple(src["shape"]), np.uint8, buffer=shm.buf)
+        else:
+            img = load_bgr(src["path"])
+
+        out = get_pipeline(spec.get("theme", "Cyberpunk"))(img, **spec.get("params", {}))
+
+        dst = spec["output"]
+        if "shm" in dst:
+            shm = attach_shm(dst["shm"])
+            blocks.append(shm)
+            view = np.ndarray(out.shape, np.uint8, buffer=shm.buf)
+            view[...] = out
+            del view
+        else:
+            save_bgr(dst["path"], out, atomic=True)
+        return {"ok": True, "shape": list(out.shape), "seconds": time.perf_counter() - t0}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}", "seconds": time.perf_counter() - t0}
+    finally:
+        img = out = None  # drop buffer views before closing the blocks
+        for shm in blocks:
+            shm.close()
+
+
+def _render_many(specs):
+    return [_render_one(s) for s in specs]
+
+# ============================================================
+# Service (dispatcher + HTTP front end)
+# ============================================================
+
+class RenderService:
+    """
+    Warm process pool behind a request queue. Requests that arrive within
+    `batch_window` seconds of each other are grouped and shipped to the
+    workers in as few round-trips as there are workers.
+    """
+
+    def __init__(self, workers: Optional[int] = None, batch_window: float = 0.005, max_batch: int = 32):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._started = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm)
+        self._started = time.time()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+        return self
+
+    def shutdown(self):
+        self._stop.set()
+        self._queue.put(None)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, spec: dict) -> Future:
+        fut = Future()
+        self._queue.put((spec, fut))
+        return fut
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "uptime": 0.0 if self._started is None else time.time() - self._started,
+            }
+
+    def _dispatch(self):
+        while not self._stop.is_set():
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._stop.set()
+                    break
+                batch.append(item)
+
+            with self._lock:
+                self._in_flight += len(batch)
+            n = min(self.workers, len(batch))
+            for chunk in (batch[i::n] for i in range(n)):
+                try:
+                    pf = self._pool.submit(_render_many, [spec for spec, _ in chunk])
+                except RuntimeError as e:  # pool shut down
+                    self._resolve(chunk, [{"ok": False, "error": str(e)}] * len(chunk))
+                    continue
+                pf.add_done_callback(lambda f, c=chunk: self._resolve(c, self._chunk_result(f, len(c))))
+
+    @staticmethod
+    def _chunk_result(pool_future, n):
+        try:
+            return pool_future.result()
+        except Exception as e:  # worker crashed
+            return [{"ok": False, "error": f"{type(e).__name__}: {e}"}] * n
+
+    def _resolve(self, chunk, results):
+        with self._lock:
+            self._in_flight -= len(chunk)
+            for r in results:
+                if r.get("ok"):
+                    self._completed += 1
+                else:
+                    self._failed += 1
+        for (_, fut), res in zip(chunk, results):
+            fut.set_result(res)
+
+
+def unknown_params(theme: str, params: dict) -> list:
+    """Keys of `params` the theme's pipeline does not take (they would fail in the worker)."""
+    from processing.stages import stage_params
+    from processing.themes import get_pipeline
+    known = stage_params(get_pipeline(theme), {})
+    return sorted(k for k in params if k not in known)
+
+
+def _hostname(value: str) -> str:
+    """Host name of a Host header ('[::1]:8765') or an Origin ('http://localhost:8765'), lowercased."""
+    try:
+        return urllib.parse.urlsplit(value if "://" in value else "//" + value).hostname or ""
+    except ValueError:
+        return ""
+
+
+def allowed_hosts(host: str) -> frozenset:
+    """Names a request's Host / Origin may use: loopback, plus `host` when bound to one address."""
+    return LOOPBACK_HOSTS | ({host.lower()} if host not in ("", "0.0.0.0", "::") else set())
+
+
+def _make_handler(service: RenderService, hosts: frozenset = LOOPBACK_HOSTS):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _refused(self) -> bool:
+            """
+            Answer 403 to requests naming another host (DNS rebinding) or sent
+            by a page from another origin; True if refused.
+            """
+            origin = self.headers.get("Origin")
+            if (_hostname(self.headers.get("Host", "")) not in hosts
+                    or (origin is not None and _hostname(origin) not in hosts)):
+                self._send(403, {"ok": False, "error": "forbidden host or origin"})
+                return True
+            return False
+
+        def do_GET(self):
+            if self._refused():
+                return
+            if self.path == "/health":
+                self._send(200, {"status": "ok", **service.stats()})
+            elif self.path == "/queue":
+                st = service.stats()
+                self._send(200, {"queued": st["queued"], "in_flight": st["in_flight"]})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/render":
+                self._send(404, {"error": "not found"})
+                return
+            if self._refused():
+                return
+            # a browser can only send JSON cross-origin after a CORS preflight, which is never answered
+            if self.headers.get_content_type() != "application/json":
+                self._send(415, {"ok": False, "error": "Content-Type must be application/json"})
+                return
+            try:
+                n = int(self.headers.get("Content-Length", 0))
+                spec = json.loads(self.rfile.read(n) or b"{}")
+                if "input" not in spec or "output" not in spec:
+                    raise ValueError("'input' and 'output' are required")
+                if not isinstance(spec.get("params", {}), dict):
+                    raise ValueError("'params' must be an object")
+                unknown = unknown_params(spec.get("theme", "Cyberpunk"), spec.get("params", {}))
+                if unknown:
+                    raise ValueError(f"unknown params: {', '.join(unknown)}")
+            except Exception as e:
+                self._send(400, {"ok": False, "error": str(e)})
+                return
+            result = service.submit(spec).result()
+            self._send(200 if result.get("ok") else 500, result)
+
+        def log_message(self, *_):
+            pass  # keep the console quiet; /health has the counters
+
+    return Handler
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: Optional[int] = None):
+    """Run the render service until interrupted (used by `python cli.py serve`)."""
+    service = RenderService(workers=workers).start()
+    httpd = ThreadingHTTPServer((host, port), _make_handler(service, allowed_hosts(host)))
+    print(f"Render service on http://{host}:{port} ({service.workers} workers)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.shutdown()
+
+# ============================================================
+# Client helpers
+# ============================================================
+
+class RenderClient:
+    """Talks to a running service; arrays travel through shared memory, not the socket."""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: float = 600):
+        self.base = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def _call(self, method, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        req = urllib.request.Request(self.base + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            return json.loads(e.read() or b"{}")
+
+    def health(self) -> dict:
+        return self._call("GET", "/health")
+
+    def queue_depth(self) -> dict:
+        return self._call("GET", "/queue")
+
+    def render_file(self, in_path: str, out_path: str, theme: str = "Cyberpunk", params: Optional[dict] = None):
+        return self._call("POST", "/render", {
+            "theme": theme, "params": params or {},
+            "input": {"path": os.path.abspath(in_path)}, "output": {"path": os.path.abspath(out_path)},
+        })
+
+    def render_array(self, img_bgr, theme: str = "Cyberpunk", params: Optional[dict] = None):
+        """Render a uint8 BGR array; returns the result array (raises RuntimeError on failure)."""
+        img_bgr = np.ascontiguousarray(img_bgr, dtype=np.uint8)
+        src = shared_memory.SharedMemory(create=True, size=img_bgr.nbytes)
+        dst = shared_memory.SharedMemory(create=True, size=img_bgr.nbytes)
+        try:
+            np.ndarray(img_bgr.shape, np.uint8, buffer=src.buf)[...] = img_bgr
+            res = self._call("POST", "/render", {
+                "theme": theme, "params": params or {},
+                "input": {"shm": src.name, "shape": list(img_bgr.shape)},
+                "output": {"shm": dst.name},
+            })
+            if not res.get("ok"):
+                raise RuntimeError(res.get("error", "render failed"))
+            return np.ndarray(tuple(res["shape"]), np.uint8, buffer=dst.buf).copy()
+        finally:
+            for shm in (src, dst):
+                shm.close()
+                shm.unlink()
@@ -0,0 +1,239 @@
+# processing/stages.py
+import inspect
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Sequence, Set, Tuple
+
+from utils.settings import get_setting
+
+
+class CancelToken:
+    """Cooperative cancel flag shared between a render/batch and whoever started it."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class RenderCancelled(Exception):
+    """Raised by run_stages when its CancelToken fires between stages."""
+
+
+class StageTimes:
+    """Seconds spent per stage name, summed over every run it is passed to (thread-safe)."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def run(self, name: str, fn: Callable, *args):
+        """fn(*args), timed under `name`."""
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One step of a theme pipeline.
+    - name: stable identifier, shared by every theme that runs the same step
+    - keys: pipeline params the step reads (two stages with the same name and
+      the same values for `keys` produce the same output from the same input)
+    - fn(img, src, params) -> img; `src` is the untouched pipeline input
+      (some themes detect edges on it rather than on the graded image)
+    - orientation_sensitive: output is NOT equivariant under 90-degree
+      rotations/flips (row-based or random effects); see split_tail()
+    Region-of-interest rendering (processing/roi.py):
+    - halo: pixels around an output pixel the step reads (blur radius, max shift)
+    - whole_image: needs statistics of the full frame (e.g. CLAHE tiles);
+      everything up to the last such step is rendered once at full size
+    - roi_fn(img, src, params, roi): variant for steps that depend on where
+      the pixel sits in the full frame (vignette, scanlines, glitch bands)
+    Colour spaces (see apply_stage):
+    - spaces: (input, output) colour space of native_fn, e.g. ("hsv", "hsv")
+    - native_fn(img, src, params): the same step without converting from/to
+      BGR itself, so consecutive stages working in one space share a single
+      conversion (and skip a uint8 round trip through BGR)
+    """
+    name: str
+    keys: Tuple[str, ...]
+    fn: Callable
+    orientation_sensitive: bool = False
+    halo: int = 0
+    whole_image: bool = False
+    roi_fn: Optional[Callable] = None
+    spaces: Tuple[str, str] = ("bgr", "bgr")
+    native_fn: Optional[Callable] = None
+
+    def key(self, params: dict) -> tuple:
+        return (self.name,) + tuple(params[k] for k in self.keys)
+
+
+@dataclass(frozen=True)
+class Roi:
+    """Where a cropped stage input sits in the full frame (see Stage.roi_fn)."""
+    x0: int
+    y0: int
+    full_w: int
+    full_h: int
+    source: object  # full-size pipeline input (e.g. for image_seed)
+
+
+# Faster, approximately equal implementations of stages, by stage name:
+# fn(img, src, params) -> img. A name joining several stage names with "+"
+# replaces that run of consecutive stages (fused kernels). run_stages uses
+# them only when they are switched on in settings ("fast_paths", or
+# "kernel_backend" for those of an optional backend); `python cli.py verify`
+# measures how close they are to the reference Stage.fn.
+FAST_PATHS: Dict[str, Callable] = {}
+_BACKEND_PATHS: Dict[str, Set[str]] = {}  # backend -> fast path names it registered
+FUSE_SEP = "+"
+
+
+def register_fast_path(name: str, fn: Callable, backend: Optional[str] = None):
+    FAST_PATHS[name] = fn
+    if backend:
+        _BACKEND_PATHS.setdefault(backend, set()).add(name)
+
+
+def fused_names(name: str) -> Tuple[str, ...]:
+    """Stage names a fast path replaces ('a+b' -> ('a', 'b'))."""
+    return tuple(name.split(FUSE_SEP))
+
+
+@lru_cache(maxsize=1)
+def _fast_paths_setting():
+    value = get_setting("fast_paths")
+    return (value if value is True else frozenset(value or ())), get_setting("kernel_backend")
+
+
+def active_fast_paths() -> Dict[str, Callable]:
+    """
+    Registered fast paths enabled by settings: "fast_paths" true for all or a
+    list of names, plus every path of the "kernel_backend" (e.g. "numba") if
+    that backend is installed; otherwise the NumPy stages run.
+    """
+    enabled, backend = _fast_paths_setting()
+    if enabled is True:
+        return dict(FAST_PATHS)
+    enabled = enabled | _BACKEND_PATHS.get(backend, set())
+    return {name: fn for name, fn in FAST_PATHS.items() if name in enabled}
+
+
+def fast_paths_key(stages: Sequence[Stage]) -> tuple:
+    """
+    (sorted names, backend) of the active fast paths that can replace some of
+    `stages`; backend is None unless one of them comes from it. Renders made
+    with different fast paths differ, so stored renders are keyed on this.
+    """
+    names = {st.name for st in stages}
+    used = sorted(n for n in active_fast_paths() if set(fused_names(n)) <= names)
+    backend = _fast_paths_setting()[1]
+    own = _BACKEND_PATHS.get(backend, set())
+    return tuple(used), (backend if any(n in own for n in used) else None)
+
+
+# (from space, to space) -> fn(img) -> img; registered with the filters
+# (processing/pipeline.py). Pairs without an entry go through BGR.
+SPACE_CONVERSIONS: Dict[Tuple[str, str], Callable] = {}
+
+
+def register_conversion(src: str, dst: str, fn: Callable):
+    SPACE_CONVERSIONS[(src, dst)] = fn
+
+
+def convert(img, src: str, dst: str):
+    """`img` from colour space `src` to `dst` (no-op when they match)."""
+    if src == dst:
+        return img
+    fn = SPACE_CONVERSIONS.get((src, dst))
+    if fn is not None:
+        return fn(img)
+    return SPACE_CONVERSIONS[("bgr", dst)](SPACE_CONVERSIONS[(src, "bgr")](img))
+
+
+def apply_stage(st: Stage, img, space: str, src, params: dict, fn: Optional[Callable] = None):
+    """
+    Run `st` on `img`, which is in colour `space`; returns (output, its space).
+    Uses st.native_fn (converting only if `img` is in another space) unless
+    `fn` (a fast path, BGR in and out) is given or the stage has none.
+    """
+    if fn is None and st.native_fn is not None:
+        return st.native_fn(convert(img, space, st.spaces[0]), src, params), st.spaces[1]
+    return (fn or st.fn)(convert(img, space, "bgr"), src, params), "bgr"
+
+
+def _fused_at(stages: Sequence[Stage], i: int, fused) -> Optional[Tuple[int, Callable]]:
+    """(length, fn) of a fused fast path covering stages[i:], if any."""
+    for names, fn in fused:
+        if tuple(st.name for st in stages[i:i + len(names)]) == names:
+            return len(names), fn
+    return None
+
+
+def run_stages(stages: Sequence[Stage], img_bgr, params: dict, src=None, cancel: CancelToken = None,
+               impls: Optional[Dict[str, Callable]] = None, times: Optional[StageTimes] = None):
+    """
+    Run `stages` in order; `src` defaults to the input image.
+    If `cancel` fires, stops before the next stage with RenderCancelled.
+    `impls` replaces Stage.fn by stage name (or a run of stages, 'a+b');
+    None uses the enabled fast paths, {} forces the reference implementations.
+    `times` accumulates the seconds spent in each stage.
+    Consecutive stages with a native colour space other than BGR hand the
+    image over in that space (see apply_stage); the result is always BGR.
+    """
+    src = img_bgr if src is None else src
+    impls = active_fast_paths() if impls is None else impls
+    fused = [(fused_names(n), fn) for n, fn in impls.items() if FUSE_SEP in n]
+    img, space = img_bgr, "bgr"
+    i = 0
+    while i < len(stages):
+        st = stages[i]
+        if cancel is not None and cancel.cancelled:
+            raise RenderCancelled(st.name)
+        run = _fused_at(stages, i, fused) if fused else None
+        n, fn = run if run is not None else (1, impls.get(st.name))
+        if times is None:
+            img, space = apply_stage(st, img, space, src, params, fn)
+        else:
+            img, space = times.run(FUSE_SEP.join(s.name for s in stages[i:i + n]), apply_stage,
+                                   st, img, space, src, params, fn)
+        i += n
+    return convert(img, space, "bgr")
+
+
+def split_tail(stages: Sequence[Stage]):
+    """
+    Split into (body, tail) where tail is the trailing run of
+    orientation-sensitive stages. Rotating/flipping the body output and
+    re-running only the tail matches rendering the rotated input.
+    """
+    cut = len(stages)
+    while cut > 0 and stages[cut - 1].orientation_sensitive:
+        cut -= 1
+    return tuple(stages[:cut]), tuple(stages[cut:])
+
+
+def stage_params(pipeline: Callable, params: dict) -> dict:
+    """Pipeline keyword defaults overlaid with the known keys of `params`."""
+    out = {}
+    for name, p in inspect.signature(pipeline).parameters.items():
+        if p.default is not inspect.Parameter.empty:
+            out[name] = p.default
+    out.update({k: v for k, v in params.items() if k in out})
+    return out
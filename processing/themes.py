@@ -1,40 +1,77 @@
 # processing/themes.py
-from typing import Callable, Dict
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Tuple
+
+from utils.startup import timed_import
+from .stages import Stage, stage_params
+
+
+class _LazyRegistry(MutableMapping):
+    """
+    Name -> object mapping whose built-in entries are "module:attr" references,
+    imported on first lookup (the filter implementations pull in OpenCV).
+    Entries assigned later (e.g. THEMES["My Theme"] = fn) are stored as given.
+    """
+
+    def __init__(self, refs: Dict[str, str]):
+        self._refs = dict(refs)
+        self._objs = {}
+
+    def __getitem__(self, name):
+        if name not in self._objs:
+            module, attr = self._refs[name].split(":")
+            self._objs[name] = getattr(timed_import(module), attr)
+        return self._objs[name]
+
+    def __setitem__(self, name, value):
+        self._refs.setdefault(name, None)
+        self._objs[name] = value
+
+    def __delitem__(self, name):
+        del self._refs[name]
+        self._objs.pop(name, None)
+
+    def __iter__(self):
+        return iter(self._refs)
+
+    def __len__(self):
+        return len(self._refs)
 
-from .pipeline import (
-    cyberpunkify_pipeline,
-    ghibli_pipeline,
-    mughal_pipeline,
-    hand_painting_pipeline,
-)
 
 # Public registry used by the UI
-THEMES: Dict[str, Callable] = {
-    "Cyberpunk":     cyberpunkify_pipeline,
-    "Ghibli":        ghibli_pipeline,
-    "Mughal Art":    mughal_pipeline,
-    "Hand Painting": hand_painting_pipeline,
-}
+THEMES: Dict[str, Callable] = _LazyRegistry({
+    "Cyberpunk":     "processing.pipeline:cyberpunkify_pipeline",
+    "Ghibli":        "processing.pipeline:ghibli_pipeline",
+    "Mughal Art":    "processing.pipeline:mughal_pipeline",
+    "Hand Painting": "processing.pipeline:hand_painting_pipeline",
+})
+
+# Step-by-step form of each pipeline (see processing/stages.py)
+THEME_STAGES: Dict[str, Tuple[Stage, ...]] = _LazyRegistry({
+    "Cyberpunk":     "processing.pipeline:CYBERPUNK_STAGES",
+    "Ghibli":        "processing.pipeline:GHIBLI_STAGES",
+    "Mughal Art":    "processing.pipeline:MUGHAL_STAGES",
+    "Hand Painting": "processing.pipeline:HAND_PAINTING_STAGES",
+})
 
 # Used to populate the Theme combobox
 THEME_NAMES = list(THEMES.keys())
 
 
-def get_pipeline(theme: str) -> Callable:
+def resolve_theme(theme: str) -> str:
     """
-    Return the processing pipeline function for a given theme name.
+    Return the canonical registry name for a theme name or alias.
     Falls back to Cyberpunk if the name is missing or unrecognized.
-    Supports a few simple aliases.
     """
     if not theme:
-        return cyberpunkify_pipeline
+        return "Cyberpunk"
 
     t = theme.strip().lower()
 
     # Exact name match (case-insensitive)
-    for name, fn in THEMES.items():
+    for name in THEMES:
         if t == name.lower():
-            return fn
+            return name
 
     # Friendly aliases
     aliases = {
@@ -45,7 +82,32 @@ def get_pipeline(theme: str) -> Callable:
         "hand painting": "Hand Painting",
     }
     if t in aliases:
-        return THEMES[aliases[t]]
+        return aliases[t]
 
     # Default
-    return cyberpunkify_pipeline
+    return "Cyberpunk"
+
+
+def get_pipeline(theme: str) -> Callable:
+    """
+    Return the processing pipeline function for a given theme name.
+    Falls back to Cyberpunk if the name is missing or unrecognized.
+    Supports a few simple aliases.
+    """
+    return THEMES[resolve_theme(theme)]
+
+
+def get_stages(theme: str) -> Tuple[Stage, ...]:
+    """
+    Stage list for a theme name (same resolution rules as get_pipeline).
+    Themes registered only in THEMES run as a single opaque stage
+    (treated as orientation-sensitive and whole-image, since nothing is
+    known about it).
+    """
+    name = resolve_theme(theme)
+    if name in THEME_STAGES:
+        return THEME_STAGES[name]
+    fn = THEMES[name]
+    keys = tuple(stage_params(fn, {}).keys())
+    return (Stage(name, keys, lambda img, src, p: fn(img, **{k: p[k] for k in keys}),
+                  orientation_sensitive=True, whole_image=True),)
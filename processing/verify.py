@@ -0,0 +1,195 @@
+# processing/verify.py
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from utils.image_io import load_bgr, resize_max
+from . import pipeline  # noqa: F401  (registers the built-in fast paths)
+from .stages import FAST_PATHS, fused_names, run_stages, stage_params
+from .themes import get_pipeline, get_stages, resolve_theme
+
+END_TO_END = "<end-to-end>"
+
+
+@dataclass(frozen=True)
+class Tolerance:
+    """
+    Limits a fast path must stay within; identical outputs have PSNR inf and
+    SSIM 1. Where the reference itself changes with the OpenCV RNG seed
+    (k-means seeding), the limits are relaxed to that seed-to-seed spread
+    minus the margins: a fast path may differ as much as two reference runs do.
+    """
+    min_psnr: float = 35.0          # dB
+    min_ssim: float = 0.97
+    max_abs: Optional[int] = None   # largest per-channel difference; None = not checked
+    seed_margin_db: float = 1.0
+    seed_margin_ssim: float = 0.01
+
+    def violations(self, psnr: float, ssim: float, max_abs: int, spread=None) -> List[str]:
+        """`spread` = (psnr, ssim, max_abs) of the reference against a run with another seed."""
+        min_psnr, min_ssim, limit = self.min_psnr, self.min_ssim, self.max_abs
+        if spread is not None:
+            min_psnr = min(min_psnr, spread[0] - self.seed_margin_db)
+            min_ssim = min(min_ssim, spread[1] - self.seed_margin_ssim)
+            limit = None if limit is None else max(limit, spread[2])
+        out = []
+        if psnr < min_psnr:
+            out.append(f"PSNR {psnr:.2f} < {min_psnr:.2f}")
+        if ssim < min_ssim:
+            out.append(f"SSIM {ssim:.4f} < {min_ssim:.4f}")
+        if limit is not None and max_abs > limit:
+            out.append(f"max-abs {max_abs} > {limit}")
+        return out
+
+
+@dataclass
+class Comparison:
+    """Reference vs fast output of one stage (or the whole pipeline) on one image."""
+    image: str
+    theme: str
+    stage: str                  # stage name, or END_TO_END
+    psnr: float
+    ssim: float
+    max_abs: int
+    ref_seconds: float
+    fast_seconds: float
+    violations: List[str]
+    seed_psnr: float = float("inf")  # reference vs reference with another RNG seed
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+    @property
+    def speedup(self) -> float:
+        return self.ref_seconds / self.fast_seconds if self.fast_seconds > 0 else float("inf")
+
+
+def psnr(a, b) -> float:
+    mse = float(np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2))
+    return float("inf") if mse == 0 else 10.0 * np.log10(255.0 ** 2 / mse)
+
+
+def ssim(a, b) -> float:
+    """Mean SSIM over all channels (11x11 Gaussian window, sigma 1.5)."""
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    a = a.astype(np.float32)
+    b = b.astype(np.float32)
+
+    def blur(x):
+        return cv2.GaussianBlur(x, (11, 11), 1.5)
+
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a * mu_a
+    var_b = blur(b * b) - mu_b * mu_b
+    cov = blur(a * b) - mu_a * mu_b
+    s = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a * mu_a + mu_b * mu_b + c1) * (var_a + var_b + c2))
+    return float(s.mean())
+
+
+def max_abs_error(a, b) -> int:
+    return int(cv2.absdiff(a, b).max()) if a.size else 0
+
+
+def _timed(fn: Callable, repeat: int, seed: int):
+    """(result, best seconds) over `repeat` runs; the OpenCV RNG (k-means seeding) is reset each time."""
+    best, out = float("inf"), None
+    for _ in range(max(1, int(repeat))):
+        cv2.setRNGSeed(seed)
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def _metrics(a, b):
+    return psnr(a, b), ssim(a, b), max_abs_error(a, b)
+
+
+def _compare(image, theme, stage, ref, fast, ref_s, fast_s, tol: Tolerance, ref_other) -> Comparison:
+    """`ref_other` is the reference rendered with another RNG seed."""
+    if ref.shape != fast.shape:
+        return Comparison(image, theme, stage, 0.0, 0.0, 255, ref_s, fast_s,
+                          [f"shape {fast.shape} != {ref.shape}"])
+    spread = None if np.array_equal(ref, ref_other) else _metrics(ref, ref_other)
+    p, s, m = _metrics(ref, fast)
+    return Comparison(image, theme, stage, p, s, m, ref_s, fast_s, tol.violations(p, s, m, spread),
+                      float("inf") if spread is None else spread[0])
+
+
+def compare_image(
+    img_bgr,
+    theme: str,
+    params: dict,
+    impls: Dict[str, Callable],
+    tol: Tolerance = Tolerance(),
+    stage_tol: Optional[Tolerance] = None,
+    image: str = "",
+    repeat: int = 1,
+    seed: int = 0,
+) -> List[Comparison]:
+    """
+    Compare the reference pipeline with one using `impls` (stage name -> fast fn).
+    Every stage (or run of stages, for fused 'a+b' paths) that has a fast
+    path is checked on the reference output of the stage before it (so
+    errors do not pile up), then the two complete pipelines are compared
+    end to end (the reference one with its colour-space handoffs, see
+    run_stages). `stage_tol` defaults to `tol`.
+    Each check also renders the reference once more with seed + 1 to
+    measure its own run-to-run spread (see Tolerance).
+    """
+    theme = resolve_theme(theme)
+    stages = get_stages(theme)
+    params = stage_params(get_pipeline(theme), params)
+    stage_tol = stage_tol or tol
+    out = []
+    inputs, times = [], []
+    img = img_bgr
+    for i, st in enumerate(stages):
+        inputs.append(img)
+        img, ref_s = _timed(lambda: st.fn(inputs[i], img_bgr, params), repeat, seed)
+        times.append(ref_s)
+        for name, fn in impls.items():
+            names = fused_names(name)
+            first = i + 1 - len(names)
+            if first < 0 or tuple(s.name for s in stages[first:i + 1]) != names:
+                continue
+            group = stages[first:i + 1]
+            fast, fast_s = _timed(lambda: fn(inputs[first], img_bgr, params), repeat, seed)
+            other, _ = _timed(lambda: run_stages(group, inputs[first], params, src=img_bgr, impls={}), 1, seed + 1)
+            out.append(_compare(image, theme, name, img, fast, sum(times[first:]), fast_s, stage_tol, other))
+    ref, ref_total = _timed(lambda: run_stages(stages, img_bgr, params, impls={}), repeat, seed)
+    fast, fast_total = _timed(lambda: run_stages(stages, img_bgr, params, impls=impls), repeat, seed)
+    other, _ = _timed(lambda: run_stages(stages, img_bgr, params, impls={}), 1, seed + 1)
+    out.append(_compare(image, theme, END_TO_END, ref, fast, ref_total, fast_total, tol, other))
+    return out
+
+
+def verify(
+    paths: Sequence[str],
+    themes: Sequence[str],
+    params_for: Callable[[str], dict],
+    impls: Optional[Dict[str, Callable]] = None,
+    tol: Tolerance = Tolerance(),
+    stage_tol: Optional[Tolerance] = None,
+    max_side: int = 0,
+    repeat: int = 1,
+) -> Iterator[Comparison]:
+    """
+    compare_image over a corpus: every file x theme, with params_for(theme)
+    (e.g. a preset). `impls` defaults to every registered fast path; themes
+    without any of them are skipped. max_side > 0 downscales inputs first.
+    """
+    impls = dict(FAST_PATHS) if impls is None else impls
+    for path in paths:
+        img = load_bgr(path)
+        if max_side:
+            img = resize_max(img, max_side, max_side)
+        for theme in themes:
+            names = {st.name for st in get_stages(theme)}
+            if any(set(fused_names(n)) <= names for n in impls):
+                yield from compare_image(img, theme, params_for(theme), impls, tol, stage_tol,
+                                         image=path, repeat=repeat)
@@ -0,0 +1,151 @@
+# processing/watch.py
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils.image_io import IMG_EXTS
+from .batch import BatchItem, iter_batch
+from .stages import CancelToken, stage_params
+from .themes import get_pipeline, resolve_theme
+
+MANIFEST_NAME = ".pixel-alchemy-watch.json"
+
+
+def job_key(theme: str, params: dict) -> str:
+    """Stable text key for (theme, params); a changed preset reprocesses everything."""
+    return json.dumps({"theme": theme, "params": params}, sort_keys=True, default=str)
+
+
+class WatchManifest:
+    """
+    Which inputs have been processed, with what, stored in the output folder.
+    An input counts as done while its (size, mtime) and the job key match and
+    its output still exists; failures are remembered until the file changes.
+    """
+
+    def __init__(self, outdir: str):
+        self.path = os.path.join(outdir, MANIFEST_NAME)
+        self.files: Dict[str, dict] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("files"), dict):
+                self.files = data["files"]
+        except (OSError, ValueError):
+            pass
+
+    def is_done(self, path: str, sig, key: str) -> bool:
+        rec = self.files.get(path)
+        if rec is None or rec.get("key") != key or (rec.get("size"), rec.get("mtime")) != tuple(sig):
+            return False
+        return rec.get("error") is not None or os.path.exists(rec.get("out") or "")
+
+    def record(self, path: str, sig, key: str, item: BatchItem):
+        self.files[path] = {"size": sig[0], "mtime": sig[1], "key": key,
+                            "out": item.out_path, "error": item.error}
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": self.files}, f)
+        os.replace(tmp, self.path)
+
+
+class HotFolder:
+    """
+    Polls `indir` for new or changed images and renders them into `outdir`.
+    A file is picked up once its size and mtime have not changed for `settle`
+    seconds (copies in progress are skipped). Ready files go through
+    iter_batch with `workers` in rounds of a few files per worker, so a
+    steady stream keeps every worker busy and the manifest is saved often.
+    """
+
+    def __init__(
+        self,
+        indir: str,
+        outdir: str,
+        theme: str = "Cyberpunk",
+        params: Optional[dict] = None,
+        workers: int = 1,
+        interval: float = 1.0,
+        settle: float = 2.0,
+    ):
+        self.indir = os.path.abspath(indir)
+        self.outdir = os.path.abspath(outdir)
+        self.theme = resolve_theme(theme)
+        self.params = stage_params(get_pipeline(self.theme), params or {})
+        self.workers = max(1, int(workers))
+        self.interval = float(interval)
+        self.settle = float(settle)
+        self.key = job_key(self.theme, self.params)
+        os.makedirs(self.outdir, exist_ok=True)
+        self.manifest = WatchManifest(self.outdir)
+        self._seen = {}  # path -> ((size, mtime), first time seen with that signature)
+
+    def _scan(self) -> Dict[str, tuple]:
+        found = {}
+        try:
+            with os.scandir(self.indir) as it:
+                for de in it:
+                    if de.name.startswith(".") or os.path.splitext(de.name.lower())[1] not in IMG_EXTS:
+                        continue
+                    try:
+                        if not de.is_file():
+                            continue
+                        st = de.stat()
+                    except OSError:
+                        continue
+                    found[os.path.abspath(de.path)] = (st.st_size, st.st_mtime)
+        except OSError:
+            pass
+        return found
+
+    def ready(self) -> List[str]:
+        """Inputs that are stable, not yet done, and not the output folder's own files."""
+        now = time.monotonic()
+        found = self._scan()
+        for path in list(self._seen):
+            if path not in found:
+                del self._seen[path]
+        out = []
+        for path, sig in sorted(found.items()):
+            if os.path.dirname(path) == self.outdir or self.manifest.is_done(path, sig, self.key):
+                self._seen.pop(path, None)
+                continue
+            prev = self._seen.get(path)
+            if prev is None or prev[0] != sig:
+                self._seen[path] = (sig, now)
+            elif sig[0] > 0 and now - prev[1] >= self.settle:
+                out.append(path)
+        return out
+
+    def process(self, paths: List[str], cancel: Optional[CancelToken] = None,
+                progress: Optional[Callable[[BatchItem], None]] = None) -> List[BatchItem]:
+        sigs = {p: self._seen[p][0] for p in paths}
+        items = []
+        for item in iter_batch(paths, self.theme, self.params, self.outdir,
+                               cancel=cancel, progress=progress, workers=self.workers):
+            self.manifest.record(item.path, sigs[item.path], self.key, item)
+            self._seen.pop(item.path, None)
+            items.append(item)
+        if items:
+            self.manifest.save()
+        return items
+
+    def run(self, cancel: Optional[CancelToken] = None,
+            progress: Optional[Callable[[BatchItem], None]] = None, once: bool = False):
+        """
+        Watch until `cancel` is set. once=True processes what is already in
+        the folder (still waiting for files to settle) and returns.
+        """
+        cancel = cancel or CancelToken()
+        round_size = self.workers * 4
+        while not cancel.cancelled:
+            ready = self.ready()
+            if ready:
+                self.process(ready[:round_size], cancel=cancel, progress=progress)
+                continue  # backlog: poll again straight away
+            if once and not any(sig[0] > 0 for sig, _ in self._seen.values()):
+                return
+            time.sleep(self.interval)
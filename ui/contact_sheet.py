@@ -0,0 +1,100 @@
+# ui/contact_sheet.py
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk
+from PIL import ImageTk
+
+from utils.image_io import bgr_to_pil
+from processing.contact_sheet import render_contact_sheet
+from processing.themes import THEME_NAMES
+
+GRID_COLUMNS = 4
+
+
+class ContactSheetWindow(tk.Toplevel):
+    """
+    Grid of every preset rendered on a thumbnail proxy of the current image.
+    Rendering runs on a worker thread; clicking a tile calls on_pick(theme, preset).
+    """
+
+    def __init__(self, master, img_bgr, current_theme, on_pick):
+        super().__init__(master)
+        self.title("Contact Sheet")
+        self.geometry("1140x760")
+        self.img_bgr = img_bgr
+        self.current_theme = current_theme
+        self.on_pick = on_pick
+        self._tile_refs = []  # keep PhotoImage refs alive
+        self._results = queue.Queue()
+        self._job = 0
+
+        bar = ttk.Frame(self, padding=8)
+        bar.pack(fill=tk.X)
+        self.scope_var = tk.StringVar(value="current")
+        ttk.Radiobutton(bar, text=f"{current_theme} only", value="current", variable=self.scope_var,
+                        command=self.render).pack(side=tk.LEFT)
+        ttk.Radiobutton(bar, text="All themes", value="all", variable=self.scope_var,
+                        command=self.render).pack(side=tk.LEFT, padx=8)
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(bar, textvariable=self.status_var).pack(side=tk.RIGHT)
+
+        # Scrollable grid
+        self.canvas = tk.Canvas(self, highlightthickness=0)
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        self.grid_frame = ttk.Frame(self.canvas, padding=8)
+        self.canvas.create_window((0, 0), window=self.grid_frame, anchor="nw")
+        self.canvas.configure(yscrollcommand=self.scroll.set)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.grid_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+
+        self.render()
+
+    def render(self):
+        self._job += 1
+        job = self._job
+        themes = list(THEME_NAMES) if self.scope_var.get() == "all" else [self.current_theme]
+        self.status_var.set("Rendering...")
+
+        def worker():
+            t0 = time.perf_counter()
+            try:
+                tiles = render_contact_sheet(self.img_bgr, themes)
+                self._results.put((job, tiles, time.perf_counter() - t0, None))
+            except Exception as e:
+                self._results.put((job, [], time.perf_counter() - t0, e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(30, lambda: self._poll(job))
+
+    def _poll(self, job):
+        if job != self._job or not self.winfo_exists():
+            return  # superseded by a newer scope choice (it polls on its own) or closed
+        try:
+            done_job, tiles, seconds, error = self._results.get_nowait()
+        except queue.Empty:
+            done_job = None
+        if done_job != job:
+            self.after(30, lambda: self._poll(job))
+            return
+        if error is not None:
+            self.status_var.set(f"Failed: {error}")
+            return
+        self._show(tiles)
+        self.status_var.set(f"{len(tiles)} variants in {seconds:.2f}s")
+
+    def _show(self, tiles):
+        for w in self.grid_frame.winfo_children():
+            w.destroy()
+        self._tile_refs.clear()
+
+        for i, (variant, img) in enumerate(tiles):
+            thumb = ImageTk.PhotoImage(bgr_to_pil(img))
+            self._tile_refs.append(thumb)
+            cell = ttk.Frame(self.grid_frame, padding=4)
+            cell.grid(row=i // GRID_COLUMNS, column=i % GRID_COLUMNS, sticky="n")
+            ttk.Button(cell, image=thumb,
+                       command=lambda v=variant: self.on_pick(v.theme, v.preset)).pack()
+            ttk.Label(cell, text=f"{variant.theme} · {variant.preset}").pack(anchor="w")
@@ -16,6 +16,7 @@ class LeftBrowserPanel(ttk.Frame):
         self.on_toggle_multi = on_toggle_multi
         self.on_click_thumb = on_click_thumb
         self._thumb_refs = {}  # keep PhotoImage refs alive
+        self.files = []        # image paths of the open folder, in display order
         self._build()
 
     def _build(self):
@@ -71,12 +72,13 @@ class LeftBrowserPanel(ttk.Frame):
                 self.on_toggle_multi(path, var.get())
                 return
 
-    def populate_thumbs(self, folder):
+    def populate_thumbs(self, folder, catalog=None):
         for w in self.frame.winfo_children():
             w.destroy()
         self._thumb_refs.clear()
 
-        files = list_images_in_folder(folder)
+        # no hashing here: the whole-file reads run in the background (see do_choose_folder)
+        files = self.files = list_images_in_folder(folder, catalog=catalog, hash_files=False)
         if not files:
             ttk.Label(self.frame, text="No images found").pack(anchor="w", padx=6, pady=6)
             return
@@ -96,6 +98,9 @@ class LeftBrowserPanel(ttk.Frame):
                 text_col = ttk.Frame(row)
                 text_col.pack(side=tk.LEFT, padx=8, fill=tk.X, expand=True)
                 ttk.Label(text_col, text=os.path.basename(path)).pack(anchor="w")
+                meta = catalog.get(path) if catalog is not None else None
+                if meta is not None and meta.width:
+                    ttk.Label(text_col, text=f"{meta.width}×{meta.height}").pack(anchor="w")
 
                 var = tk.BooleanVar(value=False)
                 chk = ttk.Checkbutton(
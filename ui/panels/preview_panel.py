@@ -36,6 +36,18 @@ class PreviewPanel(ttk.Frame):
     def set_controls_visible(self, visible: bool):
         self._ctrl_btn.configure(text=("Hide Controls" if visible else "Show Controls"))
 
+    @property
+    def zoomed(self) -> bool:
+        return (self.side if self.mode.get() == "side" else self.slider).zoomed
+
+    def set_region_source(self, fn, full_size, cancel=None):
+        """Full-resolution crops for zoomed views; see ui.preview._ZoomMixin."""
+        for view in (self.side, self.slider):
+            view.set_region_source(fn, full_size, cancel)
+
+    def refresh_region(self):
+        (self.side if self.mode.get() == "side" else self.slider).refresh_region()
+
     def show_side(self, orig, proc):
         self.slider.pack_forget()
         self.side.pack(fill=tk.BOTH, expand=True)
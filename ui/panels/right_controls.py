@@ -1,3 +1,4 @@
+import os
 import tkinter as tk
 from tkinter import ttk
 
@@ -9,7 +10,7 @@ from processing.themes import THEME_NAMES
 def _apply_values(slider, value):
     if slider is None:
         return
-    slider.set(value)
+    slider.set(value, quiet=True)
 
 
 class RightControls(ttk.Frame):
@@ -18,9 +19,13 @@ class RightControls(ttk.Frame):
     transform buttons, progress bar, and all processing sliders.
     """
 
-    def __init__(self, master, on_open, on_save, on_batch, on_theme, on_params_changed):
+    def __init__(self, master, on_open, on_save, on_batch, on_theme, on_params_changed,
+                 on_cancel_batch=None, on_contact_sheet=None):
         super().__init__(master, padding=0)
         self.on_params_changed = on_params_changed
+        self.on_cancel_batch = on_cancel_batch
+        self.on_contact_sheet = on_contact_sheet
+        self.last_touched = None  # param key of the slider the user moved last
         self.app = self.winfo_toplevel()  # access to .state, rotate/flip, .set_theme
 
         # Scrollable shell
@@ -89,6 +94,32 @@ class RightControls(ttk.Frame):
             self.status_var.set(text)
         self.body.update_idletasks()
 
+    # ----- batch helpers (used by actions.do_process_batch) -----
+    def batch_started(self, total: int):
+        self.failure_list.delete(0, tk.END)
+        self.fail_frame.pack_forget()
+        self.cancel_btn.configure(state="normal")
+        self.batch_info_var.set("")
+        self.set_progress(0, total, "Batch 0/{}".format(total))
+
+    def set_batch_info(self, text: str):
+        self.batch_info_var.set(text)
+
+    def add_batch_failure(self, path: str, error: str | None):
+        if not self.fail_frame.winfo_ismapped():
+            self.fail_frame.pack(fill=tk.X, pady=(0, 6), after=self.prog_row)
+        self.failure_list.insert(tk.END, "{}: {}".format(os.path.basename(path), error or "failed"))
+
+    def batch_finished(self, text: str = "Done"):
+        self.cancel_btn.configure(state="disabled")
+        self.progress_stop(text)
+
+    def _cancel_batch(self):
+        if self.on_cancel_batch:
+            self.cancel_btn.configure(state="disabled")
+            self.status_var.set("Cancelling...")
+            self.on_cancel_batch()
+
     # --- UI build ---
     def _build(self, on_open, on_save, on_batch, on_theme):
         # Top actions
@@ -118,8 +149,6 @@ class RightControls(ttk.Frame):
         self.preset_var = tk.StringVar(value="Default")
         self.preset_box = None
         self._make_preset_box()
-        self.preset_box.bind("<FocusIn>", lambda e: self._refresh_preset_names())
-        self.preset_box.bind("<Button-1>", lambda e: self._refresh_preset_names())
 
         ttk.Button(self.preset_row, text="Apply Preset", command=self.apply_selected_preset).grid(
             row=0, column=2, padx=(6, 0), sticky="w"
@@ -128,6 +157,10 @@ class RightControls(ttk.Frame):
             row=0, column=3, padx=(6, 0), sticky="w"
         )
         self.preset_row.columnconfigure(1, weight=1)
+        if self.on_contact_sheet:
+            ttk.Button(self.preset_row, text="Contact Sheet...", command=self.on_contact_sheet).grid(
+                row=1, column=1, columnspan=3, padx=(6, 0), pady=(6, 0), sticky="e"
+            )
 
         # Transform group
         xform = ttk.Labelframe(self.body, text="Transform", padding=8)
@@ -141,12 +174,23 @@ class RightControls(ttk.Frame):
             xform.columnconfigure(c, weight=1)
 
         # Progress bar (after Transform, before sliders)
-        prog_row = ttk.Frame(self.body)
+        self.prog_row = prog_row = ttk.Frame(self.body)
         prog_row.pack(fill=tk.X, pady=(2, 6))
-        self.prog = ttk.Progressbar(prog_row, mode="determinate", maximum=100)
+        bar_row = ttk.Frame(prog_row)
+        bar_row.pack(fill=tk.X)
+        self.prog = ttk.Progressbar(bar_row, mode="determinate", maximum=100)
         self.prog.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.cancel_btn = ttk.Button(bar_row, text="Cancel", width=7, state="disabled", command=self._cancel_batch)
+        self.cancel_btn.pack(side=tk.RIGHT, padx=(6, 0))
         self.status_var = tk.StringVar(value="")
-        ttk.Label(prog_row, textvariable=self.status_var, width=14, anchor="e").pack(side=tk.RIGHT, padx=(6, 0))
+        ttk.Label(bar_row, textvariable=self.status_var, width=14, anchor="e").pack(side=tk.RIGHT, padx=(6, 0))
+        self.batch_info_var = tk.StringVar(value="")
+        ttk.Label(prog_row, textvariable=self.batch_info_var, anchor="e").pack(fill=tk.X)
+
+        # Per-file batch failures (shown only when something fails)
+        self.fail_frame = ttk.Labelframe(self.body, text="Batch Failures", padding=6)
+        self.failure_list = tk.Listbox(self.fail_frame, height=5, activestyle="none")
+        self.failure_list.pack(fill=tk.X)
 
         # Slider groups
         def group(title: str):
@@ -155,26 +199,26 @@ class RightControls(ttk.Frame):
             return lf
 
         g1 = group("Color & Contrast")
-        self.s_clahe = LabeledSlider(g1, "CLAHE Clip", 0.5, 4.0, 2.2, resolution=0.1, command=self.on_params_changed)
-        self.s_contr = LabeledSlider(g1, "Contrast", 0.8, 1.8, 1.25, resolution=0.01, command=self.on_params_changed)
-        self.s_sat = LabeledSlider(g1, "Saturation", 0.8, 2.0, 1.35, resolution=0.01, command=self.on_params_changed)
-        self.s_vibr = LabeledSlider(g1, "Vibrance", 0.0, 1.5, 0.7, resolution=0.01, command=self.on_params_changed)
+        self.s_clahe = LabeledSlider(g1, "CLAHE Clip", 0.5, 4.0, 2.2, resolution=0.1, command=self._touched("clahe_clip"))
+        self.s_contr = LabeledSlider(g1, "Contrast", 0.8, 1.8, 1.25, resolution=0.01, command=self._touched("contrast"))
+        self.s_sat = LabeledSlider(g1, "Saturation", 0.8, 2.0, 1.35, resolution=0.01, command=self._touched("saturation"))
+        self.s_vibr = LabeledSlider(g1, "Vibrance", 0.0, 1.5, 0.7, resolution=0.01, command=self._touched("vibr"))
         for w in (self.s_clahe, self.s_contr, self.s_sat, self.s_vibr):
             w.pack(fill=tk.X, pady=4)
 
         g2 = group("Grade & Glow")
-        self.s_tone = LabeledSlider(g2, "Tone Strength", 0.0, 0.8, 0.32, resolution=0.01, command=self.on_params_changed)
-        self.s_glow = LabeledSlider(g2, "Glow", 0.0, 1.5, 0.85, resolution=0.01, command=self.on_params_changed)
-        self.s_vign = LabeledSlider(g2, "Vignette", 0.0, 0.8, 0.35, resolution=0.01, command=self.on_params_changed)
-        self.s_scan = LabeledSlider(g2, "Scanlines", 0.0, 0.2, 0.05, resolution=0.005, command=self.on_params_changed)
+        self.s_tone = LabeledSlider(g2, "Tone Strength", 0.0, 0.8, 0.32, resolution=0.01, command=self._touched("tone_strength"))
+        self.s_glow = LabeledSlider(g2, "Glow", 0.0, 1.5, 0.85, resolution=0.01, command=self._touched("glow"))
+        self.s_vign = LabeledSlider(g2, "Vignette", 0.0, 0.8, 0.35, resolution=0.01, command=self._touched("vignette_amt"))
+        self.s_scan = LabeledSlider(g2, "Scanlines", 0.0, 0.2, 0.05, resolution=0.005, command=self._touched("scan_alpha"))
         for w in (self.s_tone, self.s_glow, self.s_vign, self.s_scan):
             w.pack(fill=tk.X, pady=4)
 
         g3 = group("Edges & Glitch")
-        self.s_edgeS = LabeledSlider(g3, "Edge Strength", 0.0, 1.0, 0.35, resolution=0.01, command=self.on_params_changed)
-        self.s_edgeL = LabeledSlider(g3, "Edge Low Th", 10, 200, 110, resolution=1, is_int=True, command=self.on_params_changed)
-        self.s_edgeH = LabeledSlider(g3, "Edge High Th", 50, 300, 220, resolution=1, is_int=True, command=self.on_params_changed)
-        self.s_soft = LabeledSlider(g3, "Edge Soften", 0.0, 3.0, 1.5, resolution=0.05, command=self.on_params_changed)
+        self.s_edgeS = LabeledSlider(g3, "Edge Strength", 0.0, 1.0, 0.35, resolution=0.01, command=self._touched("edge_strength"))
+        self.s_edgeL = LabeledSlider(g3, "Edge Low Th", 10, 200, 110, resolution=1, is_int=True, command=self._touched("edge_low"))
+        self.s_edgeH = LabeledSlider(g3, "Edge High Th", 50, 300, 220, resolution=1, is_int=True, command=self._touched("edge_high"))
+        self.s_soft = LabeledSlider(g3, "Edge Soften", 0.0, 3.0, 1.5, resolution=0.05, command=self._touched("edge_soften"))
         for w in (self.s_edgeS, self.s_edgeL, self.s_edgeH, self.s_soft):
             w.pack(fill=tk.X, pady=4)
 
@@ -182,31 +226,80 @@ class RightControls(ttk.Frame):
         ttk.Checkbutton(g3, text="Tiny Glitch", variable=self.g_var, command=self.on_params_changed).pack(
             anchor="w", pady=(4, 0)
         )
-        self.s_gn = LabeledSlider(g3, "Glitch Count", 0, 20, 6, resolution=1, is_int=True, command=self.on_params_changed)
-        self.s_gs = LabeledSlider(g3, "Glitch Shift", 0, 40, 14, resolution=1, is_int=True, command=self.on_params_changed)
+        self.s_gn = LabeledSlider(g3, "Glitch Count", 0, 20, 6, resolution=1, is_int=True, command=self._touched("glitch_n"))
+        self.s_gs = LabeledSlider(g3, "Glitch Shift", 0, 40, 14, resolution=1, is_int=True, command=self._touched("glitch_shift"))
         self.s_gn.pack(fill=tk.X, pady=4)
         self.s_gs.pack(fill=tk.X, pady=4)
 
+        seed_row = ttk.Frame(g3)
+        seed_row.pack(fill=tk.X, pady=4)
+        ttk.Label(seed_row, text="Glitch Seed (blank = from image)").pack(side=tk.LEFT)
+        self.seed_var = tk.StringVar(value="")
+        self._seed_applied = None
+        seed_entry = ttk.Entry(seed_row, textvariable=self.seed_var, width=12)
+        seed_entry.pack(side=tk.RIGHT)
+        seed_entry.bind("<Return>", self._on_seed_entry)
+        seed_entry.bind("<FocusOut>", self._on_seed_entry)
+
+        self.sliders = {
+            "clahe_clip": self.s_clahe, "contrast": self.s_contr, "saturation": self.s_sat, "vibr": self.s_vibr,
+            "tone_strength": self.s_tone, "glow": self.s_glow, "vignette_amt": self.s_vign, "scan_alpha": self.s_scan,
+            "edge_strength": self.s_edgeS, "edge_low": self.s_edgeL, "edge_high": self.s_edgeH,
+            "edge_soften": self.s_soft, "glitch_n": self.s_gn, "glitch_shift": self.s_gs,
+        }
+
         # Reset row
         reset_row = ttk.Frame(self.body)
         reset_row.pack(fill=tk.X, pady=(6, 12))
         ttk.Button(reset_row, text="Reset Params", command=self.reset_params).pack(side=tk.LEFT)
+        ttk.Button(reset_row, text="Redo", command=self.app.redo).pack(side=tk.RIGHT)
+        ttk.Button(reset_row, text="Undo", command=self.app.undo).pack(side=tk.RIGHT, padx=(0, 6))
+
+    def _touched(self, key: str):
+        def callback(*_):
+            self.last_touched = key
+            self.on_params_changed()
+        return callback
+
+    def _glitch_seed(self):
+        try:
+            return int(self.seed_var.get().strip())
+        except ValueError:
+            return None
+
+    def _on_seed_entry(self, _e):
+        seed = self._glitch_seed()
+        self.seed_var.set("" if seed is None else str(seed))
+        if seed != self._seed_applied:
+            self._seed_applied = seed
+            self.on_params_changed()
+
+    def neighbor_params(self):
+        """Param dicts one +/- step away on the last touched slider (for speculation)."""
+        slider = self.sliders.get(self.last_touched)
+        if slider is None:
+            return []
+        base = self.get_params()
+        out = []
+        for v in slider.neighbors():
+            p = dict(base)
+            p[self.last_touched] = v
+            out.append(p)
+        return out
 
     # --- preset combobox helpers ---
     def _make_preset_box(self):
         if getattr(self, "preset_box", None) is not None and self.preset_box.winfo_exists():
             self.preset_box.destroy()
 
-        names = get_preset_names(self.app.state.current_theme)
-        if not names:
-            names = ["Default"]
-
+        # names are read from presets.json when the list opens, not at startup
         self.preset_box = ttk.Combobox(
             self.preset_row,
             textvariable=self.preset_var,
             state="readonly",
-            values=names,
+            values=[self.preset_var.get()],
             width=20,
+            postcommand=self._refresh_preset_names,
         )
         self.preset_box.grid(row=0, column=1, padx=6, sticky="ew")
         self.preset_row.columnconfigure(1, weight=1)
@@ -230,20 +323,22 @@ class RightControls(ttk.Frame):
 
     # ----- presets / random / reset -----
     def reset_params(self):
-        cfg = get_preset(self.app.state.current_theme, "Default")
-        self._apply_preset_dict(cfg)
-        self.on_params_changed()
+        self.set_params(get_preset(self.app.state.current_theme, "Default"))
 
     def apply_selected_preset(self):
         name = self.preset_var.get().strip()
-        cfg = get_preset(self.app.state.current_theme, name)
-        self._apply_preset_dict(cfg)
-        self.on_params_changed()
+        self.set_params(get_preset(self.app.state.current_theme, name))
 
     def apply_random_params(self):
-        cfg = random_params(self.app.state.current_theme)
+        self.set_params(random_params(self.app.state.current_theme))
+
+    def set_params(self, cfg: dict):
+        """
+        Bulk update: move every control without per-widget callbacks, then
+        emit one on_params_changed(params) with the final parameter dict.
+        """
         self._apply_preset_dict(cfg)
-        self.on_params_changed()
+        self.on_params_changed(self.get_params())
 
     def _apply_preset_dict(self, cfg: dict):
         _apply_values(self.s_clahe, cfg["clahe_clip"])
@@ -261,6 +356,9 @@ class RightControls(ttk.Frame):
         self.g_var.set(bool(cfg["do_glitch"]))
         _apply_values(self.s_gn, cfg["glitch_n"])
         _apply_values(self.s_gs, cfg["glitch_shift"])
+        seed = cfg.get("glitch_seed")
+        self.seed_var.set("" if seed is None else str(int(seed)))
+        self._seed_applied = self._glitch_seed()
 
     def get_params(self):
         return dict(
@@ -279,6 +377,7 @@ class RightControls(ttk.Frame):
             do_glitch=self.g_var.get(),
             glitch_n=int(self.s_gn.get()),
             glitch_shift=int(self.s_gs.get()),
+            glitch_seed=self._glitch_seed(),
         )
 
     # called by app when theme changes
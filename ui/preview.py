@@ -1,4 +1,5 @@
 # ui/preview.py
+import math
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
@@ -16,27 +17,223 @@ def _fit_contain_no_upscale(box_w, box_h, img_w, img_h):
     return r, tw, th
 
 
+# ---------------- Zoom / pan ----------------
+class _Viewport:
+    """Zoom and view center in full-resolution pixels; zoom None = fit (contain, no upscale)."""
+    MAX_ZOOM = 8.0
+
+    def __init__(self):
+        self.zoom = None
+        self.cx = self.cy = 0.0
+        self.full_w = self.full_h = 0
+
+    def set_size(self, w, h):
+        if (w, h) != (self.full_w, self.full_h):
+            self.full_w, self.full_h = int(w), int(h)
+            self.zoom = None  # a differently sized image starts fitted
+
+    def fit_scale(self, box_w, box_h):
+        return _fit_contain_no_upscale(box_w, box_h, self.full_w, self.full_h)[0]
+
+    def layout(self, box_w, box_h):
+        """((x0, y0, x1, y1) visible in full-res pixels, (w, h) on screen), or None when fitted."""
+        if self.zoom is None or self.full_w <= 0 or self.full_h <= 0:
+            return None
+        z = self.zoom
+        vw, vh = min(self.full_w, box_w / z), min(self.full_h, box_h / z)
+        x0 = int(max(0, min(self.full_w - vw, self.cx - vw / 2)))
+        y0 = int(max(0, min(self.full_h - vh, self.cy - vh / 2)))
+        x1 = max(x0 + 1, min(self.full_w, int(math.ceil(x0 + vw))))
+        y1 = max(y0 + 1, min(self.full_h, int(math.ceil(y0 + vh))))
+        return (x0, y0, x1, y1), (max(1, round((x1 - x0) * z)), max(1, round((y1 - y0) * z)))
+
+    def to_full(self, box_w, box_h, px, py):
+        """Full-res point under box pixel (px, py)."""
+        lay = self.layout(box_w, box_h)
+        if lay is None:
+            r, tw, th = _fit_contain_no_upscale(box_w, box_h, self.full_w, self.full_h)
+            return (px - (box_w - tw) / 2) / r, (py - (box_h - th) / 2) / r
+        (x0, y0, _, _), (dw, dh) = lay
+        return x0 + (px - (box_w - dw) / 2) / self.zoom, y0 + (py - (box_h - dh) / 2) / self.zoom
+
+    def zoom_at(self, zoom, box_w, box_h, px, py):
+        """Set `zoom` keeping the point under (px, py) in place; at or below fit it fits again."""
+        fx, fy = self.to_full(box_w, box_h, px, py)
+        if zoom <= self.fit_scale(box_w, box_h) * 1.001:
+            self.zoom = None
+            return
+        self.zoom = min(self.MAX_ZOOM, zoom)
+        self.cx = fx - (px - box_w / 2) / self.zoom
+        self.cy = fy - (py - box_h / 2) / self.zoom
+        self._clamp(box_w, box_h)
+
+    def pan(self, dx, dy, box_w, box_h):
+        if self.zoom is not None:
+            self.cx -= dx / self.zoom
+            self.cy -= dy / self.zoom
+            self._clamp(box_w, box_h)
+
+    def _clamp(self, box_w, box_h):
+        vw, vh = min(self.full_w, box_w / self.zoom), min(self.full_h, box_h / self.zoom)
+        self.cx = min(max(self.cx, vw / 2), self.full_w - vw / 2)
+        self.cy = min(max(self.cy, vh / 2), self.full_h - vh / 2)
+
+
+def _crop_scaled(img_bgr, rect, full_w):
+    """Crop full-res `rect` out of img_bgr, which may be a downscaled proxy of the full image."""
+    s = img_bgr.shape[1] / float(full_w)
+    x0, y0, x1, y1 = rect
+    ix0, iy0 = int(x0 * s), int(y0 * s)
+    return img_bgr[iy0:max(iy0 + 1, int(math.ceil(y1 * s))), ix0:max(ix0 + 1, int(math.ceil(x1 * s)))]
+
+
+class _ZoomMixin:
+    """
+    Zoom/pan shared by both previews: the mouse wheel zooms around the
+    cursor, double-click toggles fit / 100%, dragging pans (see _bind_zoom).
+    While zoomed, the visible window is first cut from the images passed to
+    update_images (upscaled when they are proxies); once the view rests,
+    it is replaced by full-resolution crops from the region source, if any
+    (delivered later; crops for a window the view has left are dropped).
+    """
+    REFINE_DELAY_MS = 120
+
+    def _init_zoom(self):
+        self.view = _Viewport()
+        self._region_fn = None
+        self._region_cancel = None
+        self._region = None      # ((x0, y0, x1, y1), orig crop, proc crop) at full resolution
+        self._refine_job = None
+        self._pan_from = None
+
+    def _bind_zoom(self, widget, pan_press, pan_motion):
+        widget.bind("<MouseWheel>", lambda e: self._on_wheel(e, 1 if e.delta > 0 else -1))
+        widget.bind("<Button-4>", lambda e: self._on_wheel(e, 1))
+        widget.bind("<Button-5>", lambda e: self._on_wheel(e, -1))
+        widget.bind("<Double-Button-1>", self._on_double)
+        widget.bind(pan_press, self._pan_start)
+        widget.bind(pan_motion, self._pan_move)
+
+    def set_region_source(self, fn, full_size, cancel=None):
+        """
+        fn(x0, y0, x1, y1, done) starts fetching (orig, proc) BGR crops at full
+        resolution and calls done(orig, proc) on the Tk thread when they are
+        ready; cancel() drops a pending fetch. full_size = (w, h).
+        """
+        self._region_fn = fn
+        self._region_cancel = cancel
+        self.view.set_size(*full_size)
+
+    def refresh_region(self):
+        """Fetch the visible region again (e.g. params changed); current pixels stay until it arrives."""
+        if self.view.zoom is not None and self._region_fn is not None:
+            self._schedule_refine()
+
+    @property
+    def zoomed(self) -> bool:
+        return self.view.zoom is not None
+
+    def _new_images(self, orig_bgr):
+        self._region = None
+        if self._region_fn is None:
+            self.view.set_size(orig_bgr.shape[1], orig_bgr.shape[0])
+
+    def _on_wheel(self, event, direction):
+        box_w, box_h = self._box()
+        current = self.view.zoom or self.view.fit_scale(box_w, box_h)
+        self.view.zoom_at(current * 1.25 ** direction, box_w, box_h, event.x, event.y)
+        self._redraw()
+
+    def _on_double(self, event):
+        box_w, box_h = self._box()
+        if self.view.zoom is not None:
+            self.view.zoom = None
+        else:
+            self.view.zoom_at(1.0 if self.view.fit_scale(box_w, box_h) < 1.0 else 2.0, box_w, box_h, event.x, event.y)
+        self._redraw()
+
+    def _pan_start(self, event):
+        self._pan_from = (event.x, event.y)
+
+    def _pan_move(self, event):
+        if self._pan_from is None or self.view.zoom is None:
+            return
+        dx, dy = event.x - self._pan_from[0], event.y - self._pan_from[1]
+        self._pan_from = (event.x, event.y)
+        self.view.pan(dx, dy, *self._box())
+        self._redraw()
+
+    def _zoom_crops(self, box_w, box_h):
+        """Display-sized (orig, proc) PIL images of the zoomed window, or None when fitted."""
+        lay = self.view.layout(box_w, box_h)
+        if lay is None:
+            self._cancel_region()
+            return None
+        rect, size = lay
+        if self._region is not None and self._region[0] == rect:
+            orig, proc = self._region[1:]
+        else:
+            orig = _crop_scaled(self.orig_bgr, rect, self.view.full_w)
+            proc = _crop_scaled(self.proc_bgr, rect, self.view.full_w)
+            if self._region_fn is not None:
+                self._schedule_refine()
+        resample = Image.NEAREST if self.view.zoom >= 1.0 else Image.LANCZOS
+        return bgr_to_pil(orig).resize(size, resample), bgr_to_pil(proc).resize(size, resample)
+
+    def _schedule_refine(self):
+        self._cancel_region()  # the view moved (or params changed): the pending crops are stale
+        if self._refine_job is not None:
+            self.after_cancel(self._refine_job)
+        self._refine_job = self.after(self.REFINE_DELAY_MS, self._refine)
+
+    def _cancel_region(self):
+        if self._region_cancel is not None:
+            self._region_cancel()
+
+    def _refine(self):
+        self._refine_job = None
+        lay = self.view.layout(*self._box())
+        if lay is None or self._region_fn is None:
+            return
+        rect = lay[0]
+        self._region_fn(*rect, lambda orig, proc: self._region_ready(rect, orig, proc))
+
+    def _region_ready(self, rect, orig, proc):
+        lay = self.view.layout(*self._box())
+        if lay is None or lay[0] != rect:
+            return  # the view moved on meanwhile
+        self._region = (rect, orig, proc)
+        self._redraw()
+
+
 # ---------------- Side-by-Side ----------------
-class SideBySidePreview(ttk.Frame):
+class SideBySidePreview(_ZoomMixin, ttk.Frame):
     def __init__(self, master):
         super().__init__(master)
         self.orig_bgr = None
         self.proc_bgr = None
         self._orig_imgtk = None
         self._proc_imgtk = None
+        self._init_zoom()
 
         self.left = ttk.Label(self)
         self.right = ttk.Label(self)
         self.left.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 4))
         self.right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(4, 0))
+        for label in (self.left, self.right):  # both halves show the same window
+            self._bind_zoom(label, "<Button-1>", "<B1-Motion>")
 
         self.bind("<Configure>", lambda e: self._redraw())
 
     def update_images(self, orig_bgr, proc_bgr):
         self.orig_bgr = orig_bgr
         self.proc_bgr = proc_bgr
+        self._new_images(orig_bgr)
         self._redraw()
 
+    def _box(self):
+        return max(1, (self.winfo_width() - 8) // 2), max(1, self.winfo_height())
+
     def _redraw(self):
         if self.orig_bgr is None or self.proc_bgr is None:
             return
@@ -49,6 +246,14 @@ class SideBySidePreview(ttk.Frame):
 
         half_w = max(1, (W - 8) // 2)
 
+        crops = self._zoom_crops(half_w, H)
+        if crops is not None:
+            self._orig_imgtk = ImageTk.PhotoImage(crops[0])
+            self._proc_imgtk = ImageTk.PhotoImage(crops[1])
+            self.left.configure(image=self._orig_imgtk)
+            self.right.configure(image=self._proc_imgtk)
+            return
+
         # ORIG
         pil_o = bgr_to_pil(self.orig_bgr)
         _, tw_o, th_o = _fit_contain_no_upscale(half_w, H, pil_o.width, pil_o.height)
@@ -63,18 +268,23 @@ class SideBySidePreview(ttk.Frame):
 
 
 # ---------------- Before/After Slider ----------------
-class SliderPreview(ttk.Frame):
-    """Canvas with draggable divider. Centered; fits inside, never upscales."""
+class SliderPreview(_ZoomMixin, ttk.Frame):
+    """
+    Canvas with draggable divider. Centered; fits inside, never upscales
+    unless zoomed (wheel); pan with the right button or Shift+drag.
+    """
     def __init__(self, master):
         super().__init__(master)
         self.orig_bgr = None
         self.proc_bgr = None
         self._orig_pil = None
         self._proc_pil = None
+        self._orig_disp = None   # BEFORE layer at display size (cropped at the divider)
         self._orig_imgtk = None
         self._proc_imgtk = None
         self._left_imgtk = None
         self.split_x = None  # divider position in canvas coords
+        self._init_zoom()
 
         self.canvas = tk.Canvas(self, highlightthickness=0)
         self.canvas.pack(fill=tk.BOTH, expand=True)
@@ -82,14 +292,21 @@ class SliderPreview(ttk.Frame):
         self.canvas.bind("<Configure>", lambda e: self._redraw())
         self.canvas.bind("<Button-1>", self._drag)
         self.canvas.bind("<B1-Motion>", self._drag)
+        self._bind_zoom(self.canvas, "<Button-3>", "<B3-Motion>")
+        self.canvas.bind("<Shift-Button-1>", self._pan_start)
+        self.canvas.bind("<Shift-B1-Motion>", self._pan_move)
 
     def update_images(self, orig_bgr, proc_bgr):
         self.orig_bgr = orig_bgr
         self.proc_bgr = proc_bgr
         self._orig_pil = bgr_to_pil(self.orig_bgr)
         self._proc_pil = bgr_to_pil(self.proc_bgr)
+        self._new_images(orig_bgr)
         self._redraw(initial=True)
 
+    def _box(self):
+        return max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height())
+
     def _drag(self, event):
         self.split_x = max(0, min(self.canvas.winfo_width(), event.x))
         self._draw_layers()
@@ -104,11 +321,16 @@ class SliderPreview(ttk.Frame):
             self.after(16, lambda: self._redraw(initial))
             return
 
-        # Single target size (contain, no upscale) so both layers align
-        _, tw, th = _fit_contain_no_upscale(W, H, self._orig_pil.width, self._orig_pil.height)
-
-        disp_o = self._orig_pil.resize((tw, th), Image.LANCZOS)
-        disp_p = self._proc_pil.resize((tw, th), Image.LANCZOS)
+        crops = self._zoom_crops(W, H)
+        if crops is not None:
+            disp_o, disp_p = crops
+            tw, th = disp_p.size
+        else:
+            # Single target size (contain, no upscale) so both layers align
+            _, tw, th = _fit_contain_no_upscale(W, H, self._orig_pil.width, self._orig_pil.height)
+            disp_o = self._orig_pil.resize((tw, th), Image.LANCZOS)
+            disp_p = self._proc_pil.resize((tw, th), Image.LANCZOS)
+        self._orig_disp = disp_o
         self._orig_imgtk = ImageTk.PhotoImage(disp_o)
         self._proc_imgtk = ImageTk.PhotoImage(disp_p)
 
@@ -137,7 +359,7 @@ class SliderPreview(ttk.Frame):
         left_visible = int(min(tw, left_visible))
 
         if left_visible > 0:
-            crop = self._orig_pil.resize((tw, th), Image.LANCZOS).crop((0, 0, left_visible, th))
+            crop = self._orig_disp.crop((0, 0, left_visible, th))
             self._left_imgtk = ImageTk.PhotoImage(crop)  # keep ref alive
             self.canvas.create_image(self.img_offset_x, self.img_offset_y, anchor="nw", image=self._left_imgtk)
 
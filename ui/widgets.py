@@ -23,7 +23,7 @@ class LabeledSlider(ttk.Frame):
     - Works with ttk themes (no parent["background"] lookups).
     - Mouse wheel support (Windows/macOS: <MouseWheel>, Linux: <Button-4/5>).
     - is_int=True -> integer stepping; otherwise floating (resolution).
-    - 'command' is called on any change.
+    - 'command' is called on any change, except for set(..., quiet=True).
     """
 
     def __init__(
@@ -45,6 +45,7 @@ class LabeledSlider(ttk.Frame):
         self.resolution = max(resolution, 1 if is_int else resolution)
         self.is_int = is_int
         self.length = length
+        self._quiet_value = None  # value whose (deferred) Tk callback should be swallowed
 
         BG, FG, TROUGH = get_theme_colors(self)
 
@@ -93,9 +94,18 @@ class LabeledSlider(ttk.Frame):
         v = self.scale.get()
         return int(round(v)) if self.is_int else float(v)
 
-    def set(self, value):
+    def set(self, value, quiet=False):
+        """
+        Move the slider. tk.Scale reports programmatic changes through its
+        command on the next idle pass; with quiet=True that one report is
+        swallowed so bulk updates can emit a single change event themselves.
+        """
         value = self._clamp(value)
+        before = self.scale.get()
         self.scale.set(value)
+        after = self.scale.get()
+        if quiet and after != before:
+            self._quiet_value = after
         self._write_entry(value)
 
     def enable(self):
@@ -110,15 +120,34 @@ class LabeledSlider(ttk.Frame):
         self.btn_minus.configure(state=state)
         self.btn_plus.configure(state=state)
 
+    def neighbors(self):
+        """Values one bump below/above the current one (clamped, distinct)."""
+        step = (1 if self.is_int else self.resolution)
+        cur = self.get()
+        out = []
+        for v in (cur - step, cur + step):
+            v = self._clamp(round(v, 6))
+            if v != cur and v not in out:
+                out.append(v)
+        return out
+
     def bump(self, steps):
         step = (1 if self.is_int else self.resolution)
-        self.set(self.get() + steps * step)
-        if self.command:
+        self._change(self.get() + steps * step)
+
+    def _change(self, value):
+        """A user edit: move quietly, then report it once (nothing if the value stays)."""
+        before = self.get()
+        self.set(value, quiet=True)
+        if self.get() != before and self.command:
             self.command(None)
 
     def _on_scale(self, _):
         val = self.get()
         self._write_entry(val)
+        quiet, self._quiet_value = self._quiet_value, None
+        if quiet is not None and val == quiet:
+            return
         if self.command:
             self.command(None)
 
@@ -129,9 +158,7 @@ class LabeledSlider(ttk.Frame):
             v = self.get()
         if self.is_int:
             v = int(round(v))
-        self.set(v)
-        if self.command:
-            self.command(None)
+        self._change(v)
 
     def _on_wheel(self, event):
         if hasattr(event, "delta") and event.delta != 0:
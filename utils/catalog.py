@@ -0,0 +1,261 @@
+# utils/catalog.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from PIL import Image
+
+from utils.image_io import IMG_EXTS
+from utils.settings import cache_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path    TEXT PRIMARY KEY,
+    folder  TEXT NOT NULL,
+    size    INTEGER NOT NULL,
+    mtime   REAL NOT NULL,
+    width   INTEGER,
+    height  INTEGER,
+    hash    TEXT,
+    scanned REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_folder ON files(folder);
+"""
+
+_ORDERS = {
+    "path": "path",
+    "mtime": "mtime DESC",
+    "size": "size DESC",
+    "pixels": "(width * height) DESC",
+}
+
+
+@dataclass
+class CatalogEntry:
+    path: str
+    folder: str
+    size: int
+    mtime: float
+    width: Optional[int]     # None if the header could not be read
+    height: Optional[int]
+    hash: Optional[str]
+
+    @property
+    def pixels(self) -> int:
+        return (self.width or 0) * (self.height or 0)
+
+
+@dataclass
+class ScanStats:
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+
+def default_catalog_path() -> str:
+    return os.path.join(cache_dir(), "catalog.sqlite3")
+
+
+def header_size(path: str):
+    """(width, height) from the file header only (no pixel decode), or (None, None)."""
+    try:
+        with Image.open(path) as im:
+            return im.size
+    except Exception:
+        return None, None
+
+
+def file_hash(path: str, chunk: int = 1 << 20) -> Optional[str]:
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(chunk), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def _walk(folder: str, recursive: bool):
+    """Yield os.DirEntry for image files under `folder` (os.scandir, no extra stats)."""
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for de in it:
+                    if de.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(de.path)
+                    elif os.path.splitext(de.name.lower())[1] in IMG_EXTS and de.is_file():
+                        yield de
+        except OSError:
+            continue
+
+
+class Catalog:
+    """
+    Per-file metadata (size, mtime, header dimensions, content hash) for image
+    folders, kept in SQLite. scan() is incremental: files whose size and mtime
+    are unchanged are not re-read; vanished files are dropped.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or default_catalog_path()
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _prefix(folder: str):
+        """Bounds of every path strictly below `folder` (sortable range on the primary key)."""
+        root = os.path.join(os.path.abspath(folder), "")
+        return root, root[:-1] + chr(ord(root[-1]) + 1)
+
+    def scan(self, folder: str, recursive: bool = False, hash_files: bool = True) -> ScanStats:
+        folder = os.path.abspath(folder)
+        stats = ScanStats()
+        known = {}
+        lo, hi = self._prefix(folder)
+        if recursive:
+            rows = self.conn.execute("SELECT path, size, mtime FROM files WHERE path >= ? AND path < ?", (lo, hi))
+        else:
+            rows = self.conn.execute("SELECT path, size, mtime FROM files WHERE folder = ?", (folder,))
+        for path, size, mtime in rows:
+            known[path] = (size, mtime)
+
+        now = time.time()
+        upserts = []
+        for de in _walk(folder, recursive):
+            path = os.path.abspath(de.path)
+            try:
+                st = de.stat()
+            except OSError:
+                continue
+            prev = known.pop(path, None)
+            if prev == (st.st_size, st.st_mtime):
+                stats.unchanged += 1
+                continue
+            w, h = header_size(path)
+            digest = file_hash(path) if hash_files else None
+            upserts.append((path, os.path.dirname(path), st.st_size, st.st_mtime, w, h, digest, now))
+            if prev is None:
+                stats.added += 1
+            else:
+                stats.updated += 1
+
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", upserts)
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in known])
+        stats.removed = len(known)
+        return stats
+
+    def fill_hashes(self, folder: str, recursive: bool = False, stop: Optional[threading.Event] = None,
+                    batch: int = 32) -> int:
+        """
+        Hash the files a scan(hash_files=False) left without one; returns how
+        many. Rows changed on disk meanwhile are left for the next scan.
+        Commits every `batch` files; `stop` ends the run early.
+        """
+        folder = os.path.abspath(folder)
+        if recursive:
+            lo, hi = self._prefix(folder)
+            rows = self.conn.execute("SELECT path, size, mtime FROM files WHERE hash IS NULL AND path >= ? AND path < ?",
+                                     (lo, hi)).fetchall()
+        else:
+            rows = self.conn.execute("SELECT path, size, mtime FROM files WHERE hash IS NULL AND folder = ?",
+                                     (folder,)).fetchall()
+        done = 0
+        for i in range(0, len(rows), batch):
+            updates = []
+            for path, size, mtime in rows[i:i + batch]:
+                if stop is not None and stop.is_set():
+                    break
+                digest = file_hash(path)
+                if digest is not None:
+                    updates.append((digest, path, size, mtime))
+            with self.conn:
+                self.conn.executemany("UPDATE files SET hash = ? WHERE path = ? AND size = ? AND mtime = ?", updates)
+            done += len(updates)
+            if stop is not None and stop.is_set():
+                break
+        return done
+
+    def stored_hash(self, path: str) -> Optional[str]:
+        """Content hash recorded for `path`, if the file's size and mtime still match the row."""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        row = self.conn.execute("SELECT hash FROM files WHERE path = ? AND size = ? AND mtime = ?",
+                                (path, st.st_size, st.st_mtime)).fetchone()
+        return row[0] if row else None
+
+    def query(
+        self,
+        folder: str,
+        recursive: bool = False,
+        min_side: int = 0,
+        min_pixels: int = 0,
+        max_pixels: Optional[int] = None,
+        order_by: str = "path",
+    ) -> List[CatalogEntry]:
+        """Catalogued images under `folder` (scan() first), filtered by dimensions."""
+        folder = os.path.abspath(folder)
+        where, args = [], []
+        if recursive:
+            lo, hi = self._prefix(folder)
+            where.append("path >= ? AND path < ?")
+            args += [lo, hi]
+        else:
+            where.append("folder = ?")
+            args.append(folder)
+        if min_side:
+            where.append("MIN(width, height) >= ?")
+            args.append(int(min_side))
+        if min_pixels:
+            where.append("width * height >= ?")
+            args.append(int(min_pixels))
+        if max_pixels is not None:
+            where.append("width * height <= ?")
+            args.append(int(max_pixels))
+        sql = "SELECT path, folder, size, mtime, width, height, hash FROM files WHERE {} ORDER BY {}".format(
+            " AND ".join(where), _ORDERS.get(order_by, "path"))
+        return [CatalogEntry(*row) for row in self.conn.execute(sql, args)]
+
+    def get(self, path: str) -> Optional[CatalogEntry]:
+        row = self.conn.execute(
+            "SELECT path, folder, size, mtime, width, height, hash FROM files WHERE path = ?",
+            (os.path.abspath(path),)).fetchone()
+        return CatalogEntry(*row) if row else None
+
+
+def fill_hashes_in_background(db_path: str, folder: str, recursive: bool = False) -> threading.Event:
+    """
+    Catalog.fill_hashes on a daemon thread with its own connection (the UI
+    lists folders with hash_files=False). Set the returned event to stop it.
+    """
+    stop = threading.Event()
+
+    def run():
+        try:
+            catalog = Catalog(db_path)
+        except Exception:
+            return
+        try:
+            catalog.fill_hashes(folder, recursive=recursive, stop=stop)
+        except Exception:
+            pass  # hashes are optional; the next scan retries
+        finally:
+            catalog.close()
+
+    threading.Thread(target=run, name="catalog-hash", daemon=True).start()
+    return stop
@@ -1,13 +1,27 @@
+import io
 import os
-import cv2
 import numpy as np
 from PIL import Image
 
+from utils.startup import LazyModule
+
+cv2 = LazyModule("cv2")  # imported on first use, not when the UI starts
+
 IMG_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
 
-def list_images_in_folder(folder):
-    files = [os.path.join(folder, f) for f in os.listdir(folder)
-             if os.path.splitext(f.lower())[1] in IMG_EXTS]
+def list_images_in_folder(folder, catalog=None, hash_files=True, **filters):
+    """
+    Sorted image paths in `folder`. With a utils.catalog.Catalog, rescans it
+    incrementally and applies its query filters (recursive, min_side, ...);
+    without one, filters are ignored. hash_files=False (UI thread) leaves the
+    content hashes of new files to Catalog.fill_hashes.
+    """
+    if catalog is not None:
+        catalog.scan(folder, recursive=filters.get("recursive", False), hash_files=hash_files)
+        return [e.path for e in catalog.query(folder, **filters)]
+    with os.scandir(folder) as it:
+        files = [de.path for de in it
+                 if os.path.splitext(de.name.lower())[1] in IMG_EXTS and de.is_file()]
     files.sort()
     return files
 
@@ -19,8 +33,50 @@ def load_bgr(path):
         raise ValueError(f"Cannot read image: {path}")
     return img
 
-def save_bgr(path, img_bgr):
-    Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)).save(path)
+def load_reduced(path, min_side=None):
+    """
+    Quick low-resolution decode for progressive open: a JPEG is decoded at
+    1/2, 1/4 or 1/8 scale straight from its DCT coefficients
+    (cv2.IMREAD_REDUCED_COLOR_*), the strongest reduction that still leaves
+    the longer side >= min_side (default PROXY_MAX_SIDE). Returns
+    (img, (full_w, full_h)), or None when that is no faster than load_bgr
+    (other formats, small images, unreadable headers).
+    """
+    min_side = PROXY_MAX_SIDE if min_side is None else min_side
+    try:
+        with Image.open(path) as im:  # header only
+            fmt, (w, h) = im.format, im.size
+    except Exception:
+        return None
+    factor = next((f for f in (8, 4, 2) if max(w, h) // f >= min_side), None)
+    if fmt != "JPEG" or factor is None:
+        return None
+    img = cv2.imdecode(np.fromfile(path, dtype=np.uint8), getattr(cv2, f"IMREAD_REDUCED_COLOR_{factor}"))
+    return None if img is None else (img, (w, h))
+
+def save_bgr(path, img_bgr, atomic=False, **options):
+    """atomic=True writes a hidden temp file next to `path` and renames it into place,
+    so readers never see a half-written output. `options` go to PIL (e.g. quality=90)."""
+    img = Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB))
+    if not atomic:
+        img.save(path, **options)
+        return
+    head, name = os.path.split(path)
+    tmp = os.path.join(head, f".{name}.{os.getpid()}.tmp{os.path.splitext(name)[1]}")
+    try:
+        img.save(tmp, **options)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def encode_bgr(img_bgr, fmt="png", **options):
+    """The file bytes save_bgr would write for a `fmt` ("png", "jpg", ...) file, in memory."""
+    buf = io.BytesIO()
+    Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)).save(
+        buf, format=Image.registered_extensions()["." + fmt.lower()], **options)
+    return buf.getvalue()
 
 def bgr_to_pil(img_bgr):
     return Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB))
@@ -36,4 +92,26 @@ def resize_to_box(img_bgr, box_w, box_h):
     scale = min(box_w / w, box_h / h)
     nh = max(1, int(h * scale))
     nw = max(1, int(w * scale))
-    return cv2.resize(img_bgr, (nw, nh), interpolation=cv2.INTER_AREA)
\ No newline at end of file
+    return cv2.resize(img_bgr, (nw, nh), interpolation=cv2.INTER_AREA)
+
+# Interactive previews render on a downscaled "proxy" of the original
+PROXY_MAX_SIDE = 1024
+
+def make_proxy(img_bgr, max_side=PROXY_MAX_SIDE):
+    return resize_max(img_bgr, max_side, max_side)
+
+
+# Lossless 90-degree rotations / flips, named so they can be stored as a
+# lazy orientation (a tuple of op names) and replayed on any derived image
+ORIENT_OPS = {
+    "rot90_ccw": lambda img: cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE),
+    "rot90_cw":  lambda img: cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE),
+    "rot180":    lambda img: cv2.rotate(img, cv2.ROTATE_180),
+    "flip_h":    lambda img: cv2.flip(img, 1),
+    "flip_v":    lambda img: cv2.flip(img, 0),
+}
+
+def apply_orientation(img_bgr, ops):
+    for op in ops:
+        img_bgr = ORIENT_OPS[op](img_bgr)
+    return img_bgr
@@ -12,7 +12,7 @@ FALLBACK_DEFAULT = {
     "tone_strength": 0.32, "glow": 0.85,
     "edge_strength": 0.35, "edge_low": 110, "edge_high": 220, "edge_soften": 1.5,
     "vignette_amt": 0.35, "scan_alpha": 0.05,
-    "do_glitch": True, "glitch_n": 6, "glitch_shift": 14,
+    "do_glitch": True, "glitch_n": 6, "glitch_shift": 14, "glitch_seed": None,
 }
 
 # ---- helpers -------------------------------------------------
@@ -20,7 +20,7 @@ FALLBACK_DEFAULT = {
 _PARAM_KEYS = {
     "clahe_clip", "contrast", "saturation", "vibr", "tone_strength", "glow",
     "edge_strength", "edge_low", "edge_high", "edge_soften",
-    "vignette_amt", "scan_alpha", "do_glitch", "glitch_n", "glitch_shift",
+    "vignette_amt", "scan_alpha", "do_glitch", "glitch_n", "glitch_shift", "glitch_seed",
 }
 
 def _load_raw():
@@ -101,10 +101,11 @@ def random_params(_theme: str):
     do_glitch    = random.random() < 0.7
     glitch_n     = (0 if not do_glitch else random.randint(3, 12))
     glitch_shift = (0 if not do_glitch else random.randint(8, 24))
+    glitch_seed  = (None if not do_glitch else random.randint(0, 2**31 - 1))
     return {
         "clahe_clip": clahe_clip, "contrast": contrast, "saturation": saturation, "vibr": vibr,
         "tone_strength": tone_strength, "glow": glow,
         "edge_strength": edge_strength, "edge_low": low, "edge_high": high, "edge_soften": edge_soften,
         "vignette_amt": vignette_amt, "scan_alpha": scan_alpha,
-        "do_glitch": do_glitch, "glitch_n": glitch_n, "glitch_shift": glitch_shift,
+        "do_glitch": do_glitch, "glitch_n": glitch_n, "glitch_shift": glitch_shift, "glitch_seed": glitch_seed,
     }
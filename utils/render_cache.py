@@ -0,0 +1,151 @@
+# utils/render_cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from utils.image_io import load_bgr, save_bgr
+from utils.settings import cache_dir
+
+RENDER_CACHE_EXT = ".png"
+# part of every key: bump whenever a filter's output changes, so renders cached
+# by an older version are never served again (they age out through the LRU)
+RENDER_CACHE_VERSION = 2
+PNG_COMPRESS_LEVEL = 1  # lossless; level 1 writes several times faster than the default for ~10% more bytes
+
+
+def default_render_cache_dir() -> str:
+    return os.path.join(cache_dir(), "renders")
+
+
+def render_key(source_hash: str, orientation, params_key: tuple, kind: str, fast_paths: tuple = ()) -> str:
+    """
+    Content address of one render: RENDER_CACHE_VERSION, source file hash,
+    rotations/flips applied, (theme, params) key (app.speculative.params_key),
+    `kind` ("full" or "proxy") and the fast paths it was rendered with
+    (processing.stages.fast_paths_key), so approximate renders are never
+    served as reference ones or the other way round.
+    """
+    text = repr((RENDER_CACHE_VERSION, source_hash, tuple(orientation), params_key, kind, tuple(fast_paths)))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class RenderCache:
+    """
+    Finished renders on disk, content-addressed by render_key, as lossless
+    PNGs under `root` (256 subfolders). The total size is capped at
+    `budget_mb`; the least recently used files go first. Last use is the
+    file mtime (touched on every hit), so the LRU order survives restarts.
+    put_async() encodes and writes on one background thread; get() reads
+    on the caller's. Thread-safe.
+    """
+
+    def __init__(self, root: Optional[str] = None, budget_mb: float = 512):
+        self.root = root or default_render_cache_dir()
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._files = OrderedDict()  # key -> size in bytes, least recently used first
+        self._pending = set()        # keys queued for writing
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render-cache")
+        os.makedirs(self.root, exist_ok=True)
+        self._scan()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + RENDER_CACHE_EXT)
+
+    def _scan(self):
+        """Index the files left by earlier runs, oldest use first."""
+        found = []
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for de in os.scandir(sub.path):
+                if de.name.endswith(RENDER_CACHE_EXT) and not de.name.startswith("."):
+                    st = de.stat()
+                    found.append((st.st_mtime, de.name[:-len(RENDER_CACHE_EXT)], st.st_size))
+        for _, key, size in sorted(found):
+            self._files[key] = size
+        with self._lock:
+            self._evict()
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._files.values())
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._files or key in self._pending
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """The cached render (BGR), or None; a hit becomes the most recently used."""
+        with self._lock:
+            if key not in self._files:
+                return None
+            self._files.move_to_end(key)
+        path = self._path(key)
+        try:
+            img = load_bgr(path)
+            os.utime(path)
+        except Exception:
+            self._forget(key)  # evicted by another process, or a damaged file
+            return None
+        return img
+
+    def put(self, key: str, img_bgr: np.ndarray):
+        """Write a render now (replaces nothing: same key, same pixels)."""
+        path = self._path(key)
+        try:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                save_bgr(path, img_bgr, atomic=True, compress_level=PNG_COMPRESS_LEVEL)
+            size = os.path.getsize(path)
+        except OSError:
+            return  # a full disk only costs the cache entry
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+        with self._lock:
+            self._files[key] = size
+            self._files.move_to_end(key)
+            self._evict()
+
+    def put_async(self, key: str, img_bgr: np.ndarray):
+        """put() on the writer thread; already cached or queued keys are skipped."""
+        with self._lock:
+            if key in self._files or key in self._pending:
+                return
+            self._pending.add(key)
+        self._writer.submit(self.put, key, img_bgr)
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._files.pop(key, None)
+
+    def _evict(self):
+        total = sum(self._files.values())
+        while total > self.budget and self._files:
+            key, size = self._files.popitem(last=False)
+            total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._files)
+            self._files.clear()
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def close(self, wait: bool = True):
+        """Finish (or with wait=False, drop) queued writes."""
+        self._writer.shutdown(wait=wait, cancel_futures=not wait)
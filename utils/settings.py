@@ -0,0 +1,49 @@
+# utils/settings.py
+import json
+import os
+
+# Optional overrides live in settings.json next to presets.json (project root)
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "settings.json")
+
+DEFAULTS = {
+    "cache_budget_mb": 1024,   # decoded images + proxies + renders kept in memory
+    "prefetch_depth": 1,       # neighbours decoded + proxy-rendered on each side while browsing
+    "cache_dir": None,         # on-disk caches (catalog, renders); None -> user cache dir
+    "render_cache_mb": 512,    # finished renders kept on disk for undo/redo and revisits; 0 -> off
+    "batch_min_side": 0,       # folder batches skip images whose shorter side is below this
+    "batch_memory_mb": None,   # RAM parallel batch jobs may use at once; None -> half of RAM, 0 -> no limit
+    "batch_recycle_after": 0,  # >0: batch in worker processes, each replaced after this many files
+    "scratch_budget_mb": 256,  # idle float work buffers kept for reuse between renders
+    "export_profile": None,    # Save/Batch write every size of this profile (processing/export.py)
+    "export_profiles": None,   # extra profiles: {name: [{"suffix", "max_side", "format", "quality"}]}
+    "export_reduced": False,   # batch: render at the largest profile size if none is full-size
+    "fast_paths": False,       # approximate fast stage implementations: true, false or [stage names]
+    "kernel_backend": "numpy", # "numba": fused per-pixel kernels (processing/fused.py) when Numba is installed
+    "startup_report": False,   # print startup phase / import timings to stderr once the app is warm
+}
+
+
+def _load_raw():
+    """Load JSON; tolerate UTF-8 BOM; return {} on any error (file is optional)."""
+    try:
+        with open(SETTINGS_PATH, "r", encoding="utf-8-sig") as f:
+            data = json.load(f)
+            return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def get_setting(name: str):
+    """Value from settings.json if present, else the built-in default."""
+    data = _load_raw()
+    return data.get(name, DEFAULTS.get(name))
+
+
+def cache_dir() -> str:
+    """Directory for on-disk caches (created on demand)."""
+    path = get_setting("cache_dir")
+    if not path:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        path = os.path.join(base, "pixel-alchemy")
+    os.makedirs(path, exist_ok=True)
+    return path
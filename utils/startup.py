@@ -0,0 +1,63 @@
+# utils/startup.py
+import importlib
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+T0 = time.perf_counter()  # as early as the entry point imports this module
+
+_marks: List[Tuple[str, float]] = []    # (phase, seconds since T0)
+_imports: List[Tuple[str, float]] = []  # (module, seconds spent importing it)
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access, so a
+    module-level `cv2 = LazyModule("cv2")` costs nothing until cv2 is used.
+    Looked-up attributes are cached on the instance.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+
+    def __getattr__(self, attr):
+        value = getattr(timed_import(self._name), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+def mark(phase: str):
+    """Record that startup reached `phase`."""
+    with _lock:
+        _marks.append((phase, time.perf_counter() - T0))
+
+
+def timed_import(name: str):
+    """importlib.import_module, recording the time of the first (real) import."""
+    first = name not in sys.modules
+    t0 = time.perf_counter()
+    # always go through importlib: another thread may still be initialising
+    # the module, and import_module waits for it instead of returning it half-done
+    module = importlib.import_module(name)
+    if first:
+        with _lock:
+            if name not in (n for n, _ in _imports):
+                _imports.append((name, time.perf_counter() - t0))
+    return module
+
+
+def report() -> str:
+    """Startup phases and import costs as text."""
+    with _lock:
+        marks, imports = list(_marks), list(_imports)
+    lines = ["startup:"]
+    lines += [f"  {t * 1000:8.1f} ms  {phase}" for phase, t in marks]
+    if imports:
+        lines.append("imports (cumulative, first use):")
+        lines += [f"  {t * 1000:8.1f} ms  {name}" for name, t in imports]
+    return "\n".join(lines)